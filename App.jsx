@@ -29,12 +29,50 @@ import {
 } from 'lucide-react'
 import './App.css'
 
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000'
+
+// Streams a RAG answer from the backend's Server-Sent Events endpoint.
+// Sources arrive first, then tokens as the LLM generates them.
+async function streamRagQuery(query, authToken, { onSources, onToken }) {
+  const res = await fetch(`${API_BASE_URL}/query_rag/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${authToken}`
+    },
+    body: JSON.stringify({ query })
+  })
+  if (!res.ok) throw new Error(`Request failed with status ${res.status}`)
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    // SSE messages are separated by a blank line
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const message = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      const event = message.match(/^event: (.*)$/m)?.[1]
+      const data = JSON.parse(message.match(/^data: (.*)$/m)?.[1] ?? 'null')
+      if (event === 'sources') onSources(data)
+      else if (event === 'token') onToken(data)
+      else if (event === 'error') throw new Error(data)
+    }
+  }
+}
+
 function App() {
   const [activeTab, setActiveTab] = useState('query')
   const [queryMode, setQueryMode] = useState('rag')
   const [selectedAgent, setSelectedAgent] = useState('')
   const [query, setQuery] = useState('')
   const [response, setResponse] = useState('')
+  const [sources, setSources] = useState([])
   const [isLoading, setIsLoading] = useState(false)
   const [agents, setAgents] = useState([])
   const [stats, setStats] = useState(null)
@@ -71,29 +109,18 @@ function App() {
 
     setIsLoading(true)
     setResponse('')
+    setSources([])
 
     try {
-      // Simulate API call
-      await new Promise(resolve => setTimeout(resolve, 2000))
-      
       if (queryMode === 'rag') {
-        setResponse(`**RAG Response:**
-
-Based on the knowledge base, here's what I found regarding "${query}":
-
-This is a comprehensive response that would be generated by the RAG system, drawing from your extensive collection of project management documents, certifications, and frameworks.
-
-**Key Points:**
-• Relevant information from PRINCE2 documentation
-• Best practices from PMBOK guidelines  
-• Lessons learned from previous projects
-• Industry standards and frameworks
-
-**Sources:**
-• PRINCE2 Managing Successful Projects (Chapter 3)
-• PMBOK Guide 7th Edition (Section 2.4)
-• Internal Project Lessons Learned Database`)
+        await streamRagQuery(query, authToken, {
+          onSources: setSources,
+          onToken: (token) => setResponse(prev => prev + token)
+        })
       } else {
+        // Simulate API call
+        await new Promise(resolve => setTimeout(resolve, 2000))
+
         const agentName = selectedAgent || 'general_pm'
         const agentDisplay = agents.find(a => a.name === agentName)?.display_name || 'General PM'
         
@@ -278,6 +305,20 @@ When needed, multiple agents can collaborate to provide comprehensive cross-meth
                             </p>
                           ))}
                         </div>
+                        {sources.length > 0 && (
+                          <>
+                            <Separator className="my-4" />
+                            <p className="text-sm font-medium mb-2">Sources</p>
+                            <div className="flex flex-wrap gap-2">
+                              {sources.map((source, index) => (
+                                <Badge key={index} variant="secondary">
+                                  {source.metadata?.source || `Source ${index + 1}`}
+                                  {source.metadata?.page !== undefined && ` (p. ${source.metadata.page})`}
+                                </Badge>
+                              ))}
+                            </div>
+                          </>
+                        )}
                       </ScrollArea>
                     </CardContent>
                   </Card>
@@ -0,0 +1,135 @@
+"""
+QPS, recall@k and memory benchmark for the vector store backends.
+Loads the same clustered synthetic vectors into Chroma and into the local
+store with each index type (including the int8/PQ compressed modes), then
+compares build time, query throughput, index memory and recall loss against
+exact brute-force neighbours.
+
+    python -m backend.retrieval.ann_benchmark --rows 50000 --dim 384 --k 10
+    python -m backend.retrieval.ann_benchmark --backends flat,int8,pq --pq-m 48
+    python -m backend.retrieval.ann_benchmark --vectors chunk_embeddings.npy
+"""
+
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.retrieval.ann_index import normalize
+from backend.retrieval.local_vector_store import LocalVectorStore
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Maps the benchmark's row ids (used as texts) to fixed vectors."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.vectors[[int(text) for text in texts]].tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors[int(text)].tolist()
+
+
+def synthetic_vectors(rows: int, dim: int, clusters: int = 64, noise: float = 1.5, seed: int = 7) -> np.ndarray:
+    """Unit vectors drawn around random centres, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim))
+    data = centres[rng.integers(0, clusters, rows)] + noise * rng.standard_normal((rows, dim))
+    return normalize(data)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def _build_store(backend: str, vectors: np.ndarray, directory: str, batch_size: int = 4096, **index_params):
+    embeddings = PrecomputedEmbeddings(vectors)
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+        store = Chroma(collection_name="benchmark", embedding_function=embeddings, persist_directory=directory)
+    else:
+        store = LocalVectorStore("benchmark", embeddings, persist_directory=directory, index_type=backend, **index_params)
+    for start in range(0, len(vectors), batch_size):
+        ids = [str(i) for i in range(start, min(start + batch_size, len(vectors)))]
+        store.add_texts(ids, ids=ids)
+    return store
+
+
+def run_benchmark(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    backends: Sequence[str] = ("chroma", "flat", "ivf", "hnsw", "int8", "pq"),
+    index_params: Dict[str, Dict] = None,
+) -> List[Dict[str, float]]:
+    """Build each backend, run every query once and report build time, QPS, memory and recall@k."""
+    truth = exact_neighbours(vectors, queries, k)
+    results = []
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            store = _build_store(backend, vectors, directory, **(index_params or {}).get(backend, {}))
+            build_seconds = time.perf_counter() - start
+
+            found = []
+            start = time.perf_counter()
+            for query in queries:
+                found.append([int(doc.id) for doc in store.similarity_search_by_vector(query.tolist(), k=k)])
+            elapsed = time.perf_counter() - start
+
+            hits = sum(len(set(ids) & set(expected)) for ids, expected in zip(found, truth.tolist()))
+            recall = hits / (len(queries) * k)
+            # Chroma's HNSW keeps full float vectors in memory; its overhead is not exposed
+            memory = store.stats()["memory_bytes"] if backend != "chroma" else None
+            results.append({
+                "backend": backend,
+                "build_seconds": round(build_seconds, 2),
+                "qps": round(len(queries) / elapsed, 1),
+                "memory_mb": round(memory / 2 ** 20, 2) if memory is not None else None,
+                f"recall@{k}": round(recall, 4),
+                "recall_loss": round(1 - recall, 4),
+            })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare QPS and recall@k of the vector store backends.")
+    parser.add_argument("--vectors", help="Benchmark real embeddings from a .npy file instead of synthetic ones")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", default="chroma,flat,ivf,hnsw,int8,pq", help="Comma-separated backends to run")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW candidate list size per query")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists scanned per query")
+    parser.add_argument("--nlist", type=int, default=128, help="IVF list count")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-vectors (bytes per code)")
+    parser.add_argument("--rescore-factor", type=int, default=8, help="Compressed candidates re-scored exactly, per k")
+    args = parser.parse_args()
+
+    if args.vectors:
+        data = normalize(np.load(args.vectors, mmap_mode="r")[:args.rows + args.queries])
+        args.rows = len(data) - args.queries
+    else:
+        data = synthetic_vectors(args.rows + args.queries, args.dim)
+    report = run_benchmark(
+        data[:args.rows],
+        data[args.rows:],
+        k=args.k,
+        backends=args.backends.split(","),
+        index_params={
+            "hnsw": {"ef_search": args.ef_search},
+            "ivf": {"nprobe": args.nprobe, "nlist": args.nlist},
+            "int8": {"rescore_factor": args.rescore_factor},
+            "pq": {"m": args.pq_m, "rescore_factor": args.rescore_factor},
+        },
+    )
+    for row in report:
+        print("  ".join(f"{key}={value}" for key, value in row.items()))
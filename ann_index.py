@@ -0,0 +1,665 @@
+"""
+Approximate nearest-neighbour search over memory-mapped vectors.
+Vectors are unit-normalized float32 rows in a file mapped with numpy.memmap,
+so the working set is managed by the OS page cache rather than the Python
+heap. Three search structures share that storage:
+
+- ``flat``: exact inner-product scan, also the ground truth for recall checks
+- ``ivf``: k-means coarse quantizer; ``nprobe`` lists are scanned per query
+- ``hnsw``: hierarchical navigable small-world graph; ``ef_search`` bounds
+  the candidate list explored per query
+- ``int8`` / ``pq``: compressed codes (scalar int8 or product quantization)
+  held in memory are scanned instead of the float rows, and only a small
+  candidate set is re-scored exactly from the memory-mapped file
+
+Deleted rows are tombstoned; the graph/list structures skip them at query
+time and can be rebuilt from the live rows. Every index also accepts an
+``allowed`` array of slots (e.g. from a metadata filter) and only returns,
+and where possible only scores, those rows.
+"""
+
+import os
+import heapq
+import math
+import pickle
+import random
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+ANN_HNSW_M = int(os.getenv("ANN_HNSW_M", "16"))
+ANN_HNSW_EF_CONSTRUCTION = int(os.getenv("ANN_HNSW_EF_CONSTRUCTION", "64"))
+ANN_HNSW_EF_SEARCH = int(os.getenv("ANN_HNSW_EF_SEARCH", "64"))
+ANN_IVF_NLIST = int(os.getenv("ANN_IVF_NLIST", "256"))
+ANN_IVF_NPROBE = int(os.getenv("ANN_IVF_NPROBE", "8"))
+ANN_PQ_M = int(os.getenv("ANN_PQ_M", "48"))
+# Compressed indexes re-score k * ANN_RESCORE_FACTOR candidates exactly
+ANN_RESCORE_FACTOR = int(os.getenv("ANN_RESCORE_FACTOR", "8"))
+
+_INITIAL_CAPACITY = 1024
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorFile:
+    """
+    Append-only float32 matrix backed by a memory-mapped file. Capacity
+    doubles as rows are added; ``count`` rows are in use.
+    """
+
+    def __init__(self, path: str, dim: int, count: int = 0):
+        self.path = path
+        self.dim = dim
+        self.count = count
+        capacity = _INITIAL_CAPACITY
+        if os.path.exists(path):
+            capacity = max(capacity, os.path.getsize(path) // (4 * dim))
+        while capacity < count:
+            capacity *= 2
+        self._open(capacity)
+
+    def _open(self, capacity: int):
+        size = capacity * self.dim * 4
+        mode = "r+" if os.path.exists(self.path) else "w+"
+        if mode == "r+" and os.path.getsize(self.path) < size:
+            with open(self.path, "r+b") as f:
+                f.truncate(size)
+        self.capacity = capacity
+        self.data = np.memmap(self.path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+        # Plain ndarray view of the same pages; skips memmap's per-slice overhead
+        self._rows = self.data.view(np.ndarray)
+
+    def append(self, vectors: np.ndarray) -> np.ndarray:
+        """Store rows and return their slot numbers."""
+        needed = self.count + len(vectors)
+        if needed > self.capacity:
+            capacity = self.capacity
+            while capacity < needed:
+                capacity *= 2
+            self.data.flush()
+            del self.data, self._rows
+            self._open(capacity)
+        slots = np.arange(self.count, needed)
+        self.data[self.count:needed] = vectors
+        self.count = needed
+        return slots
+
+    def rows(self, slots) -> np.ndarray:
+        return self._rows[slots]
+
+    def flush(self):
+        self.data.flush()
+
+
+class FlatIndex:
+    """Exact search over every live row."""
+
+    kind = "flat"
+
+    def __init__(self, vectors: VectorFile):
+        self.vectors = vectors
+        self.deleted: Set[int] = set()
+
+    def add(self, slots: Sequence[int]):
+        pass
+
+    def remove(self, slots: Iterable[int]):
+        self.deleted.update(slots)
+
+    def search(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        if allowed is not None:
+            return exact_search(self.vectors, query, k, allowed, self.deleted)
+        count = self.vectors.count
+        if count == 0:
+            return []
+        scores = self.vectors.rows(slice(0, count)) @ query
+        if self.deleted:
+            scores[list(self.deleted)] = -np.inf
+        return _top_k(np.arange(count), scores, k)
+
+    def search_batch(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """``search`` for many queries at once, scoring them all in one matrix product per block of rows."""
+        slots = allowed if allowed is not None else np.arange(self.vectors.count)
+        return exact_search_batch(self.vectors, queries, k, slots, self.deleted)
+
+    def memory_bytes(self) -> int:
+        """Approximate RAM needed to keep the data each query touches resident."""
+        return self.vectors.count * self.vectors.dim * 4
+
+    def state(self) -> Dict[str, Any]:
+        return {"deleted": self.deleted}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.deleted = state["deleted"]
+
+
+class IVFIndex:
+    """
+    Inverted-file index: rows are bucketed by their nearest k-means centroid
+    and a query scans only the ``nprobe`` closest buckets. Until enough rows
+    exist to train ``nlist`` centroids, rows are scanned exactly.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, vectors: VectorFile, nlist: int = ANN_IVF_NLIST, nprobe: int = ANN_IVF_NPROBE, seed: int = 42):
+        self.vectors = vectors
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[Set[int]] = []
+        self.untrained: Set[int] = set()
+        self.deleted: Set[int] = set()
+
+    @property
+    def train_threshold(self) -> int:
+        return self.nlist * 16
+
+    def train(self, iterations: int = 20):
+        """(Re)compute centroids from the live rows with spherical k-means."""
+        live = np.array(sorted(set(range(self.vectors.count)) - self.deleted), dtype=np.int64)
+        if len(live) < self.nlist:
+            return
+        rng = np.random.default_rng(self.seed)
+        sample = live if len(live) <= self.nlist * 64 else rng.choice(live, self.nlist * 64, replace=False)
+        data = self.vectors.rows(np.sort(sample))
+        centroids = data[rng.choice(len(data), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            for c in range(self.nlist):
+                members = data[assignment == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize(centroids)
+        self.centroids = centroids
+        self.lists = [set() for _ in range(self.nlist)]
+        self.untrained = set()
+        self._assign(live)
+
+    def _assign(self, slots: np.ndarray, batch: int = 8192):
+        for start in range(0, len(slots), batch):
+            chunk = slots[start:start + batch]
+            for slot, c in zip(chunk, np.argmax(self.vectors.rows(chunk) @ self.centroids.T, axis=1)):
+                self.lists[c].add(int(slot))
+
+    def add(self, slots: Sequence[int]):
+        if self.centroids is None:
+            self.untrained.update(int(slot) for slot in slots)
+            if len(self.untrained) >= self.train_threshold:
+                self.train()
+        else:
+            self._assign(np.asarray(slots, dtype=np.int64))
+
+    def remove(self, slots: Iterable[int]):
+        for slot in slots:
+            self.deleted.add(slot)
+            self.untrained.discard(slot)
+            for bucket in self.lists:
+                bucket.discard(slot)
+
+    def search(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        candidates = set(self.untrained)
+        if self.centroids is not None:
+            probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+            for c in probes:
+                candidates.update(self.lists[c])
+        if not candidates:
+            return []
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        slots.sort()
+        if allowed is not None:
+            slots = slots[np.isin(slots, allowed, assume_unique=True)]
+        return _top_k(slots, self.vectors.rows(slots) @ query, k)
+
+    def memory_bytes(self) -> int:
+        centroids = self.centroids.nbytes if self.centroids is not None else 0
+        return self.vectors.count * (self.vectors.dim * 4 + 8) + centroids
+
+    def state(self) -> Dict[str, Any]:
+        return {"centroids": self.centroids, "lists": self.lists, "untrained": self.untrained, "deleted": self.deleted}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.centroids = state["centroids"]
+        self.lists = state["lists"]
+        self.untrained = state["untrained"]
+        self.deleted = state["deleted"]
+
+
+class HNSWIndex:
+    """
+    Hierarchical navigable small-world graph (Malkov & Yashunin). Each node
+    keeps up to ``m`` neighbours per layer (``2 * m`` on layer 0);
+    ``ef_construction`` and ``ef_search`` trade build/query time for recall.
+    """
+
+    kind = "hnsw"
+
+    def __init__(
+        self,
+        vectors: VectorFile,
+        m: int = ANN_HNSW_M,
+        ef_construction: int = ANN_HNSW_EF_CONSTRUCTION,
+        ef_search: int = ANN_HNSW_EF_SEARCH,
+        seed: int = 42,
+    ):
+        self.vectors = vectors
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1 / math.log(m)
+        self._rng = random.Random(seed)
+        # layers[level][node] -> neighbour list
+        self.layers: List[Dict[int, List[int]]] = []
+        self.entry: Optional[int] = None
+        self.deleted: Set[int] = set()
+
+    def _distances(self, query: np.ndarray, nodes: List[int]) -> np.ndarray:
+        return 1.0 - self.vectors.rows(nodes) @ query
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        visited = set(entry_points)
+        distances = self._distances(query, entry_points)
+        candidates = [(float(d), n) for d, n in zip(distances, entry_points)]
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        layer = self.layers[level]
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -results[0][0] and len(results) >= ef:
+                break
+            neighbours = [n for n in layer.get(node, ()) if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+            for d, n in zip(self._distances(query, neighbours), neighbours):
+                d = float(d)
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-d, n) for d, n in results)
+
+    def _select_neighbours(self, found: List[Tuple[float, int]], m: int) -> List[int]:
+        # Diversity heuristic: skip candidates closer to an already selected
+        # neighbour than to the new node, which keeps clusters connected.
+        if len(found) <= m:
+            return [n for _, n in found]
+        nodes = [n for _, n in found]
+        vectors = self.vectors.rows(nodes)
+        pairwise = 1.0 - vectors @ vectors.T
+        selected: List[int] = []
+        for i, (distance, _) in enumerate(found):
+            if len(selected) >= m:
+                break
+            if selected and np.any(pairwise[i, selected] < distance):
+                continue
+            selected.append(i)
+        if len(selected) < m:
+            chosen = set(selected)
+            selected.extend(i for i in range(len(found)) if i not in chosen)
+        return [nodes[i] for i in selected[:m]]
+
+    def _add_one(self, node: int):
+        vector = self.vectors.rows(node)
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        while len(self.layers) <= level:
+            self.layers.append({})
+        for l in range(level + 1):
+            self.layers[l][node] = []
+        if self.entry is None:
+            self.entry = node
+            return
+
+        top = len(self.layers) - 1
+        entry_level = max(l for l in range(top + 1) if self.entry in self.layers[l])
+        entry_points = [self.entry]
+        for l in range(entry_level, level, -1):
+            entry_points = [self._search_layer(vector, entry_points, 1, l)[0][1]]
+        for l in range(min(level, entry_level), -1, -1):
+            found = [(d, n) for d, n in self._search_layer(vector, entry_points, self.ef_construction, l) if n != node]
+            neighbours = self._select_neighbours(found, self.m)
+            self.layers[l][node] = neighbours
+            limit = self.m0 if l == 0 else self.m
+            for n in neighbours:
+                links = self.layers[l][n]
+                links.append(node)
+                if len(links) > limit:
+                    order = np.argsort(self._distances(self.vectors.rows(n), links))[:limit]
+                    self.layers[l][n] = [links[i] for i in order]
+            entry_points = [n for _, n in found] or entry_points
+        if level > entry_level:
+            self.entry = node
+
+    def add(self, slots: Sequence[int]):
+        for slot in slots:
+            self._add_one(int(slot))
+
+    def remove(self, slots: Iterable[int]):
+        self.deleted.update(slots)
+
+    def search(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        if self.entry is None:
+            return []
+        entry_points = [self.entry]
+        entry_level = max(l for l in range(len(self.layers)) if self.entry in self.layers[l])
+        for l in range(entry_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, l)[0][1]]
+        # Tombstoned and filtered-out nodes still route the search but are never
+        # returned, so the candidate list grows with the share of rows excluded
+        ef = max(self.ef_search, k) + min(len(self.deleted), self.ef_search)
+        if allowed is not None:
+            ef = min(ef * max(1, self.vectors.count // max(len(allowed), 1)), max(ef, 8 * self.ef_search))
+        found = self._search_layer(query, entry_points, ef, 0)
+        hits = [(n, 1.0 - d) for d, n in found if n not in self.deleted]
+        if allowed is not None:
+            allowed_set = set(allowed.tolist())
+            hits = [(n, score) for n, score in hits if n in allowed_set]
+        return hits[:k]
+
+    def memory_bytes(self) -> int:
+        links = sum(len(neighbours) for layer in self.layers for neighbours in layer.values())
+        return self.vectors.count * self.vectors.dim * 4 + links * 8
+
+    def state(self) -> Dict[str, Any]:
+        return {"layers": self.layers, "entry": self.entry, "deleted": self.deleted, "rng": self._rng.getstate()}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.layers = state["layers"]
+        self.entry = state["entry"]
+        self.deleted = state["deleted"]
+        self._rng.setstate(state["rng"])
+
+
+class ScalarQuantizer:
+    """Per-dimension symmetric int8 codes: 4x smaller than float32."""
+
+    dtype = np.int8
+
+    def __init__(self):
+        self.scale: Optional[np.ndarray] = None
+
+    def train(self, data: np.ndarray):
+        self.scale = np.maximum(np.abs(data).max(axis=0), 1e-6) / 127.0
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(data / self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ (query * self.scale)
+
+    def code_bytes(self, dim: int) -> int:
+        return dim
+
+    @property
+    def nbytes(self) -> int:
+        return self.scale.nbytes if self.scale is not None else 0
+
+
+class ProductQuantizer:
+    """
+    Splits vectors into ``m`` sub-vectors and stores the nearest of ``ksub``
+    k-means centroids for each as one byte. Queries score codes through a
+    per-query lookup table (asymmetric distance computation).
+    """
+
+    dtype = np.uint8
+
+    def __init__(self, m: int = ANN_PQ_M, ksub: int = 256, seed: int = 42):
+        self.m = m
+        self.ksub = ksub
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None
+
+    def train(self, data: np.ndarray):
+        dim = data.shape[1]
+        # Use the largest sub-vector count <= m that divides the dimension
+        self.m = max(d for d in range(1, min(self.m, dim) + 1) if dim % d == 0)
+        dsub = dim // self.m
+        rng = np.random.default_rng(self.seed)
+        ksub = min(self.ksub, len(data))
+        self.codebooks = np.stack([
+            _kmeans(data[:, s * dsub:(s + 1) * dsub], ksub, rng) for s in range(self.m)
+        ])
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        dsub = self.codebooks.shape[2]
+        codes = np.empty((len(data), self.m), dtype=np.uint8)
+        for s, codebook in enumerate(self.codebooks):
+            codes[:, s] = _nearest_centroid(data[:, s * dsub:(s + 1) * dsub], codebook)
+        return codes
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        table = np.einsum("skd,sd->sk", self.codebooks, query.reshape(self.m, -1))
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for s in range(self.m):
+            scores += table[s].take(codes[:, s])
+        return scores
+
+    def code_bytes(self, dim: int) -> int:
+        return self.m
+
+    @property
+    def nbytes(self) -> int:
+        return self.codebooks.nbytes if self.codebooks is not None else 0
+
+
+class QuantizedIndex:
+    """
+    Scans compressed codes for the ``k * rescore_factor`` best approximate
+    matches, then re-scores those rows exactly from the float vectors. Rows
+    are scanned exactly until ``train_threshold`` rows exist to fit the quantizer.
+    """
+
+    kind = "quantized"
+    train_threshold = 1024
+
+    def __init__(self, vectors: VectorFile, quantizer, rescore_factor: int = ANN_RESCORE_FACTOR, seed: int = 42):
+        self.vectors = vectors
+        self.quantizer = quantizer
+        self.rescore_factor = rescore_factor
+        self.seed = seed
+        self.codes: Optional[np.ndarray] = None
+        self.size = 0
+        self.deleted: Set[int] = set()
+
+    def train(self, sample_size: int = 65536):
+        """Fit the quantizer on a sample of rows and encode every row."""
+        count = self.vectors.count
+        rng = np.random.default_rng(self.seed)
+        sample = np.arange(count) if count <= sample_size else np.sort(rng.choice(count, sample_size, replace=False))
+        self.quantizer.train(self.vectors.rows(sample))
+        self.codes, self.size = None, 0
+        self._encode(np.arange(count))
+
+    def _encode(self, slots: np.ndarray, batch: int = 65536):
+        needed = int(slots.max()) + 1
+        if self.codes is None or needed > len(self.codes):
+            capacity = max(needed, 2 * (len(self.codes) if self.codes is not None else _INITIAL_CAPACITY))
+            grown = np.zeros((capacity, self.quantizer.code_bytes(self.vectors.dim)), dtype=self.quantizer.dtype)
+            if self.codes is not None:
+                grown[:self.size] = self.codes[:self.size]
+            self.codes = grown
+        for start in range(0, len(slots), batch):
+            chunk = slots[start:start + batch]
+            self.codes[chunk] = self.quantizer.encode(self.vectors.rows(chunk))
+        self.size = max(self.size, needed)
+
+    def add(self, slots: Sequence[int]):
+        slots = np.asarray(slots, dtype=np.int64)
+        if self.codes is not None:
+            if len(slots):
+                self._encode(slots)
+        elif self.vectors.count >= self.train_threshold:
+            self.train()
+
+    def remove(self, slots: Iterable[int]):
+        self.deleted.update(slots)
+
+    def search(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None, batch: int = 4096) -> List[Tuple[int, float]]:
+        if self.codes is None:
+            slots = allowed if allowed is not None else np.arange(self.vectors.count)
+            return exact_search(self.vectors, query, k, slots, self.deleted)
+        if allowed is None:
+            slots = np.arange(self.size)
+            blocks = (self.codes[start:min(start + batch, self.size)] for start in range(0, self.size, batch))
+        else:
+            slots = allowed[allowed < self.size]
+            blocks = (self.codes[slots[start:start + batch]] for start in range(0, len(slots), batch))
+        # Score in cache-sized batches so decoded temporaries stay small
+        approximate = np.concatenate([self.quantizer.scores(query, block) for block in blocks]) \
+            if len(slots) else np.empty(0, dtype=np.float32)
+        if self.deleted:
+            approximate[np.isin(slots, list(self.deleted))] = -np.inf
+        candidates = np.array(sorted(slot for slot, _ in _top_k(slots, approximate, k * self.rescore_factor)), dtype=np.int64)
+        return exact_search(self.vectors, query, k, candidates)
+
+    def memory_bytes(self) -> int:
+        if self.codes is None:
+            return self.vectors.count * self.vectors.dim * 4
+        return self.size * self.codes.shape[1] + self.quantizer.nbytes
+
+    def state(self) -> Dict[str, Any]:
+        codes = self.codes[:self.size] if self.codes is not None else None
+        return {"quantizer": self.quantizer, "codes": codes, "deleted": self.deleted}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.quantizer = state["quantizer"]
+        self.codes = state["codes"]
+        self.size = len(self.codes) if self.codes is not None else 0
+        self.deleted = state["deleted"]
+
+
+class Int8Index(QuantizedIndex):
+    kind = "int8"
+
+    def __init__(self, vectors: VectorFile, rescore_factor: int = ANN_RESCORE_FACTOR, seed: int = 42):
+        super().__init__(vectors, ScalarQuantizer(), rescore_factor, seed)
+
+
+class PQIndex(QuantizedIndex):
+    kind = "pq"
+    train_threshold = 4096
+
+    def __init__(self, vectors: VectorFile, m: int = ANN_PQ_M, rescore_factor: int = ANN_RESCORE_FACTOR, seed: int = 42):
+        super().__init__(vectors, ProductQuantizer(m, seed=seed), rescore_factor, seed)
+
+
+INDEX_TYPES = {"flat": FlatIndex, "ivf": IVFIndex, "hnsw": HNSWIndex, "int8": Int8Index, "pq": PQIndex}
+
+
+def create_index(kind: str, vectors: VectorFile, **params):
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown ANN index type: {kind} (expected one of {', '.join(INDEX_TYPES)})")
+    return INDEX_TYPES[kind](vectors, **params)
+
+
+def save_index(index, path: str, count: int, writes: int = 0):
+    """
+    Atomically pickle an index's structure together with the row count and the
+    write sequence number it covers. Deletes leave the row count unchanged, so
+    the sequence number is what tells a saved index it missed a delete.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"kind": index.kind, "count": count, "writes": writes, "state": index.state()}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_index(index, path: str, count: int, writes: int = 0) -> bool:
+    """Restore a saved structure if it matches the current rows and writes; False if a rebuild is needed."""
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        saved = pickle.load(f)
+    if saved["kind"] != index.kind or saved["count"] != count or saved.get("writes", 0) != writes:
+        return False
+    index.load_state(saved["state"])
+    return True
+
+
+def exact_search(vectors: VectorFile, query: np.ndarray, k: int, slots: np.ndarray,
+                 deleted: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+    """Exact top ``k`` over the given (sorted) slots only."""
+    if deleted:
+        slots = slots[~np.isin(slots, list(deleted))]
+    if not len(slots):
+        return []
+    return _top_k(slots, vectors.rows(slots) @ query, k)
+
+
+def exact_search_batch(vectors: VectorFile, queries: np.ndarray, k: int, slots: np.ndarray,
+                       deleted: Optional[Set[int]] = None, block: int = 16384) -> List[List[Tuple[int, float]]]:
+    """
+    Exact top ``k`` of every row of ``queries`` over the given (sorted) slots.
+    Rows are scored in blocks against all queries at once and only a running
+    top ``k`` per query is kept, so memory stays bounded by ``block``.
+    """
+    if deleted:
+        slots = slots[~np.isin(slots, list(deleted))]
+    if not len(slots) or not len(queries):
+        return [[] for _ in range(len(queries))]
+    best_slots = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(slots), block):
+        block_slots = slots[start:start + block]
+        scores = queries @ vectors.rows(block_slots).T
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        best_slots = np.concatenate([best_slots, np.broadcast_to(block_slots, scores.shape)], axis=1)
+        if best_scores.shape[1] > k:
+            part = np.argpartition(-best_scores, k, axis=1)[:, :k]
+            best_scores = np.take_along_axis(best_scores, part, axis=1)
+            best_slots = np.take_along_axis(best_slots, part, axis=1)
+    order = np.argsort(-best_scores, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_slots = np.take_along_axis(best_slots, order, axis=1)
+    return [
+        [(int(slot), float(score)) for slot, score in zip(row_slots, row_scores) if np.isfinite(score)]
+        for row_slots, row_scores in zip(best_slots, best_scores)
+    ]
+
+
+def search_batch(index, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+    """Batched search through any index: natively when it supports it, else one query at a time."""
+    if hasattr(index, "search_batch"):
+        return index.search_batch(queries, k, allowed)
+    return [index.search(query, k, allowed) for query in queries]
+
+
+def _top_k(slots: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    if len(scores) > k:
+        part = np.argpartition(-scores, k)[:k]
+    else:
+        part = np.arange(len(scores))
+    order = part[np.argsort(-scores[part])]
+    return [(int(slots[i]), float(scores[i])) for i in order if np.isfinite(scores[i])]
+
+
+def _nearest_centroid(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids ** 2).sum(axis=1) - 2 * data @ centroids.T
+    return np.argmin(distances, axis=1)
+
+
+def _kmeans(data: np.ndarray, k: int, rng: np.random.Generator, iterations: int = 15) -> np.ndarray:
+    """Plain (Euclidean) k-means returning ``k`` centroids."""
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest_centroid(data, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
@@ -1,4 +1,6 @@
 
+import json
+
 import gradio as gr
 import requests
 
@@ -12,6 +14,38 @@ def query_rag(query: str) -> str:
     except requests.exceptions.RequestException as e:
         return f"Error querying RAG: {e}"
 
+def iter_sse(response):
+    """Parses a Server-Sent Events response into (event, data) pairs."""
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data.append(line[len("data: "):])
+        elif not line and event:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+def query_rag_stream(query: str):
+    # Yields the growing answer so Gradio renders tokens as they arrive
+    try:
+        with requests.post(f"{BACKEND_URL}/query_rag/stream", json={"query": query}, stream=True) as response:
+            response.raise_for_status()
+            answer, sources = "", []
+            for event, data in iter_sse(response):
+                if event == "sources":
+                    sources = [s["metadata"].get("source", "unknown") for s in data]
+                elif event == "token":
+                    answer += data
+                    yield answer
+                elif event == "error":
+                    yield f"Error querying RAG: {data}"
+                    return
+            if sources:
+                yield answer + "\n\nSources:\n" + "\n".join(f"- {source}" for source in dict.fromkeys(sources))
+    except requests.exceptions.RequestException as e:
+        yield f"Error querying RAG: {e}"
+
 def run_mcp(query: str, agent_type: str, task_type: str, task_kwargs: str) -> str:
     try:
         # task_kwargs is a string, try to parse it as JSON
@@ -39,7 +73,7 @@ with gr.Blocks() as demo:
         rag_query_input = gr.Textbox(label="Enter your RAG query:", placeholder="e.g., What are the key differences between PRINCE2 and MSP?")
         rag_output = gr.Textbox(label="RAG Response", interactive=False)
         rag_button = gr.Button("Get RAG Response")
-        rag_button.click(query_rag, inputs=rag_query_input, outputs=rag_output)
+        rag_button.click(query_rag_stream, inputs=rag_query_input, outputs=rag_output)
 
     with gr.Tab("MCP Query"):
         mcp_query_input = gr.Textbox(label="Enter your MCP query:", placeholder="e.g., Explain the 7 principles of PRINCE2.")
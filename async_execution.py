@@ -0,0 +1,170 @@
+"""
+Async execution layer for the API.
+Keeps slow LLM, retrieval and agent calls off the event loop: coroutine
+functions are awaited natively, blocking ones run on a bounded thread pool.
+Each endpoint gets its own concurrency limit, waiting-room size and timeout.
+"""
+
+import os
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "16"))
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "8"))
+RAG_MAX_WAITING = int(os.getenv("RAG_MAX_WAITING", "64"))
+RAG_TIMEOUT_SECONDS = float(os.getenv("RAG_TIMEOUT_SECONDS", "120"))
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "2"))
+MCP_MAX_WAITING = int(os.getenv("MCP_MAX_WAITING", "16"))
+MCP_TIMEOUT_SECONDS = float(os.getenv("MCP_TIMEOUT_SECONDS", "600"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "2"))
+BATCH_MAX_WAITING = int(os.getenv("BATCH_MAX_WAITING", "8"))
+BATCH_TIMEOUT_SECONDS = float(os.getenv("BATCH_TIMEOUT_SECONDS", "300"))
+CRAWL_MAX_CONCURRENCY = int(os.getenv("CRAWL_MAX_CONCURRENCY", "2"))
+CRAWL_MAX_WAITING = int(os.getenv("CRAWL_MAX_WAITING", "8"))
+# How long a crawl request may wait for a free slot
+CRAWL_WAIT_TIMEOUT_SECONDS = float(os.getenv("CRAWL_WAIT_TIMEOUT_SECONDS", "60"))
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "2"))
+BULK_MAX_WAITING = int(os.getenv("BULK_MAX_WAITING", "8"))
+# How long a bulk ingestion request may wait for a free slot
+BULK_WAIT_TIMEOUT_SECONDS = float(os.getenv("BULK_WAIT_TIMEOUT_SECONDS", "60"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class ConcurrencyLimitError(Exception):
+    """Raised when an endpoint already has as many waiting calls as it accepts."""
+
+
+class ExecutionTimeoutError(Exception):
+    """Raised when a call does not finish within its endpoint's timeout."""
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """The shared thread pool used for blocking calls."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="blocking-call")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a short blocking call on the shared pool without any endpoint limit."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+class EndpointLimiter:
+    """
+    Bounds how many calls of one endpoint run at once, how many may wait for
+    a slot and how long a call (including its wait) may take.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, timeout: float, max_waiting: int = 0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._active = 0
+        self._stats = {"completed": 0, "failed": 0, "timeouts": 0, "rejected": 0, "seconds": 0.0}
+
+    def _deadline(self) -> float:
+        return asyncio.get_running_loop().time() + self.timeout
+
+    def _remaining(self, deadline: float) -> float:
+        return max(0.0, deadline - asyncio.get_running_loop().time())
+
+    async def _acquire(self, deadline: float):
+        if self._semaphore.locked() and self.max_waiting and self._waiting >= self.max_waiting:
+            self._stats["rejected"] += 1
+            raise ConcurrencyLimitError(f"Too many concurrent {self.name} requests")
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._remaining(deadline))
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise ExecutionTimeoutError(f"{self.name} request timed out waiting for a free slot")
+        finally:
+            self._waiting -= 1
+        self._active += 1
+
+    def _release(self):
+        self._active -= 1
+        self._semaphore.release()
+
+    def _record(self, start: float, outcome: str):
+        self._stats[outcome] += 1
+        self._stats["seconds"] += time.perf_counter() - start
+
+    async def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable on the shared thread pool within this endpoint's limits."""
+        deadline = self._deadline()
+        await self._acquire(deadline)
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+        # A thread cannot be interrupted, so its slot is only freed once it really finishes
+        future.add_done_callback(lambda _: self._release())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self._remaining(deadline))
+        except asyncio.TimeoutError:
+            self._record(start, "timeouts")
+            raise ExecutionTimeoutError(f"{self.name} request timed out after {self.timeout:.0f}s")
+        except Exception:
+            self._record(start, "failed")
+            raise
+        self._record(start, "completed")
+        return result
+
+    async def call_async(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await a native coroutine function within this endpoint's limits."""
+        deadline = self._deadline()
+        await self._acquire(deadline)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), self._remaining(deadline))
+        except asyncio.TimeoutError:
+            self._record(start, "timeouts")
+            raise ExecutionTimeoutError(f"{self.name} request timed out after {self.timeout:.0f}s")
+        except Exception:
+            self._record(start, "failed")
+            raise
+        finally:
+            self._release()
+        self._record(start, "completed")
+        return result
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for work with no overall deadline, e.g. a token stream."""
+        await self._acquire(self._deadline())
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        finished = stats["completed"] + stats["failed"] + stats["timeouts"]
+        seconds = stats.pop("seconds")
+        stats["avg_seconds"] = round(seconds / finished, 3) if finished else 0.0
+        stats.update({
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_waiting": self.max_waiting,
+            "timeout": self.timeout,
+        })
+        return stats
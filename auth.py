@@ -31,6 +31,7 @@ class UserCreate(BaseModel):
     email: str
     password: str
     full_name: Optional[str] = None
+    team: Optional[str] = None
 
 class UserLogin(BaseModel):
     username: str
@@ -46,6 +47,7 @@ class User(BaseModel):
     username: str
     email: str
     full_name: Optional[str] = None
+    team: Optional[str] = None
     is_active: bool = True
     created_at: datetime
 
@@ -68,11 +70,17 @@ class AuthManager:
                     email TEXT UNIQUE NOT NULL,
                     password_hash TEXT NOT NULL,
                     full_name TEXT,
+                    team TEXT,
                     is_active BOOLEAN DEFAULT TRUE,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
             
+            # Databases created before tenant routing have no team column
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(users)")}
+            if 'team' not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN team TEXT")
+            
             # Create default admin user if no users exist
             cursor = conn.execute("SELECT COUNT(*) FROM users")
             if cursor.fetchone()[0] == 0:
@@ -111,15 +119,15 @@ class AuthManager:
             
             with self._get_db_connection() as conn:
                 cursor = conn.execute("""
-                    INSERT INTO users (username, email, password_hash, full_name)
-                    VALUES (?, ?, ?, ?)
-                """, (user_data.username, user_data.email, password_hash, user_data.full_name))
+                    INSERT INTO users (username, email, password_hash, full_name, team)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (user_data.username, user_data.email, password_hash, user_data.full_name, user_data.team))
                 
                 user_id = cursor.lastrowid
                 
                 # Fetch the created user
                 user_row = conn.execute("""
-                    SELECT id, username, email, full_name, is_active, created_at
+                    SELECT id, username, email, full_name, team, is_active, created_at
                     FROM users WHERE id = ?
                 """, (user_id,)).fetchone()
                 
@@ -128,6 +136,7 @@ class AuthManager:
                     username=user_row['username'],
                     email=user_row['email'],
                     full_name=user_row['full_name'],
+                    team=user_row['team'],
                     is_active=bool(user_row['is_active']),
                     created_at=datetime.fromisoformat(user_row['created_at'])
                 )
@@ -153,7 +162,7 @@ class AuthManager:
         """Authenticate a user with username and password."""
         with self._get_db_connection() as conn:
             user_row = conn.execute("""
-                SELECT id, username, email, password_hash, full_name, is_active, created_at
+                SELECT id, username, email, password_hash, full_name, team, is_active, created_at
                 FROM users WHERE username = ? AND is_active = TRUE
             """, (username,)).fetchone()
             
@@ -169,6 +178,7 @@ class AuthManager:
                 username=user_row['username'],
                 email=user_row['email'],
                 full_name=user_row['full_name'],
+                team=user_row['team'],
                 is_active=bool(user_row['is_active']),
                 created_at=datetime.fromisoformat(user_row['created_at'])
             )
@@ -177,7 +187,7 @@ class AuthManager:
         """Get a user by ID."""
         with self._get_db_connection() as conn:
             user_row = conn.execute("""
-                SELECT id, username, email, full_name, is_active, created_at
+                SELECT id, username, email, full_name, team, is_active, created_at
                 FROM users WHERE id = ? AND is_active = TRUE
             """, (user_id,)).fetchone()
             
@@ -189,6 +199,7 @@ class AuthManager:
                 username=user_row['username'],
                 email=user_row['email'],
                 full_name=user_row['full_name'],
+                team=user_row['team'],
                 is_active=bool(user_row['is_active']),
                 created_at=datetime.fromisoformat(user_row['created_at'])
             )
@@ -201,6 +212,7 @@ class AuthManager:
             "sub": str(user.id),
             "username": user.username,
             "email": user.email,
+            "team": user.team,
             "exp": expire,
             "iat": datetime.utcnow(),
             "type": "access"
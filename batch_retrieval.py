@@ -0,0 +1,153 @@
+"""
+Batch retrieval for offline evaluation and pipeline jobs.
+All queries of a request are embedded in one batched call and each collection
+is searched once for the whole batch (a single multi-query request to Chroma,
+one matrix product per block of rows in the local store), with BM25 hits
+fused in per query, so callers get ranked chunks with scores and metadata
+instead of an LLM answer.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from backend.ingestion.embedding_cache import content_hash
+from backend.ingestion.vector_store_writer import CHROMA_COLLECTION, get_vector_store
+from backend.retrieval.bm25_index import BM25_INDEX_ENABLED, get_bm25_index
+from backend.retrieval.hybrid_retriever import HYBRID_FETCH_K, HYBRID_RETRIEVAL_ENABLED, RRF_K, reciprocal_rank_fusion
+
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "1000"))
+BATCH_MAX_TEXTS = int(os.getenv("BATCH_MAX_TEXTS", "2000"))
+BATCH_MAX_K = int(os.getenv("BATCH_MAX_K", "100"))
+
+
+def embed_queries(embeddings, queries: Sequence[str]) -> List[List[float]]:
+    """Query vectors in one batched call when the embeddings support it."""
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(list(queries))
+    return [embeddings.embed_query(query) for query in queries]
+
+
+def batch_dense_search(
+    vectordb,
+    vectors: Sequence[List[float]],
+    k: int,
+    filter: Optional[Dict[str, Any]] = None,
+) -> List[List[Tuple[Document, Optional[float]]]]:
+    """(document, distance) pairs per query vector, nearest first, with one search per batch where possible."""
+    if not vectors:
+        return []
+    if hasattr(vectordb, "similarity_search_with_score_by_vectors"):
+        return vectordb.similarity_search_with_score_by_vectors(vectors, k, filter)
+    collection = getattr(vectordb, "_collection", None)
+    if collection is not None:
+        # Chroma answers every query embedding in a single request
+        result = collection.query(
+            query_embeddings=list(vectors), n_results=k, where=filter, include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [(Document(id=doc_id, page_content=text or "", metadata=metadata or {}), distance)
+             for doc_id, text, metadata, distance in zip(ids, texts, metadatas, distances)]
+            for ids, texts, metadatas, distances in zip(
+                result["ids"], result["documents"], result["metadatas"], result["distances"]
+            )
+        ]
+    search_kwargs = {"filter": filter} if filter is not None else {}
+    return [[(doc, None) for doc in vectordb.similarity_search_by_vector(vector, k=k, **search_kwargs)] for vector in vectors]
+
+
+def _relevance_fn(vectordb):
+    try:
+        return vectordb._select_relevance_score_fn()
+    except (AttributeError, NotImplementedError, ValueError):
+        return lambda distance: -distance
+
+
+class BatchRetriever:
+    """
+    Retrieves the top ``k`` chunks for many queries at once from one or more
+    collections. With a single dense ranking a hit's ``score`` is the store's
+    relevance (higher is better); when BM25 or several collections contribute,
+    rankings are merged with reciprocal rank fusion and ``score`` is the fused
+    score. Each hit also carries its dense ``distance`` and ``bm25`` score when
+    it was found by that search.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        collections: Sequence[str] = (CHROMA_COLLECTION,),
+        hybrid: bool = HYBRID_RETRIEVAL_ENABLED and BM25_INDEX_ENABLED,
+        fetch_k: int = HYBRID_FETCH_K,
+        rrf_k: int = RRF_K,
+    ):
+        self.embeddings = embeddings
+        self.collections = list(collections)
+        self.hybrid = hybrid
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+    def retrieve(self, queries: Sequence[str], k: int = 10, filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Ranked hits for every query, in query order."""
+        if not queries:
+            return []
+        vectors = embed_queries(self.embeddings, queries)
+        fused = self.hybrid or len(self.collections) > 1
+        fetch_k = max(k, self.fetch_k) if fused else k
+        hits: List[Dict[str, Dict[str, Any]]] = [{} for _ in queries]
+        rankings: List[List[List[str]]] = [[] for _ in queries]
+
+        for collection in self.collections:
+            vectordb = get_vector_store(collection)
+            relevance = _relevance_fn(vectordb)
+            dense = batch_dense_search(vectordb, vectors, fetch_k, filter)
+            for position, results in enumerate(dense):
+                ranking = []
+                for doc, distance in results:
+                    hit = self._hit(hits[position], doc, collection)
+                    hit["distance"] = distance
+                    if not fused and distance is not None:
+                        hit["score"] = relevance(distance)
+                    ranking.append(hit["id"])
+                rankings[position].append(ranking)
+
+            if self.hybrid:
+                bm25_index = get_bm25_index(collection)
+                for position, query in enumerate(queries):
+                    lexical = bm25_index.search(query, fetch_k, filter=filter)
+                    missing = [doc_id for doc_id, _ in lexical if doc_id not in hits[position]]
+                    for doc in bm25_index.get_documents(missing).values():
+                        self._hit(hits[position], doc, collection)
+                    for doc_id, score in lexical:
+                        if doc_id in hits[position]:
+                            hits[position][doc_id]["bm25"] = score
+                    rankings[position].append([doc_id for doc_id, _ in lexical if doc_id in hits[position]])
+
+        results = []
+        for position in range(len(queries)):
+            if fused:
+                ranked = []
+                for doc_id, score in reciprocal_rank_fusion(rankings[position], rrf_k=self.rrf_k)[:k]:
+                    hits[position][doc_id]["score"] = score
+                    ranked.append(hits[position][doc_id])
+            else:
+                ranked = [hits[position][doc_id] for doc_id in rankings[position][0][:k]]
+            results.append(ranked)
+        return results
+
+    @staticmethod
+    def _hit(hits: Dict[str, Dict[str, Any]], doc: Document, collection: str) -> Dict[str, Any]:
+        doc_id = doc.id or content_hash(doc.page_content)
+        hit = hits.get(doc_id)
+        if hit is None:
+            hit = hits[doc_id] = {
+                "id": doc_id,
+                "content": doc.page_content,
+                "metadata": doc.metadata,
+                "collection": collection,
+                "score": None,
+                "distance": None,
+                "bm25": None,
+            }
+        return hit
@@ -0,0 +1,295 @@
+"""
+Persistent BM25 inverted index.
+Maintained alongside Chroma by the vector store writer so exact terms such as
+acronyms, process names and section numbers can be matched lexically. Postings
+and document lengths are held in memory for fast scoring, along with
+postings for the metadata filter fields; chunk text and full metadata stay
+in SQLite and are only read for the documents returned. Every write bumps a
+per-collection version stored with the chunks, so an index whose collection
+was written by another process (the bulk or crawler CLI, another worker)
+reloads its postings before the next search.
+"""
+
+import os
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from backend.retrieval.metadata_filters import MetadataIndex
+
+BM25_INDEX_ENABLED = os.getenv("BM25_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "./bm25_index.db")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Keeps dotted/hyphenated codes such as "4.2.1" or "ITIL-4" together
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound codes are indexed whole and by their parts."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = re.split(r"[.\-/]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+class BM25Index:
+    """
+    Incrementally updated BM25 index over one collection's chunks.
+    """
+
+    def __init__(self, collection_name: str, db_path: str = BM25_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B):
+        self.collection_name = collection_name
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._metadata = MetadataIndex()
+        # Stored version the in-memory postings reflect
+        self._version = 0
+        self._lock = threading.RLock()
+        self._init_database()
+        self._load()
+
+    def _init_database(self):
+        """Initialize the index tables."""
+        with self._get_db_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bm25_documents (
+                    collection TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    terms TEXT NOT NULL,
+                    PRIMARY KEY (collection, id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bm25_versions (
+                    collection TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _get_db_connection(self):
+        """Get a database connection with proper cleanup."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _load(self):
+        # Caller holds self._lock (or is the constructor)
+        with self._get_db_connection() as conn:
+            # Read before the rows: a write landing in between only causes one more reload
+            self._version = self._stored_version(conn)
+            rows = conn.execute("SELECT id, metadata, terms FROM bm25_documents WHERE collection = ?", (self.collection_name,))
+            for row in rows:
+                self._index_terms(row["id"], json.loads(row["terms"]))
+                self._metadata.add(row["id"], json.loads(row["metadata"]))
+
+    def _clear(self):
+        # Caller holds self._lock
+        self._postings.clear()
+        self._lengths.clear()
+        self._metadata.clear()
+        self._total_length = 0
+
+    def _stored_version(self, conn) -> int:
+        row = conn.execute("SELECT version FROM bm25_versions WHERE collection = ?", (self.collection_name,)).fetchone()
+        return row["version"] if row else 0
+
+    def _bump_version(self, conn):
+        # Caller holds self._lock, inside the transaction that wrote the chunks
+        conn.execute("""
+            INSERT INTO bm25_versions (collection, version) VALUES (?, 1)
+            ON CONFLICT(collection) DO UPDATE SET version = version + 1
+        """, (self.collection_name,))
+        version = self._stored_version(conn)
+        # Any other gap means another process wrote too; refresh() reloads then
+        if version == self._version + 1:
+            self._version = version
+
+    def refresh(self) -> bool:
+        """Reload the postings if another process changed the collection; True if reloaded."""
+        with self._lock:
+            with self._get_db_connection() as conn:
+                if self._stored_version(conn) == self._version:
+                    return False
+            self._clear()
+            self._load()
+            return True
+
+    def _index_terms(self, doc_id: str, terms: Dict[str, int]):
+        # Caller holds self._lock (or is the constructor)
+        for term, frequency in terms.items():
+            self._postings[term][doc_id] = frequency
+        length = sum(terms.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+
+    def _unindex(self, doc_id: str, terms: Iterable[str]):
+        # Caller holds self._lock
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id, 0)
+
+    def _stored_terms(self, conn, doc_id: str) -> Optional[Dict[str, int]]:
+        row = conn.execute("SELECT terms FROM bm25_documents WHERE collection = ? AND id = ?",
+                           (self.collection_name, doc_id)).fetchone()
+        return json.loads(row["terms"]) if row else None
+
+    def add(self, documents: List[Document], ids: List[str]):
+        """Index (or re-index) chunks under their vector store ids."""
+        with self._lock, self._get_db_connection() as conn:
+            rows = []
+            for document, doc_id in zip(documents, ids):
+                if doc_id in self._lengths:
+                    self._unindex(doc_id, self._stored_terms(conn, doc_id) or {})
+                terms = dict(Counter(tokenize(document.page_content)))
+                self._index_terms(doc_id, terms)
+                self._metadata.add(doc_id, document.metadata)
+                rows.append((self.collection_name, doc_id, document.page_content,
+                             json.dumps(document.metadata, default=str), json.dumps(terms)))
+            conn.executemany("""
+                INSERT OR REPLACE INTO bm25_documents (collection, id, content, metadata, terms)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            self._bump_version(conn)
+
+    def delete(self, ids: List[str]):
+        with self._lock, self._get_db_connection() as conn:
+            for doc_id in ids:
+                terms = self._stored_terms(conn, doc_id)
+                if terms is not None:
+                    self._unindex(doc_id, terms)
+                self._metadata.remove(doc_id)
+            conn.executemany("DELETE FROM bm25_documents WHERE collection = ? AND id = ?",
+                             [(self.collection_name, doc_id) for doc_id in ids])
+            self._bump_version(conn)
+
+    def search(self, query: str, k: int = 20, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """
+        Top ``k`` (id, score) pairs for a query, best first. A Chroma-style
+        ``filter`` restricts scoring to chunks whose metadata matches it.
+        """
+        terms = set(tokenize(query))
+        scores: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            self.refresh()
+            count = len(self._lengths)
+            if not count:
+                return []
+            allowed = self._metadata.select(filter) if filter is not None else None
+            if allowed is not None and not allowed:
+                return []
+            average_length = self._total_length / count
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                # IDF stays collection-wide so scores are comparable across scopes
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if allowed is not None:
+                    if len(allowed) < len(postings):
+                        postings = {doc_id: postings[doc_id] for doc_id in allowed if doc_id in postings}
+                    else:
+                        postings = {doc_id: frequency for doc_id, frequency in postings.items() if doc_id in allowed}
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def get_documents(self, ids: List[str]) -> Dict[str, Document]:
+        """Load the stored chunks for the given ids."""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._get_db_connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, content, metadata FROM bm25_documents WHERE collection = ? AND id IN ({placeholders})",
+                [self.collection_name, *ids],
+            ).fetchall()
+        return {row["id"]: Document(id=row["id"], page_content=row["content"], metadata=json.loads(row["metadata"]))
+                for row in rows}
+
+    def rebuild_from(self, vectordb, batch_size: int = 1000) -> int:
+        """Re-index every chunk already stored in a Chroma collection."""
+        with self._lock:
+            with self._get_db_connection() as conn:
+                conn.execute("DELETE FROM bm25_documents WHERE collection = ?", (self.collection_name,))
+                self._bump_version(conn)
+            self._clear()
+            offset = 0
+            while True:
+                batch = vectordb.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+                if not batch["ids"]:
+                    break
+                self.add(
+                    [Document(page_content=text or "", metadata=metadata or {})
+                     for text, metadata in zip(batch["documents"], batch["metadatas"])],
+                    batch["ids"],
+                )
+                offset += len(batch["ids"])
+        return len(self._lengths)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            count = len(self._lengths)
+            return {
+                "documents": count,
+                "terms": len(self._postings),
+                "avg_document_length": round(self._total_length / count, 1) if count else 0.0,
+            }
+
+
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(collection_name: str) -> BM25Index:
+    """Return the process-wide BM25 index for a collection."""
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            index = BM25Index(collection_name)
+            _indexes[collection_name] = index
+        return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.ingestion.vector_store_writer import CHROMA_COLLECTION, get_vector_store
+
+    parser = argparse.ArgumentParser(description="Rebuild the BM25 index from an existing Chroma collection.")
+    parser.add_argument("--collection", default=CHROMA_COLLECTION, help="Chroma collection to index")
+    args = parser.parse_args()
+
+    indexed = get_bm25_index(args.collection).rebuild_from(get_vector_store(args.collection))
+    print(f"Indexed {indexed} chunks from collection {args.collection}")
@@ -0,0 +1,194 @@
+"""
+Bulk ingestion of directories, glob patterns and zip archives.
+Detects file types, fans files out across worker threads and streams
+per-file progress followed by an end-to-end throughput summary.
+"""
+
+import os
+import glob
+import json
+import logging
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from backend.ingestion.file_types import detect_file_type
+from backend.ingestion.manifest import file_sha256
+
+logger = logging.getLogger(__name__)
+
+BULK_INGEST_WORKERS = int(os.getenv("BULK_INGEST_WORKERS", "4"))
+BULK_EXTRACT_DIR = os.getenv("BULK_EXTRACT_DIR", "./data/bulk")
+# Limits checked against an archive's directory before anything is extracted:
+# total uncompressed size, number of entries, and per-entry compression ratio
+BULK_ARCHIVE_MAX_BYTES = int(os.getenv("BULK_ARCHIVE_MAX_BYTES", str(4 * 1024 ** 3)))
+BULK_ARCHIVE_MAX_ENTRIES = int(os.getenv("BULK_ARCHIVE_MAX_ENTRIES", "50000"))
+BULK_ARCHIVE_MAX_RATIO = float(os.getenv("BULK_ARCHIVE_MAX_RATIO", "200"))
+
+
+def extract_archive(
+    archive_path: str,
+    extract_root: str = BULK_EXTRACT_DIR,
+    max_bytes: int = BULK_ARCHIVE_MAX_BYTES,
+    max_entries: int = BULK_ARCHIVE_MAX_ENTRIES,
+    max_ratio: float = BULK_ARCHIVE_MAX_RATIO,
+) -> str:
+    """
+    Extracts a zip archive into a directory named after its content hash, so
+    re-uploading the same archive maps to the same paths (and manifests).
+    Raises ValueError for entries outside the target directory and for archives
+    over the size, entry count or compression ratio limits (zip bombs).
+    zipfile never inflates an entry past its declared size, so checking the
+    declared sizes bounds what extraction writes.
+    """
+    name = os.path.splitext(os.path.basename(archive_path))[0]
+    target = os.path.abspath(os.path.join(extract_root, f"{name}-{file_sha256(archive_path)[:16]}"))
+    with zipfile.ZipFile(archive_path) as archive:
+        members = archive.infolist()
+        if len(members) > max_entries:
+            raise ValueError(f"Archive {archive_path} has {len(members)} entries (limit {max_entries})")
+        total = 0
+        for member in members:
+            destination = os.path.abspath(os.path.join(target, member.filename))
+            if not destination.startswith(target + os.sep):
+                raise ValueError(f"Unsafe path in archive {archive_path}: {member.filename}")
+            if member.file_size > max_ratio * max(member.compress_size, 1):
+                raise ValueError(f"Entry {member.filename} of archive {archive_path} exceeds the compression ratio limit")
+            total += member.file_size
+            if total > max_bytes:
+                raise ValueError(f"Archive {archive_path} expands to more than {max_bytes} bytes")
+        if not os.path.isdir(target):
+            archive.extractall(target)
+    return target
+
+
+def discover_files(source: str, extract_root: str = BULK_EXTRACT_DIR) -> Iterator[str]:
+    """Yields every file under a directory, matching a glob, or inside a zip archive."""
+    # DOCX and PPTX files are zip packages too, but are ingested as documents
+    if os.path.isfile(source) and zipfile.is_zipfile(source) and detect_file_type(source) is None:
+        source = extract_archive(source, extract_root)
+
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+    elif os.path.isfile(source):
+        yield source
+    else:
+        for path in sorted(glob.iglob(source, recursive=True)):
+            if os.path.isfile(path):
+                yield path
+
+
+class BulkIngestor:
+    """
+    Ingests many files through an IngestionManager in parallel.
+    """
+
+    def __init__(
+        self,
+        ingestion_manager,
+        workers: int = BULK_INGEST_WORKERS,
+        parse: Optional[Callable[[str, str], Iterable[Any]]] = None,
+        extract_root: str = BULK_EXTRACT_DIR,
+        collection_name: Optional[str] = None,
+    ):
+        self.ingestion_manager = ingestion_manager
+        self.workers = max(1, workers)
+        self.parse = parse
+        self.extract_root = extract_root
+        self.collection_name = collection_name
+
+    def _ingest_one(self, file_path: str, file_type: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        event = {"event": "file", "path": file_path, "file_type": file_type}
+        try:
+            # Chunks stay in the shared writer so they are coalesced across files
+            routing = {"collection_name": self.collection_name} if self.collection_name else {}
+            result = self.ingestion_manager.ingest_document(
+                file_path, file_type, parse=self.parse, flush=False, **routing
+            ) or {}
+            event.update({
+                "status": "skipped" if result.get("skipped") else "done",
+                "chunks": result.get("chunks", 0),
+                "added": result.get("added", 0),
+                "deleted": result.get("deleted", 0),
+            })
+        except Exception as e:
+            logger.error(f"Bulk ingestion of {file_path} failed: {e}")
+            event.update({"status": "failed", "error": str(e)})
+        event["seconds"] = round(time.perf_counter() - start, 3)
+        return event
+
+    def run(self, source: str) -> Iterator[Dict[str, Any]]:
+        """
+        Ingests everything under ``source`` and yields one event per file as it
+        finishes, then a final summary event with documents/sec and chunks/sec.
+        Chunks are written in coalesced batches; the summary follows the final flush.
+        """
+        started = time.perf_counter()
+        totals = {"done": 0, "skipped": 0, "failed": 0, "ignored": 0, "chunks": 0, "added": 0}
+
+        def record(event: Dict[str, Any]) -> Dict[str, Any]:
+            totals[event["status"]] += 1
+            totals["chunks"] += event.get("chunks", 0)
+            totals["added"] += event.get("added", 0)
+            return event
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = set()
+            for file_path in discover_files(source, self.extract_root):
+                file_type = detect_file_type(file_path)
+                if file_type is None:
+                    yield record({"event": "file", "path": file_path, "status": "ignored"})
+                    continue
+                in_flight.add(executor.submit(self._ingest_one, file_path, file_type))
+                # Bound the number of queued files so huge directories stream steadily
+                if len(in_flight) >= self.workers * 4:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield record(future.result())
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield record(future.result())
+
+        write_error = None
+        try:
+            if self.collection_name:
+                self.ingestion_manager.writer_for(self.collection_name).flush()
+            else:
+                self.ingestion_manager.writer.flush()
+        except Exception as e:
+            # Manifests of the affected files were not saved, so they are retried next run
+            logger.error(f"Final bulk ingestion flush failed: {e}")
+            write_error = str(e)
+
+        seconds = time.perf_counter() - started
+        documents = totals["done"] + totals["skipped"]
+        yield {
+            "event": "summary",
+            "source": source,
+            "files": documents + totals["failed"],
+            **totals,
+            "seconds": round(seconds, 3),
+            "documents_per_second": round(documents / seconds, 2) if seconds else 0.0,
+            "chunks_per_second": round(totals["added"] / seconds, 2) if seconds else 0.0,
+            "write_error": write_error,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.ingestion.ingestion_manager import IngestionManager
+
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory, glob pattern or zip archive.")
+    parser.add_argument("source", help="Directory, glob pattern (quote it) or .zip archive")
+    parser.add_argument("--workers", type=int, default=BULK_INGEST_WORKERS, help="Parallel ingestion workers")
+    args = parser.parse_args()
+
+    for event in BulkIngestor(IngestionManager(), workers=args.workers).run(args.source):
+        print(json.dumps(event), flush=True)
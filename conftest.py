@@ -1,6 +1,6 @@
 
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
 import os
 import sys
@@ -23,6 +23,7 @@ patch("langchain_community.llms.ollama.Ollama", mock_ollama_class).start()
 # Mock RetrievalQA.from_chain_type
 mock_qa_chain_instance = MagicMock()
 mock_qa_chain_instance.invoke.return_value = {"result": "Mocked RAG response"}
+mock_qa_chain_instance.ainvoke = AsyncMock(return_value={"result": "Mocked RAG response"})
 patch("langchain.chains.RetrievalQA.from_chain_type", MagicMock(return_value=mock_qa_chain_instance)).start()
 
 # Now, import the app and get_current_user after patching
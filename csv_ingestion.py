@@ -1,44 +1,82 @@
-
+import os
 import pandas as pd
+from typing import Iterator, List, Optional, Sequence
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+
+# Rows parsed per pandas batch when streaming a CSV; memory is bounded by this, not the file size
+CSV_READ_CHUNK_ROWS = int(os.getenv("CSV_READ_CHUNK_ROWS", "10000"))
+# Target characters per chunk; chunks always end on a row boundary
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "1000"))
+
+def serialize_row(columns: Sequence[str], values: Sequence[str]) -> str:
+    """Compact header-keyed record of a row, e.g. "Name: Alice; Age: 30". Empty cells are left out."""
+    return "; ".join(f"{column}: {value}" for column, value in zip(columns, values) if value != "")
 
-def ingest_csv(file_path: str, collection_name: str = "my_documents"):
+def iter_csv_windows(
+    file_path: str,
+    read_chunk_rows: int = CSV_READ_CHUNK_ROWS,
+    chunk_size: int = CSV_CHUNK_SIZE,
+) -> Iterator[List[Document]]:
+    """
+    Streams a CSV file in batches of ``read_chunk_rows`` rows and yields the
+    chunks completed by each batch. Rows are packed into chunks of about
+    ``chunk_size`` characters without ever splitting a row (a single longer row
+    is split on its own), and each chunk carries the zero-based, inclusive
+    range of data rows it came from.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0)
+    lines: List[str] = []
+    size = row_start = row = 0
+    try:
+        # Every cell stays a string so values are embedded exactly as exported
+        batches = pd.read_csv(file_path, chunksize=read_chunk_rows, dtype=str, keep_default_na=False)
+        for batch in batches:
+            columns = [str(column).strip() for column in batch.columns]
+            window: List[Document] = []
+            for values in batch.itertuples(index=False, name=None):
+                record = serialize_row(columns, values)
+                if lines and size + len(record) + 1 > chunk_size:
+                    window.append(Document(page_content="\n".join(lines), metadata={"row_start": row_start, "row_end": row - 1}))
+                    lines, size = [], 0
+                if len(record) > chunk_size:
+                    window.extend(Document(page_content=piece, metadata={"row_start": row, "row_end": row})
+                                  for piece in splitter.split_text(record))
+                elif record:
+                    if not lines:
+                        row_start = row
+                    lines.append(record)
+                    size += len(record) + 1
+                row += 1
+            if window:
+                yield window
+    except pd.errors.EmptyDataError:
+        return
+    if lines:
+        yield [Document(page_content="\n".join(lines), metadata={"row_start": row_start, "row_end": row - 1})]
+
+def load_csv(file_path: str) -> Iterator[Document]:
+    """
+    Streams a CSV file and yields chunks of whole rows serialized as header-keyed
+    records, tagged with the row range they came from.
+    """
+    for window in iter_csv_windows(file_path):
+        yield from window
+
+def ingest_csv(file_path: str, collection_name: Optional[str] = None):
     """
     Ingests a CSV file, converts it to text, chunks it, generates embeddings, and stores them in ChromaDB.
+    The file is streamed in row batches so memory stays flat on very large exports.
     """
     try:
-        df = pd.read_csv(file_path)
-        # Convert DataFrame to a string representation for embedding
-        text = df.to_string()
-
-        # Chunk text
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            is_separator_regex=False,
-        )
-        chunks = text_splitter.create_documents([text])
-
-        # Generate embeddings
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-        # Store in ChromaDB
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            collection_name=collection_name,
-            persist_directory="./chroma_db"
-        )
-        print(f"Successfully ingested {file_path} into ChromaDB collection {collection_name}")
+        from backend.ingestion.ingestion_manager import ingest_file
+        return ingest_file(file_path, "csv", collection_name)
 
     except Exception as e:
         print(f"Error ingesting CSV {file_path}: {e}")
 
 if __name__ == "__main__":
-    import os
     os.makedirs("../data", exist_ok=True)
 
     # Example for CSV
@@ -50,5 +88,3 @@ if __name__ == "__main__":
     df = pd.DataFrame(data)
     df.to_csv("../data/dummy.csv", index=False)
     ingest_csv("../data/dummy.csv")
-
-
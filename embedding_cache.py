@@ -0,0 +1,206 @@
+"""
+Persistent embedding cache keyed by (model name, normalized chunk text hash).
+Lets re-ingestion of unchanged chunks skip the embedding model entirely.
+"""
+
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only edits map to the same chunk."""
+    return " ".join(text.split())
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of a chunk's normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def chunk_id(text_hash: str, source: Optional[str] = None) -> str:
+    """
+    Vector store id for a chunk. Ids are scoped to their source document when
+    one is given, so deleting one document's chunks never touches another's.
+    """
+    if source is None:
+        return text_hash
+    return hashlib.sha256(f"{source}\x00{text_hash}".encode("utf-8")).hexdigest()
+
+
+def dedupe_documents(documents: Sequence[Document], source: Optional[str] = None) -> Tuple[List[Document], List[str]]:
+    """
+    Drop repeated chunks and return content-addressed ids for the rest,
+    so writing them to Chroma upserts instead of appending duplicates.
+    """
+    unique_documents = []
+    ids = []
+    seen = set()
+    for document in documents:
+        document_id = chunk_id(content_hash(document.page_content), source)
+        if document_id in seen:
+            continue
+        seen.add(document_id)
+        unique_documents.append(document)
+        ids.append(document_id)
+    return unique_documents, ids
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed vector cache with least-recently-used eviction.
+    Vectors are stored as packed float32 blobs.
+    """
+
+    def __init__(self, db_path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _init_database(self, conn):
+        """Create the cache table on first use."""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+
+    @contextmanager
+    def _get_db_connection(self):
+        """Get a database connection with proper cleanup."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._initialized:
+                with self._init_lock:
+                    if not self._initialized:
+                        self._init_database(conn)
+                        self._initialized = True
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors and refresh their LRU timestamp."""
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+        now = time.time()
+        with self._get_db_connection() as conn:
+            for start in range(0, len(hashes), _SQL_BATCH):
+                batch = list(hashes[start:start + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+                if rows:
+                    hit_hashes = [row[0] for row in rows]
+                    conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash IN ({','.join('?' * len(hit_hashes))})",
+                        [now, model, *hit_hashes],
+                    )
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        """Store vectors and evict the least recently used entries over the limit."""
+        if not vectors:
+            return
+        now = time.time()
+        with self._get_db_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (model, text_hash, len(vector), array("f", vector).tobytes(), now)
+                    for text_hash, vector in vectors.items()
+                ],
+            )
+            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute("""
+                    DELETE FROM embeddings WHERE rowid IN (
+                        SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?
+                    )
+                """, (overflow,))
+                self._evictions += overflow
+
+    def embed_with_cache(
+        self,
+        model: str,
+        texts: List[str],
+        compute: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        """Return vectors for texts, only calling ``compute`` for cache misses."""
+        hashes = [content_hash(text) for text in texts]
+        try:
+            cached = self.get_many(model, list(dict.fromkeys(hashes)))
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache lookup failed, computing all vectors: {e}")
+            cached = {}
+
+        missing: Dict[str, str] = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+        self._hits += len(texts) - len(missing)
+        self._misses += len(missing)
+
+        if missing:
+            computed = dict(zip(missing.keys(), compute(list(missing.values()))))
+            try:
+                self.put_many(model, computed)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+            cached.update(computed)
+
+        return [cached[text_hash] for text_hash in hashes]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        lookups = self._hits + self._misses
+        entries = None
+        if self._initialized:
+            with self._get_db_connection() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            "evictions": self._evictions,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
@@ -0,0 +1,181 @@
+"""
+Dynamic micro-batching for embedding requests.
+Pools texts from concurrent callers (ingestion workers and query-time embedding)
+into size- and latency-bounded batches before they reach the model.
+"""
+
+import os
+import queue
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "10"))
+
+_STOP = object()
+
+
+class SchedulerStoppedError(RuntimeError):
+    """Raised for embedding requests still queued when the scheduler stopped."""
+
+
+class _EmbeddingRequest:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class EmbeddingScheduler:
+    """
+    Collects embedding requests from many threads and runs them through the
+    model in micro-batches of up to ``max_batch_size`` texts. A batch is
+    dispatched as soon as it is full or ``max_wait_ms`` after its first request.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = EMBED_BATCH_SIZE,
+        max_wait_ms: float = EMBED_MAX_WAIT_MS,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._requests: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._chunks = 0
+        self._requests_served = 0
+        self._batches = 0
+        self._busy_seconds = 0.0
+        self._queue_wait_seconds = 0.0
+        self._started_at: Optional[float] = None
+
+    def start(self):
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        # Caller holds self._lock. Each thread gets its own queue, so a stopping
+        # thread never takes requests meant for the one started after it.
+        if self._thread is None or not self._thread.is_alive():
+            self._started_at = time.perf_counter()
+            self._requests = queue.Queue()
+            self._thread = threading.Thread(target=self._run, args=(self._requests,), name="embedding-scheduler")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Stops the scheduler once the requests already queued are served."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._requests.put(_STOP)
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for embedding; the future resolves to their vectors in order."""
+        request = _EmbeddingRequest(list(texts))
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        # Starting and queueing under the lock keeps requests from landing behind a stop
+        with self._lock:
+            self._start()
+            self._requests.put(request)
+        return request.future
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    def _run(self, requests: "queue.Queue[Any]"):
+        try:
+            self._serve(requests)
+        finally:
+            # Nothing is served after the stop marker; fail anything left so no caller waits forever
+            while True:
+                try:
+                    request = requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is not _STOP:
+                    request.future.set_exception(SchedulerStoppedError("Embedding scheduler stopped"))
+
+    def _serve(self, requests: "queue.Queue[Any]"):
+        stopping = False
+        while not stopping:
+            first = requests.get()
+            if first is _STOP:
+                break
+
+            pending = [first]
+            pending_texts = len(first.texts)
+            deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+            while pending_texts < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                pending.append(request)
+                pending_texts += len(request.texts)
+
+            self._dispatch(pending)
+
+    def _dispatch(self, pending: List[_EmbeddingRequest]):
+        texts = [text for request in pending for text in request.texts]
+        dispatched_at = time.perf_counter()
+        try:
+            vectors: List[List[float]] = []
+            for start in range(0, len(texts), self.max_batch_size):
+                batch = texts[start:start + self.max_batch_size]
+                vectors.extend(self.embed_fn(batch))
+                self._batches += 1
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+            for request in pending:
+                request.future.set_exception(e)
+            return
+        finally:
+            self._busy_seconds += time.perf_counter() - dispatched_at
+
+        self._chunks += len(texts)
+        self._requests_served += len(pending)
+        offset = 0
+        for request in pending:
+            self._queue_wait_seconds += dispatched_at - request.enqueued_at
+            request.future.set_result(vectors[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput figures for tuning batch size and wait time."""
+        uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "chunks_embedded": self._chunks,
+            "requests_served": self._requests_served,
+            "batches": self._batches,
+            "avg_batch_size": round(self._chunks / self._batches, 2) if self._batches else 0.0,
+            "avg_queue_wait_ms": round(1000 * self._queue_wait_seconds / self._requests_served, 2) if self._requests_served else 0.0,
+            "model_chunks_per_second": round(self._chunks / self._busy_seconds, 2) if self._busy_seconds else 0.0,
+            "chunks_per_second": round(self._chunks / uptime, 2) if uptime else 0.0,
+            "queue_depth": self._requests.qsize(),
+        }
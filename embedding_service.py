@@ -0,0 +1,185 @@
+"""
+Shared embedding model registry for the AI Knowledge Assistant.
+Loads each sentence-transformers model at most once per process and hands the
+same instance to the ingestion modules, the IngestionManager and the RAG retriever.
+"""
+
+import os
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from backend.ingestion.embedding_cache import EmbeddingCache
+from backend.ingestion.embedding_scheduler import EmbeddingScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBED_MICRO_BATCHING = os.getenv("EMBED_MICRO_BATCHING", "true").lower() == "true"
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """Return the resident set size of this process, if it can be determined."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _parameter_bytes(model: Any) -> Optional[int]:
+    """Size of the model weights, for models backed by a torch module."""
+    client = getattr(model, "client", None)
+    if client is None or not hasattr(client, "parameters"):
+        return None
+    try:
+        return sum(p.numel() * p.element_size() for p in client.parameters())
+    except Exception:
+        return None
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    Lightweight handle on a registry-managed model.
+    The underlying model is only loaded on the first embedding call, calls
+    from concurrent threads are micro-batched when batching is enabled, and
+    document vectors are served from the embedding cache when one is configured.
+    """
+
+    def __init__(self, registry: "EmbeddingRegistry", model_name: str):
+        self._registry = registry
+        self.model_name = model_name
+
+    @property
+    def model(self) -> Embeddings:
+        return self._registry.load(self.model_name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cache = self._registry.cache
+        if cache is None:
+            return self._embed_uncached(texts)
+        return cache.embed_with_cache(self.model_name, texts, self._embed_uncached)
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        scheduler = self._registry.scheduler(self.model_name)
+        if scheduler is None:
+            return self.model.embed_documents(texts)
+        return scheduler.embed(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Query vectors for many texts in one batched call; like ``embed_query`` they bypass the cache."""
+        return self._embed_uncached(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        scheduler = self._registry.scheduler(self.model_name)
+        if scheduler is None:
+            return self.model.embed_query(text)
+        return scheduler.embed([text])[0]
+
+
+class EmbeddingRegistry:
+    """
+    Process-wide cache of embedding models keyed by model name.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., Embeddings] = HuggingFaceEmbeddings,
+        batching: bool = EMBED_MICRO_BATCHING,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self._factory = factory
+        self.batching = batching
+        self.cache = cache
+        self._handles: Dict[str, SharedEmbeddings] = {}
+        self._models: Dict[str, Embeddings] = {}
+        self._schedulers: Dict[str, EmbeddingScheduler] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str = DEFAULT_EMBEDDING_MODEL) -> SharedEmbeddings:
+        """Return the shared (lazily loaded) embeddings handle for a model."""
+        handle = self._handles.get(model_name)
+        if handle is None:
+            with self._lock:
+                handle = self._handles.setdefault(model_name, SharedEmbeddings(self, model_name))
+        return handle
+
+    def load(self, model_name: str = DEFAULT_EMBEDDING_MODEL) -> Embeddings:
+        """Return the loaded model, loading it on first use."""
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                rss_before = _current_rss_bytes()
+                start = time.perf_counter()
+                model = self._factory(model_name=model_name)
+                load_seconds = time.perf_counter() - start
+                rss_after = _current_rss_bytes()
+
+                self._metrics[model_name] = {
+                    "load_time_seconds": round(load_seconds, 3),
+                    "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+                    "parameter_bytes": _parameter_bytes(model),
+                    "loaded_at": time.time(),
+                }
+                self._models[model_name] = model
+                logger.info(f"Loaded embedding model {model_name} in {load_seconds:.2f}s")
+        return model
+
+    def scheduler(self, model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[EmbeddingScheduler]:
+        """Return the micro-batching scheduler for a model, or None when batching is off."""
+        if not self.batching:
+            return None
+        scheduler = self._schedulers.get(model_name)
+        if scheduler is None:
+            with self._lock:
+                scheduler = self._schedulers.get(model_name)
+                if scheduler is None:
+                    scheduler = EmbeddingScheduler(lambda texts: self.load(model_name).embed_documents(texts))
+                    self._schedulers[model_name] = scheduler
+        return scheduler
+
+    def shutdown(self):
+        """Stop all scheduler threads."""
+        for scheduler in list(self._schedulers.values()):
+            scheduler.stop()
+
+    def warm_up(self, model_name: str = DEFAULT_EMBEDDING_MODEL) -> Dict[str, Any]:
+        """Load a model and run one embedding so the first real request is not slow."""
+        model = self.load(model_name)
+        start = time.perf_counter()
+        model.embed_query("warm-up")
+        self._metrics[model_name]["warm_up_seconds"] = round(time.perf_counter() - start, 3)
+        return dict(self._metrics[model_name])
+
+    def is_loaded(self, model_name: str = DEFAULT_EMBEDDING_MODEL) -> bool:
+        return model_name in self._models
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Load time, memory footprint and batching throughput for every loaded model."""
+        stats = {name: dict(metrics) for name, metrics in self._metrics.items()}
+        for name, scheduler in self._schedulers.items():
+            stats.setdefault(name, {})["batching"] = scheduler.stats()
+        return stats
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.cache.stats() if self.cache is not None else None
+
+
+# Global registry instance
+embedding_registry = EmbeddingRegistry(cache=EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None)
+
+
+def get_embeddings(model_name: str = DEFAULT_EMBEDDING_MODEL) -> SharedEmbeddings:
+    """Return the process-wide embeddings for a model."""
+    return embedding_registry.get(model_name)
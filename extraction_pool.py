@@ -0,0 +1,38 @@
+"""
+Process pool shared by the parallel document extractors (PDF pages, PPTX slides).
+One pool per process, started with spawn on first use: forking a multithreaded
+server can deadlock children on locks held by other threads, and a single
+bounded pool keeps concurrent large documents (queue workers, bulk ingestion
+threads) from each starting their own cpu_count processes.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+INGEST_EXTRACT_PROCESSES = int(os.getenv("INGEST_EXTRACT_PROCESSES", str(os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """The process-wide extraction pool, created on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, INGEST_EXTRACT_PROCESSES),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_extract_pool():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,242 @@
+"""
+Registry of ingestion file types.
+Each type names its loader by import path ("module:function"), and the loader
+module is only imported the first time a document of that type is parsed, so
+a process that never ingests (or only ingests a few formats) does not pay for
+pypdf, pandas, lxml and the other parser dependencies at startup.
+A file's type is detected from its extension, a declared MIME type, or its
+leading bytes. New formats are added with register_file_type(), or by a
+package exposing a FileTypeHandler under the "knowledge_assistant.file_types"
+entry-point group:
+
+    [project.entry-points."knowledge_assistant.file_types"]
+    epub = "kb_epub:handler"   # handler = FileTypeHandler("epub", "kb_epub.loader:load_epub", [".epub"], ...)
+"""
+
+import importlib
+import logging
+import mimetypes
+import os
+import threading
+import zipfile
+from importlib.metadata import entry_points
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+FILE_TYPE_ENTRY_POINT_GROUP = "knowledge_assistant.file_types"
+# Leading bytes read when a file's type is detected from its content
+SNIFF_BYTES = 8192
+
+Loader = Callable[[str], Iterable[Document]]
+Sniffer = Callable[[bytes, str], bool]
+
+# MIME types that say nothing about the format, so detection falls through to the content
+_GENERIC_MIME_TYPES = {"application/octet-stream", "binary/octet-stream", "application/zip"}
+
+
+class FileTypeHandler:
+    """
+    An ingestion file type: the loader that turns a file into chunks (a
+    callable, or its "module:function" import path to resolve lazily) and the
+    extensions, MIME types and content check used to detect it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Union[str, Loader],
+        extensions: Sequence[str] = (),
+        mime_types: Sequence[str] = (),
+        sniff: Optional[Sniffer] = None,
+    ):
+        self.name = name
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.mime_types = tuple(mime_type.lower() for mime_type in mime_types)
+        self.sniff = sniff
+        self._loader_path = loader if isinstance(loader, str) else None
+        self._loader: Optional[Loader] = None if isinstance(loader, str) else loader
+
+    @property
+    def loaded(self) -> bool:
+        return self._loader is not None
+
+    @property
+    def loader(self) -> Loader:
+        """The loader, importing its module on first use."""
+        if self._loader is None:
+            module_name, _, attribute = self._loader_path.partition(":")
+            self._loader = getattr(importlib.import_module(module_name), attribute)
+        return self._loader
+
+
+def _zip_contains(member: str) -> Sniffer:
+    """Matches Office Open XML packages (zip archives) containing ``member``."""
+    def sniff(head: bytes, file_path: str) -> bool:
+        if not head.startswith(b"PK\x03\x04"):
+            return False
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                archive.getinfo(member)
+            return True
+        except (KeyError, zipfile.BadZipFile, OSError):
+            return False
+    return sniff
+
+
+def _looks_like_text(head: bytes) -> bool:
+    if not head or b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # The sample may end in the middle of a multi-byte character
+        return e.start >= len(head) - 3
+    return True
+
+
+_handlers: Dict[str, FileTypeHandler] = {}
+# Reentrant so plugins can be registered while discovery holds the lock
+_lock = threading.RLock()
+_entry_points_loaded = False
+
+
+def register_file_type(
+    name: str,
+    loader: Union[str, Loader],
+    extensions: Sequence[str] = (),
+    mime_types: Sequence[str] = (),
+    sniff: Optional[Sniffer] = None,
+) -> FileTypeHandler:
+    """
+    Registers (or replaces) a file type. Registrations made at runtime only
+    apply to the current process; use the entry-point group for formats that
+    every process (the server and the bulk and crawler CLIs) should support
+    without calling this first.
+    """
+    return _register(FileTypeHandler(name, loader, extensions, mime_types, sniff))
+
+
+def _register(handler: FileTypeHandler) -> FileTypeHandler:
+    with _lock:
+        _handlers[handler.name] = handler
+    return handler
+
+
+def _load_entry_points():
+    """Registers the handlers published by installed packages, once per process."""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    # The lock is held until every plugin is registered, so concurrent lookups
+    # wait for the complete registry instead of rejecting plugin types
+    with _lock:
+        if _entry_points_loaded:
+            return
+        for entry_point in entry_points(group=FILE_TYPE_ENTRY_POINT_GROUP):
+            try:
+                handler = entry_point.load()
+                if callable(handler) and not isinstance(handler, FileTypeHandler):
+                    handler = handler()
+                if not isinstance(handler, FileTypeHandler):
+                    raise TypeError(f"expected a FileTypeHandler, got {type(handler).__name__}")
+                _register(handler)
+            except Exception as e:
+                logger.error(f"Could not load file type plugin {entry_point.name} ({entry_point.value}): {e}")
+        _entry_points_loaded = True
+
+
+def _all_handlers() -> List[FileTypeHandler]:
+    _load_entry_points()
+    with _lock:
+        return list(_handlers.values())
+
+
+def get_handler(file_type: str) -> FileTypeHandler:
+    """The handler of a file type; raises ValueError for unsupported types."""
+    _load_entry_points()
+    handler = _handlers.get(file_type)
+    if handler is None:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return handler
+
+
+def get_loader(file_type: str) -> Loader:
+    """The loader of a file type, imported on first use."""
+    return get_handler(file_type).loader
+
+
+def is_supported(file_type: str) -> bool:
+    _load_entry_points()
+    return file_type in _handlers
+
+
+def supported_file_types() -> List[str]:
+    return sorted(handler.name for handler in _all_handlers())
+
+
+def detect_file_type(file_path: str, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Detects the ingestion type of a URL or file, or returns None if unsupported.
+    The extension is tried first, then ``content_type`` (e.g. an upload's
+    declared MIME type) or the type guessed from the name, then the file's
+    leading bytes. Files without an extension that decode as UTF-8 text are
+    treated as text; files with an unknown extension never are.
+    """
+    if file_path.startswith(("http://", "https://")):
+        return "web"
+    handlers = _all_handlers()
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension:
+        for handler in handlers:
+            if extension in handler.extensions:
+                return handler.name
+
+    mime_type = (content_type or mimetypes.guess_type(file_path)[0] or "").split(";")[0].strip().lower()
+    if mime_type and mime_type not in _GENERIC_MIME_TYPES:
+        for handler in handlers:
+            if mime_type in handler.mime_types:
+                return handler.name
+
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return None
+    for handler in handlers:
+        if handler.sniff is not None and handler.sniff(head, file_path):
+            return handler.name
+    if not extension and _looks_like_text(head):
+        return "txt"
+    return None
+
+
+register_file_type(
+    "pdf", "backend.ingestion.pdf_ingestion:load_pdf",
+    extensions=[".pdf"], mime_types=["application/pdf"],
+    sniff=lambda head, file_path: head.startswith(b"%PDF-"),
+)
+register_file_type(
+    "pptx", "backend.ingestion.pptx_ingestion:load_pptx",
+    extensions=[".pptx"],
+    mime_types=["application/vnd.openxmlformats-officedocument.presentationml.presentation"],
+    sniff=_zip_contains("ppt/presentation.xml"),
+)
+register_file_type(
+    "docx", "backend.ingestion.text_ingestion:load_docx",
+    extensions=[".docx"],
+    mime_types=["application/vnd.openxmlformats-officedocument.wordprocessingml.document"],
+    sniff=_zip_contains("word/document.xml"),
+)
+register_file_type(
+    "txt", "backend.ingestion.text_ingestion:load_text",
+    extensions=[".txt", ".text", ".md", ".markdown", ".mdx"],
+    mime_types=["text/plain", "text/markdown", "text/x-markdown"],
+)
+register_file_type(
+    "csv", "backend.ingestion.csv_ingestion:load_csv",
+    extensions=[".csv"], mime_types=["text/csv", "application/csv"],
+)
+register_file_type("web", "backend.ingestion.web_ingestion:load_web_page")
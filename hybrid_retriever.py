@@ -0,0 +1,85 @@
+"""
+Hybrid lexical + dense retrieval.
+Runs BM25 and vector similarity search side by side and merges the two
+rankings with reciprocal rank fusion, so chunks that match exact acronyms or
+section numbers surface without raising ``k`` for the LLM prompt.
+"""
+
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.ingestion.embedding_cache import chunk_id, content_hash
+
+HYBRID_RETRIEVAL_ENABLED = os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() in ("1", "true", "yes")
+HYBRID_K = int(os.getenv("HYBRID_K", "4"))
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def document_id(doc: Document) -> str:
+    """
+    Id of a retrieved chunk: its vector store id, else the id the ingestion
+    manager gives it (its text hash scoped to its source), which is also the id
+    the BM25 index stores it under.
+    """
+    return doc.id or chunk_id(content_hash(doc.page_content), doc.metadata.get("source"))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    weights: Sequence[float] = (),
+    rrf_k: int = RRF_K,
+) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists: each id scores ``weight / (rrf_k + rank)`` per list it
+    appears in. Returns (id, score) pairs, best first.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for position, ranking in enumerate(rankings):
+        weight = weights[position] if position < len(weights) else 1.0
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += weight / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves ``fetch_k`` candidates from both the vector store and the BM25
+    index and returns the top ``k`` after reciprocal rank fusion. A metadata
+    ``filter`` passed to ``invoke`` is pushed down into both searches.
+    """
+
+    vectorstore: Any
+    bm25_index: Any
+    k: int = HYBRID_K
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+    dense_weight: float = 1.0
+    lexical_weight: float = 1.0
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        dense = self.vectorstore.similarity_search(query, k=self.fetch_k, filter=filter)
+        documents = {document_id(doc): doc for doc in dense}
+        lexical = [doc_id for doc_id, _ in self.bm25_index.search(query, self.fetch_k, filter=filter)]
+
+        fused = reciprocal_rank_fusion(
+            [list(documents), lexical],
+            weights=(self.dense_weight, self.lexical_weight),
+            rrf_k=self.rrf_k,
+        )[:self.k]
+
+        # Lexical-only hits are loaded from the index's own chunk store
+        missing = [doc_id for doc_id, _ in fused if doc_id not in documents]
+        documents.update(self.bm25_index.get_documents(missing))
+        return [documents[doc_id] for doc_id, _ in fused if doc_id in documents]
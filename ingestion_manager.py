@@ -1,37 +1,205 @@
 
 import os
-from typing import Literal
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import SentenceTransformerEmbeddings
+from langchain_core.documents import Document
 
-from backend.ingestion.pdf_ingestion import ingest_pdf
-from backend.ingestion.pptx_ingestion import ingest_pptx
-from backend.ingestion.text_ingestion import ingest_text, ingest_docx # Corrected import
-from backend.ingestion.csv_ingestion import ingest_csv
-from backend.ingestion.web_ingestion import ingest_web_page
+from backend.ingestion.embedding_cache import chunk_id, content_hash
+from backend.ingestion.embedding_service import get_embeddings
+from backend.ingestion.file_types import get_loader, is_supported
+from backend.ingestion.manifest import ManifestStore, file_sha256
+from backend.ingestion.vector_store_writer import CHROMA_COLLECTION, VectorStoreWriter, get_vector_store, get_writer
+from backend.retrieval.metadata_filters import infer_agent_domain
+
+# Number of new chunks collected from a document before they are handed to the writer
+INGEST_WRITE_BATCH_SIZE = int(os.getenv("INGEST_WRITE_BATCH_SIZE", "256"))
+
+def manifest_key(source: str, collection_name: Optional[str] = None) -> str:
+    """Manifest key of a source; the same file may be ingested into several shards, each with its own manifest."""
+    if collection_name in (None, CHROMA_COLLECTION):
+        return source
+    return f"{collection_name}:{source}"
 
 class IngestionManager:
-    def __init__(self):
-        self.embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-        self.vectordb = Chroma(persist_directory="./chroma_db", embedding_function=self.embeddings)
-
-    def ingest_document(self, file_path: str, file_type: Literal["pdf", "pptx", "txt", "docx", "csv", "web"]):
-        if file_type == "pdf":
-            ingest_pdf(file_path, self.vectordb)
-        elif file_type == "pptx":
-            ingest_pptx(file_path, self.vectordb)
-        elif file_type == "txt":
-            ingest_text(file_path, self.vectordb) # Corrected function call
-        elif file_type == "docx":
-            ingest_docx(file_path, self.vectordb)
-        elif file_type == "csv":
-            ingest_csv(file_path, self.vectordb)
-        elif file_type == "web":
-            ingest_web_page(file_path, self.vectordb)
-        else:
+    def __init__(
+        self,
+        manifest_store: Optional[ManifestStore] = None,
+        write_batch_size: int = INGEST_WRITE_BATCH_SIZE,
+        writer: Optional[VectorStoreWriter] = None,
+    ):
+        self.embeddings = get_embeddings()
+        self.vectordb = get_vector_store()
+        self.writer = writer or get_writer()
+        self.manifests = manifest_store or ManifestStore()
+        self.write_batch_size = write_batch_size
+
+    def ingest_document(
+        self,
+        file_path: str,
+        file_type: str,
+        parse: Optional[Callable[[str, str], Iterable[Document]]] = None,
+        flush: bool = True,
+        agent_domain: Optional[str] = None,
+        collection_name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ingests a document incrementally. Unchanged files are skipped, and for
+        changed files only new chunks are embedded while stale ones are deleted.
+        ``file_type`` is any type registered in file_types; its loader is
+        imported the first time it is used.
+        ``parse`` can replace the file type's loader, e.g. to pass loader options;
+        it is only called when the document needs re-ingesting.
+        With ``flush=False`` the chunks stay in the shared writer's buffer to be
+        coalesced with other documents; the manifest is saved once they are written.
+        Every chunk is tagged with its source, file type, agent domain (inferred
+        from the path unless given) and modification time for filtered retrieval.
+        ``collection_name`` routes the document to another collection (e.g. a
+        tenant's shard) instead of the default one.
+        """
+        if not is_supported(file_type):
             raise ValueError(f"Unsupported file type: {file_type}")
-        print(f"Successfully ingested {file_path} as {file_type}")
+
+        timings = {"fingerprint": 0.0, "parse": 0.0, "write": 0.0, "delete": 0.0, "flush": 0.0}
+        started = time.perf_counter()
+        source = file_path if file_type == "web" else os.path.abspath(file_path)
+        writer = self.writer_for(collection_name)
+        key = manifest_key(source, collection_name)
+        previous = self.manifests.get(key)
+        mtime = size = file_hash = None
+        # Stored lowercase, as QueryFilters lowercases the values it matches
+        domain = (agent_domain or infer_agent_domain(source)).strip().lower()
+        # Chunks written before their domain was recorded (or under another one)
+        # are all re-written, so existing chunks get the current metadata too
+        retag = bool(previous) and previous.get("agent_domain") != domain
+
+        if file_type != "web":
+            stat = os.stat(file_path)
+            mtime, size = stat.st_mtime, stat.st_size
+            unchanged = previous and previous["mtime"] == mtime and previous["size"] == size
+            if not unchanged:
+                file_hash = file_sha256(file_path)
+                unchanged = previous and previous["file_hash"] == file_hash
+                if unchanged:
+                    self.manifests.touch(key, mtime, size)
+            timings["fingerprint"] = time.perf_counter() - started
+            if unchanged and retag:
+                file_hash = file_hash or previous["file_hash"]
+            elif unchanged:
+                print(f"Skipping {file_path}: unchanged since last ingestion")
+                return {"source": source, "skipped": True, "chunks": previous["chunk_count"], "added": 0, "deleted": 0,
+                        "timings": _round_timings(timings)}
+
+        document_metadata = {
+            "source": source,
+            "file_type": file_type,
+            "agent_domain": domain,
+            "modified_at": mtime if mtime is not None else time.time(),
+        }
+
+        # Loaders yield chunks lazily and new chunks are handed to the shared
+        # writer in bounded groups, so large documents are never held in memory.
+        previous_chunks = previous["chunks"] if previous else {}
+        chunks: Dict[str, str] = {}
+        pending_documents, pending_ids = [], []
+        added = 0
+        documents = iter(parse(file_path, file_type) if parse is not None else get_loader(file_type)(file_path))
+        while True:
+            stage_start = time.perf_counter()
+            document = next(documents, None)
+            timings["parse"] += time.perf_counter() - stage_start
+            if document is None:
+                break
+            chunk_hash = content_hash(document.page_content)
+            document_id = chunk_id(chunk_hash, source)
+            if document_id in chunks:
+                continue
+            chunks[document_id] = chunk_hash
+            if retag or document_id not in previous_chunks:
+                document.metadata.update(document_metadata)
+                pending_documents.append(document)
+                pending_ids.append(document_id)
+            if len(pending_ids) >= self.write_batch_size:
+                timings["write"] += self._write(writer, pending_documents, pending_ids)
+                added += len(pending_ids)
+                pending_documents, pending_ids = [], []
+        if pending_ids:
+            timings["write"] += self._write(writer, pending_documents, pending_ids)
+            added += len(pending_ids)
+
+        stale_ids = [document_id for document_id in previous_chunks if document_id not in chunks]
+        if stale_ids:
+            stage_start = time.perf_counter()
+            writer.delete(stale_ids)
+            timings["delete"] = time.perf_counter() - stage_start
+
+        # The manifest is only saved once this document's chunks are in Chroma,
+        # so a failed write leaves the document to be re-ingested next time.
+        outcome: Dict[str, Optional[Exception]] = {}
+
+        def save_manifest(error: Optional[Exception]):
+            outcome["error"] = error
+            if error is None:
+                self.manifests.save(key, file_type, chunks, mtime=mtime, size=size, file_hash=file_hash,
+                                    agent_domain=domain)
+
+        stage_start = time.perf_counter()
+        writer.call_when_flushed(save_manifest)
+        if flush:
+            writer.flush()
+            # Another thread's flush may have written (or failed) our chunks
+            if outcome.get("error") is not None:
+                raise outcome["error"]
+        timings["flush"] = time.perf_counter() - stage_start
+        timings["total"] = time.perf_counter() - started
+
+        print(f"Successfully ingested {file_path} as {file_type} "
+              f"({added} new, {len(stale_ids)} removed, {len(chunks)} total chunks)")
+        return {"source": source, "skipped": False, "chunks": len(chunks), "added": added, "deleted": len(stale_ids),
+                "timings": _round_timings(timings)}
+
+    def writer_for(self, collection_name: Optional[str] = None) -> VectorStoreWriter:
+        """The writer of a collection; the default collection uses this manager's writer."""
+        if collection_name in (None, CHROMA_COLLECTION):
+            return self.writer
+        return get_writer(collection_name)
+
+    def _write(self, writer: VectorStoreWriter, documents: List[Document], ids: List[str]) -> float:
+        """Hands a group of chunks to the writer, returning the time taken."""
+        start = time.perf_counter()
+        writer.add(documents, ids)
+        return time.perf_counter() - start
+
+def _round_timings(timings: Dict[str, float]) -> Dict[str, float]:
+    return {stage: round(seconds, 4) for stage, seconds in timings.items()}
+
+_default_manager: Optional[IngestionManager] = None
+_default_manager_lock = threading.Lock()
+
+def default_manager() -> IngestionManager:
+    """The process-wide IngestionManager, created on first use."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = IngestionManager()
+        return _default_manager
+
+def ingest_file(
+    file_path: str,
+    file_type: str,
+    collection_name: Optional[str] = None,
+    parse: Optional[Callable[[str, str], Iterable[Document]]] = None,
+) -> Dict[str, Any]:
+    """
+    Ingests one document through the process-wide IngestionManager, into the
+    default collection unless ``collection_name`` is given. The loaders'
+    standalone ingest_* helpers go through here, so they write the same
+    source-scoped ids, metadata and manifest entries as the server. They import
+    it when called rather than at module load, so importing a loader to parse
+    files does not load the vector store.
+    """
+    return default_manager().ingest_document(file_path, file_type, parse=parse, collection_name=collection_name)
 
 if __name__ == "__main__":
     manager = IngestionManager()
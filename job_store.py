@@ -0,0 +1,154 @@
+"""
+Durable ingestion job store.
+Records every ingestion task with its state, per-stage timings, chunk counts
+and errors so that queued work survives restarts and callers can poll progress.
+"""
+
+import os
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+INGESTION_JOBS_DB_PATH = os.getenv("INGESTION_JOBS_DB_PATH", "./ingestion_jobs.db")
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobStore:
+    """
+    SQLite-backed table of ingestion jobs.
+    """
+
+    def __init__(self, db_path: str = INGESTION_JOBS_DB_PATH):
+        self.db_path = db_path
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize the jobs table."""
+        with self._get_db_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    file_path TEXT NOT NULL,
+                    file_type TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    stage_timings TEXT,
+                    chunk_count INTEGER,
+                    chunks_added INTEGER,
+                    chunks_deleted INTEGER,
+                    error TEXT,
+                    collection TEXT
+                )
+            """)
+            # Stores created before tenant routing have no collection column
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "collection" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN collection TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority, created_at)")
+
+    @contextmanager
+    def _get_db_connection(self):
+        """Get a database connection with proper cleanup."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["stage_timings"] = json.loads(job["stage_timings"]) if job["stage_timings"] else {}
+        return job
+
+    def create(self, file_path: str, file_type: str, priority: int, collection: Optional[str] = None) -> Dict[str, Any]:
+        """Record a newly queued job; ``collection`` is its target shard when not the default one."""
+        job_id = uuid.uuid4().hex
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                INSERT INTO jobs (id, file_path, file_type, priority, status, created_at, collection)
+                VALUES (?, ?, ?, ?, 'queued', ?, ?)
+            """, (job_id, file_path, file_type, priority, time.time(), collection))
+            return self._row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def mark_running(self, job_id: str, attempt: int):
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = 'running', attempts = ?, started_at = ?, error = NULL
+                WHERE id = ?
+            """, (attempt, time.time(), job_id))
+
+    def mark_done(self, job_id: str, result: Dict[str, Any]):
+        """Record a successful run with the IngestionManager result."""
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = 'done', finished_at = ?, stage_timings = ?,
+                    chunk_count = ?, chunks_added = ?, chunks_deleted = ?
+                WHERE id = ?
+            """, (
+                time.time(),
+                json.dumps(result.get("timings", {})),
+                result.get("chunks"),
+                result.get("added"),
+                result.get("deleted"),
+                job_id,
+            ))
+
+    def mark_failed(self, job_id: str, error: str, retrying: bool = False):
+        """Record an error; jobs that will be retried go back to queued."""
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = ?, finished_at = ?, error = ?
+                WHERE id = ?
+            """, ("queued" if retrying else "failed", None if retrying else time.time(), error, job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._get_db_connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row) if row else None
+
+    def list(
+        self,
+        status: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        collection: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """List jobs, most recent first, optionally filtered by status and target shard."""
+        query = "SELECT * FROM jobs"
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if collection:
+            conditions.append("collection = ?")
+            params.append(collection)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self._get_db_connection() as conn:
+            return [self._row_to_job(row) for row in conn.execute(query, params)]
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that were queued or running when the process last stopped."""
+        with self._get_db_connection() as conn:
+            rows = conn.execute("""
+                SELECT * FROM jobs WHERE status IN ('queued', 'running')
+                ORDER BY priority, created_at
+            """).fetchall()
+            return [self._row_to_job(row) for row in rows]
@@ -0,0 +1,362 @@
+"""
+Local vector store backed by the memory-mapped ANN engine in ann_index.
+Implements LangChain's VectorStore interface so it can stand in for Chroma
+behind get_vector_store(): vectors live in a float32 memmap file, chunk text
+and metadata in SQLite, and queries are served by an HNSW, IVF or exact index,
+or by an int8/PQ compressed index that keeps only codes in memory.
+"""
+
+import os
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from backend.retrieval.ann_index import (
+    VectorFile, create_index, exact_search_batch, load_index, normalize, save_index, search_batch,
+)
+from backend.retrieval.metadata_filters import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "./vector_index")
+# "ivf" builds with vectorized numpy and scales to millions of rows; "hnsw" gives
+# better recall per query but is built in pure Python (about 3 ms per row), so
+# it suits collections of up to a few hundred thousand chunks
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "ivf")
+# The index structure is pickled whole, so writes only mark it dirty and it is
+# re-saved at most this often, and by persist()/close(). Rows written after the
+# last save, and rows deleted since, are picked up by a rebuild the next time
+# the collection is opened.
+LOCAL_INDEX_SAVE_SECONDS = float(os.getenv("LOCAL_INDEX_SAVE_SECONDS", "30"))
+
+# Rebuild the search structure once this share of indexed rows are tombstones
+_REBUILD_DELETED_RATIO = 0.3
+# Chunks loaded per SQLite lookup when resolving search hits
+_LOOKUP_BATCH = 10000
+# Filtered queries matching at most this many rows are answered by an exact
+# scan of just those rows instead of a filtered ANN search
+LOCAL_FILTER_EXACT_MAX_ROWS = int(os.getenv("LOCAL_FILTER_EXACT_MAX_ROWS", "20000"))
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Collection stored under ``persist_directory/collection_name``. ``index_params``
+    are passed to the index (e.g. ``ef_search`` for HNSW, ``nprobe`` for IVF).
+    Searches accept a Chroma-style ``filter``; it is resolved against per-field
+    metadata postings so only matching rows are scored.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        embedding_function: Embeddings,
+        persist_directory: str = LOCAL_VECTOR_STORE_PATH,
+        index_type: str = LOCAL_INDEX_TYPE,
+        **index_params,
+    ):
+        self.collection_name = collection_name
+        self._embedding = embedding_function
+        self.index_type = index_type
+        self.index_params = index_params
+        self.directory = os.path.join(persist_directory, collection_name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.db_path = os.path.join(self.directory, "store.db")
+        self._index_path = os.path.join(self.directory, f"{index_type}.index")
+        self._lock = threading.RLock()
+        self._vectors: Optional[VectorFile] = None
+        self._index = None
+        self._metadata = MetadataIndex()
+        # Sequence number of the last add or delete, stored with the rows and the
+        # saved index so an index saved before a later write is rebuilt on open
+        self._writes = 0
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._init_database()
+        self._load()
+
+    def _init_database(self):
+        """Initialize the chunk and settings tables."""
+        with self._get_db_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id TEXT PRIMARY KEY,
+                    slot INTEGER NOT NULL UNIQUE,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @contextmanager
+    def _get_db_connection(self):
+        """Get a database connection with proper cleanup."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _load(self):
+        with self._get_db_connection() as conn:
+            settings = {row["key"]: row["value"] for row in conn.execute("SELECT key, value FROM settings")}
+        self._writes = int(settings.get("writes", 0))
+        if "dim" in settings:
+            self._open(int(settings["dim"]), int(settings["rows"]))
+        self._load_metadata()
+
+    def _load_metadata(self):
+        # Caller holds self._lock (or is the constructor)
+        self._metadata.clear()
+        with self._get_db_connection() as conn:
+            for row in conn.execute("SELECT slot, metadata FROM chunks"):
+                self._metadata.add(row["slot"], json.loads(row["metadata"]))
+
+    def _open(self, dim: int, rows: int):
+        # Caller holds self._lock (or is the constructor)
+        self._vectors = VectorFile(os.path.join(self.directory, "vectors.f32"), dim, rows)
+        self._index = create_index(self.index_type, self._vectors, **self.index_params)
+        if not load_index(self._index, self._index_path, rows, self._writes):
+            logger.info(f"Rebuilding {self.index_type} index for collection {self.collection_name}")
+            self._rebuild()
+
+    def _rebuild(self):
+        """Compact the vector file down to the live rows and rebuild the index over them."""
+        # Caller holds self._lock (or is the constructor)
+        path = self._vectors.path
+        with self._get_db_connection() as conn:
+            live = [row["slot"] for row in conn.execute("SELECT slot FROM chunks ORDER BY slot")]
+            if len(live) < self._vectors.count:
+                compacted = VectorFile(f"{path}.tmp", self._vectors.dim)
+                for start in range(0, len(live), 8192):
+                    compacted.append(self._vectors.rows(live[start:start + 8192]))
+                compacted.flush()
+                # Ascending order never collides: live[i] >= i
+                conn.executemany("UPDATE chunks SET slot = ? WHERE slot = ?",
+                                 [(new, old) for new, old in enumerate(live) if new != old])
+                del compacted
+                os.replace(f"{path}.tmp", path)
+                self._vectors = VectorFile(path, self._vectors.dim, len(live))
+                self._save_settings(conn)
+        self._load_metadata()
+        self._index = create_index(self.index_type, self._vectors, **self.index_params)
+        self._index.add(range(self._vectors.count))
+        self._save()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed and upsert chunks; re-used ids replace the previous chunk."""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [doc_id or str(uuid4()) for doc_id in (ids or [None] * len(texts))]
+        vectors = normalize(self._embedding.embed_documents(texts))
+
+        with self._lock:
+            if self._vectors is None:
+                self._open(vectors.shape[1], 0)
+            with self._get_db_connection() as conn:
+                replaced = self._slots_for(conn, ids)
+                slots = self._vectors.append(vectors)
+                self._writes += 1
+                conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (id, slot, content, metadata) VALUES (?, ?, ?, ?)",
+                    [(doc_id, int(slot), text, json.dumps(metadata or {}, default=str))
+                     for doc_id, slot, text, metadata in zip(ids, slots, texts, metadatas)],
+                )
+                self._save_settings(conn)
+            self._vectors.flush()
+            for slot in replaced:
+                self._metadata.remove(slot)
+            for slot, metadata in zip(slots, metadatas):
+                self._metadata.add(int(slot), metadata or {})
+            self._index.remove(replaced)
+            self._index.add(slots)
+            self._after_write()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return None
+        with self._lock:
+            with self._get_db_connection() as conn:
+                slots = self._slots_for(conn, ids)
+                conn.executemany("DELETE FROM chunks WHERE id = ?", [(doc_id,) for doc_id in ids])
+                if slots:
+                    self._writes += 1
+                    self._save_settings(conn)
+            for slot in slots:
+                self._metadata.remove(slot)
+            if self._index is not None and slots:
+                self._index.remove(slots)
+                self._after_write()
+        return True
+
+    def _slots_for(self, conn, ids: Sequence[str]) -> List[int]:
+        placeholders = ",".join("?" * len(ids))
+        return [row["slot"] for row in conn.execute(f"SELECT slot FROM chunks WHERE id IN ({placeholders})", list(ids))]
+
+    def _save_settings(self, conn):
+        conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                         [("dim", str(self._vectors.dim)), ("rows", str(self._vectors.count)),
+                          ("writes", str(self._writes))])
+
+    def _after_write(self):
+        # Caller holds self._lock
+        if len(self._index.deleted) > _REBUILD_DELETED_RATIO * self._vectors.count:
+            self._rebuild()
+            return
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= LOCAL_INDEX_SAVE_SECONDS:
+            self._save()
+
+    def _save(self):
+        # Caller holds self._lock (or is the constructor)
+        save_index(self._index, self._index_path, self._vectors.count, self._writes)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def persist(self):
+        """Save the index structure if it changed since it was last saved."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def close(self):
+        self.persist()
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._get_db_connection() as conn:
+            rows = conn.execute(f"SELECT id, content, metadata FROM chunks WHERE id IN ({placeholders})", list(ids))
+            found = {row["id"]: _to_document(row) for row in rows}
+        return [found[doc_id] for doc_id in ids if doc_id in found]
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: int = 0, **kwargs: Any) -> Dict[str, List]:
+        """Chroma-style bulk read of stored chunks, in insertion order."""
+        query = "SELECT id, content, metadata FROM chunks"
+        params: List[Any] = []
+        if ids is not None:
+            query += f" WHERE id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        query += " ORDER BY slot LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset])
+        with self._get_db_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return {
+            "ids": [row["id"] for row in rows],
+            "documents": [row["content"] for row in rows],
+            "metadatas": [json.loads(row["metadata"]) for row in rows],
+        }
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """(document, cosine distance) pairs, nearest first."""
+        return self.similarity_search_with_score_by_vectors([embedding], k, filter)[0]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[List[float]],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Batched ``similarity_search_with_score_by_vector``: exact scans score all
+        queries in one matrix product and the chunks of every hit are loaded in
+        a single lookup.
+        """
+        queries = normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        with self._lock:
+            if self._index is None:
+                return [[] for _ in range(len(queries))]
+            if filter is None:
+                hits = search_batch(self._index, queries, k)
+            else:
+                allowed = np.array(sorted(self._metadata.select(filter)), dtype=np.int64)
+                if len(allowed) <= LOCAL_FILTER_EXACT_MAX_ROWS:
+                    hits = exact_search_batch(self._vectors, queries, k, allowed)
+                else:
+                    hits = search_batch(self._index, queries, k, allowed)
+        slots = sorted({slot for query_hits in hits for slot, _ in query_hits})
+        if not slots:
+            return [[] for _ in hits]
+        documents = {}
+        with self._get_db_connection() as conn:
+            # Stay under SQLite's bound-parameter limit for large batches
+            for start in range(0, len(slots), _LOOKUP_BATCH):
+                batch = slots[start:start + _LOOKUP_BATCH]
+                rows = conn.execute(f"SELECT id, slot, content, metadata FROM chunks WHERE slot IN ({','.join('?' * len(batch))})", batch)
+                documents.update((row["slot"], _to_document(row)) for row in rows)
+        return [[(documents[slot], 1.0 - score) for slot, score in query_hits if slot in documents] for query_hits in hits]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda distance: 1.0 - distance
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        collection_name: str = "langchain",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(collection_name, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._vectors.count if self._vectors is not None else 0
+            deleted = len(self._index.deleted) if self._index is not None else 0
+            memory = self._index.memory_bytes() if self._index is not None else 0
+        return {"index_type": self.index_type, "rows": rows, "live": rows - deleted, "deleted": deleted,
+                "memory_bytes": memory}
+
+
+def _to_document(row) -> Document:
+    return Document(id=row["id"], page_content=row["content"], metadata=json.loads(row["metadata"]))
@@ -1,17 +1,47 @@
 
 import os
-from fastapi import FastAPI, Depends, HTTPException, status
+import json
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import iterate_in_threadpool
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain.chains import RetrievalQA
 from langchain_community.llms import Ollama
+from pydantic import ValidationError
 
+from backend.auth import auth_manager
+from backend.async_execution import (
+    BATCH_MAX_CONCURRENCY, BATCH_MAX_WAITING, BATCH_TIMEOUT_SECONDS,
+    BULK_MAX_CONCURRENCY, BULK_MAX_WAITING, BULK_WAIT_TIMEOUT_SECONDS,
+    CRAWL_MAX_CONCURRENCY, CRAWL_MAX_WAITING, CRAWL_WAIT_TIMEOUT_SECONDS,
+    MCP_MAX_CONCURRENCY, MCP_MAX_WAITING, MCP_TIMEOUT_SECONDS, RAG_MAX_CONCURRENCY, RAG_MAX_WAITING, RAG_TIMEOUT_SECONDS,
+    ConcurrencyLimitError, EndpointLimiter, ExecutionTimeoutError, run_blocking, shutdown_executor,
+)
+from backend.ingestion.bulk_ingestion import BULK_INGEST_WORKERS, BulkIngestor
+from backend.ingestion.embedding_service import embedding_registry, get_embeddings
+from backend.ingestion.extraction_pool import shutdown_extract_pool
+from backend.ingestion.file_types import detect_file_type
 from backend.ingestion.ingestion_manager import IngestionManager
-from backend.ingestion.task_queue import IngestionTaskQueue
+from backend.ingestion.job_store import JOB_STATUSES, JobStore
+from backend.ingestion.task_queue import IngestionTaskQueue, QueueFullError
+from backend.ingestion.vector_store_writer import (
+    CHROMA_COLLECTION, close_writers, collection_version, get_vector_store, writer_stats,
+)
+from backend.retrieval.batch_retrieval import BATCH_MAX_K, BATCH_MAX_QUERIES, BATCH_MAX_TEXTS, BatchRetriever, embed_queries
+from backend.retrieval.bm25_index import BM25_INDEX_ENABLED, get_bm25_index
+from backend.retrieval.hybrid_retriever import HYBRID_RETRIEVAL_ENABLED, HybridRetriever
+from backend.retrieval.metadata_filters import QueryFilters
+from backend.retrieval.reranker import RERANK_ENABLED, CrossEncoderReranker
+from backend.retrieval.retrieval_pipeline import RERANK_CANDIDATES, RetrievalPipeline
+from backend.retrieval.rag_streaming import format_sources, stream_rag_events, to_sse
+from backend.retrieval.semantic_cache import SEMANTIC_CACHE_ENABLED, SemanticQueryCache
 from backend.mcp.crew_manager import CrewManager
+from backend.tenancy import (
+    MULTI_TENANT_ENABLED, TENANT_INCLUDE_SHARED, ShardRouter, collection_for, collections_for, tenant_for,
+)
 
 load_dotenv()
 
@@ -28,80 +58,447 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 # OAuth2 for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        # In a real application, you would verify the token with Supabase
-        # For now, we\"ll just return a dummy user if a token is present
-        if token:
-            return {"id": "dummy_user_id", "email": "dummy@example.com"}
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Not authenticated",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-    except Exception as e:
+def _user_from_token(token: Optional[str]) -> dict:
+    # Verifies the JWT issued by auth.py and loads the user it names; the
+    # user's team decides which tenant shard they read and write
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    payload = auth_manager.verify_token(token)
+    user = None
+    if payload and str(payload.get("sub", "")).isdigit():
+        user = auth_manager.get_user_by_id(int(payload["sub"]))
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return {"id": user.id, "username": user.username, "email": user.email, "team": user.team}
 
-# Initialize ChromaDB and Embeddings
-embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-vectordb = Chroma(persist_directory="./chroma_db", embedding_function=embeddings)
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # The user lookup is a SQLite query, so it runs on the shared pool rather than the event loop
+    return await run_blocking(_user_from_token, token)
+
+# Initialize the vector store (Chroma or the local ANN store, per VECTOR_STORE_BACKEND)
+# and embeddings, shared with the ingestion pipeline and loaded on warm-up
+embeddings = get_embeddings()
+vectordb = get_vector_store()
 
 # Initialize LLM (Ollama)
 llm = Ollama(model="llama2") # Ensure Ollama is running and a model is pulled (e.g., ollama pull llama2)
 
+# Hybrid BM25 + dense retrieval over-fetches candidates (the BM25 index is
+# maintained by the ingestion writer); a cross-encoder then keeps only the best
+# chunks that fit the prompt token budget.
+if HYBRID_RETRIEVAL_ENABLED and BM25_INDEX_ENABLED:
+    candidate_retriever = HybridRetriever(
+        vectorstore=vectordb, bm25_index=get_bm25_index(CHROMA_COLLECTION), k=RERANK_CANDIDATES
+    )
+else:
+    candidate_retriever = vectordb.as_retriever(search_kwargs={"k": RERANK_CANDIDATES})
+retrieval_pipeline = RetrievalPipeline(candidate_retriever, reranker=CrossEncoderReranker() if RERANK_ENABLED else None)
+retriever = retrieval_pipeline.as_retriever()
+
 # Initialize RAG QA Chain
 qa_chain = RetrievalQA.from_chain_type(
     llm=llm,
     chain_type="stuff",
-    retriever=vectordb.as_retriever()
+    retriever=retriever,
+    return_source_documents=True
 )
 
+# Answers to near-identical questions are served from a semantic cache that is
+# invalidated whenever the ingestion pipeline writes to the collection
+query_cache = SemanticQueryCache(embeddings, version=collection_version) if SEMANTIC_CACHE_ENABLED else None
+
+# With multi-tenancy each team (or user) ingests into and queries its own
+# shard, optionally fanned out together with the shared collection; every
+# shard set gets its own pipeline and semantic cache.
+shard_router = ShardRouter(reranker=retrieval_pipeline.reranker) if MULTI_TENANT_ENABLED else None
+shard_query_caches = {}
+
 # Initialize Ingestion Manager and Task Queue
 ingestion_manager = IngestionManager()
-ingestion_queue = IngestionTaskQueue(ingestion_manager)
+job_store = JobStore()
+ingestion_queue = IngestionTaskQueue(ingestion_manager, job_store=job_store)
 
 # Initialize CrewAI Manager
 crew_manager = CrewManager()
 
+# Per-endpoint concurrency limits and timeouts for LLM-bound work
+rag_limiter = EndpointLimiter("RAG", RAG_MAX_CONCURRENCY, RAG_TIMEOUT_SECONDS, max_waiting=RAG_MAX_WAITING)
+mcp_limiter = EndpointLimiter("MCP", MCP_MAX_CONCURRENCY, MCP_TIMEOUT_SECONDS, max_waiting=MCP_MAX_WAITING)
+batch_limiter = EndpointLimiter("Batch", BATCH_MAX_CONCURRENCY, BATCH_TIMEOUT_SECONDS, max_waiting=BATCH_MAX_WAITING)
+crawl_limiter = EndpointLimiter("Crawl", CRAWL_MAX_CONCURRENCY, CRAWL_WAIT_TIMEOUT_SECONDS, max_waiting=CRAWL_MAX_WAITING)
+bulk_limiter = EndpointLimiter("Bulk", BULK_MAX_CONCURRENCY, BULK_WAIT_TIMEOUT_SECONDS, max_waiting=BULK_MAX_WAITING)
+
 app = FastAPI()
 
 @app.on_event("startup")
 async def startup_event():
+    embedding_registry.warm_up()
+    if retrieval_pipeline.reranker is not None:
+        retrieval_pipeline.reranker.warm_up()
     ingestion_queue.start_workers()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     ingestion_queue.stop_workers()
+    if shard_router is not None:
+        shard_router.close()
+    close_writers()
+    shutdown_executor()
+    shutdown_extract_pool()
+    embedding_registry.shutdown()
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/embeddings/stats")
+async def embedding_stats(current_user: dict = Depends(get_current_user)):
+    return {"models": embedding_registry.stats(), "cache": embedding_registry.cache_stats()}
+
+@app.get("/ingest/stats")
+async def ingestion_stats(current_user: dict = Depends(get_current_user)):
+    stats = {"queue": ingestion_queue.stats(), "writers": writer_stats()}
+    if BM25_INDEX_ENABLED:
+        stats["bm25"] = get_bm25_index(CHROMA_COLLECTION).stats()
+    if hasattr(vectordb, "stats"):
+        stats["vector_store"] = vectordb.stats()
+    return stats
+
+@app.get("/retrieval/stats")
+async def retrieval_stats(current_user: dict = Depends(get_current_user)):
+    return retrieval_pipeline.stats()
+
+@app.get("/retrieval/shards/stats")
+async def shard_stats(current_user: dict = Depends(get_current_user)):
+    if shard_router is None:
+        return {"enabled": False}
+    # Only the caller's own shard and the shared collection are reported
+    shards = collections_for(current_user, include_shared=True)
+    return {"enabled": True, **await run_blocking(shard_router.stats, shards)}
+
+@app.get("/execution/stats")
+async def execution_stats(current_user: dict = Depends(get_current_user)):
+    return {
+        "rag": rag_limiter.stats(),
+        "mcp": mcp_limiter.stats(),
+        "batch": batch_limiter.stats(),
+        "crawl": crawl_limiter.stats(),
+        "bulk": bulk_limiter.stats(),
+    }
+
+async def _within_limits(call):
+    # Maps execution-layer limits onto HTTP errors
+    try:
+        return await call
+    except ConcurrencyLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "5"},
+        )
+    except ExecutionTimeoutError as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+
+def _bounded_int(request: dict, key: str, default: int, maximum: int) -> int:
+    # Positive integer request options, capped at the server's configured maximum
+    value = request.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{key} must be a positive integer")
+    return min(value, maximum)
+
+def _parse_filters(filters: Optional[dict]) -> Optional[dict]:
+    # Request filters (source, file_type, agent_domain, date_from, date_to) as a metadata where clause
+    try:
+        return QueryFilters(**(filters or {})).to_where()
+    except (TypeError, ValidationError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid filters: {e}")
+
+def _shards_for(current_user, request: dict) -> Optional[tuple]:
+    # The caller's shard, plus the shared collection unless the request opts out; None without multi-tenancy
+    if shard_router is None:
+        return None
+    return tuple(collections_for(current_user, include_shared=request.get("include_shared", TENANT_INCLUDE_SHARED)))
+
+def _ingest_routing(current_user) -> dict:
+    # Ingestion goes to the caller's own shard
+    if shard_router is None:
+        return {}
+    return {"collection_name": collection_for(tenant_for(current_user))}
+
+def _job_scope(current_user) -> dict:
+    # With multi-tenancy callers only see the jobs that ingest into their shard
+    if shard_router is None:
+        return {}
+    return {"collection": collection_for(tenant_for(current_user))}
+
+def _retriever_for(where: Optional[dict], shards: Optional[tuple] = None):
+    if where is None and shards is None:
+        return retriever
+    pipeline = retrieval_pipeline if shards is None else shard_router.pipeline(shards)
+    return pipeline.as_retriever(filter=where)
+
+def _qa_chain_for(where: Optional[dict], shards: Optional[tuple] = None):
+    # Scoped queries get a chain whose retriever pushes the filter into the searches
+    if where is None and shards is None:
+        return qa_chain
+    return RetrievalQA.from_chain_type(
+        llm=llm,
+        chain_type="stuff",
+        retriever=_retriever_for(where, shards),
+        return_source_documents=True
+    )
+
+def _query_cache_for(where: Optional[dict], shards: Optional[tuple] = None):
+    # The semantic cache is keyed on query text only, so filtered queries bypass
+    # it and each shard set has its own, invalidated by writes to any of its shards
+    if query_cache is None or where is not None:
+        return None
+    if shards is None:
+        return query_cache
+    cache = shard_query_caches.get(shards)
+    if cache is None:
+        cache = shard_query_caches.setdefault(shards, SemanticQueryCache(
+            embeddings, version=lambda: tuple(collection_version(shard) for shard in shards)
+        ))
+    return cache
+
+async def _stream_events(query_text: str, where: Optional[dict] = None, shards: Optional[tuple] = None):
+    # Holds a RAG slot for the whole stream; the blocking generator runs in a worker thread
+    try:
+        async with rag_limiter.slot():
+            events = stream_rag_events(query_text, _retriever_for(where, shards), llm, _query_cache_for(where, shards))
+            async for event in iterate_in_threadpool(events):
+                yield event
+    except (ConcurrencyLimitError, ExecutionTimeoutError) as e:
+        yield {"event": "error", "data": str(e)}
+
 @app.post("/query_rag")
 async def query_rag(query: dict, current_user: dict = Depends(get_current_user)):
-    response = qa_chain.invoke({"query": query["query"]})
-    return {"response": response["result"]}
+    where = _parse_filters(query.get("filters"))
+    shards = _shards_for(current_user, query)
+    # The cache embeds the query, so it runs off the event loop
+    cache = _query_cache_for(where, shards)
+    if cache is not None:
+        cached = await run_blocking(cache.lookup, query["query"])
+        if cached is not None:
+            return {"response": cached["answer"], "sources": cached["sources"], "cached": True}
+
+    # The chain has a native async path (aiohttp for Ollama, executor for Chroma)
+    chain = _qa_chain_for(where, shards)
+    response = await _within_limits(rag_limiter.call_async(chain.ainvoke, {"query": query["query"]}))
+    sources = format_sources(response.get("source_documents", []))
+    if cache is not None:
+        await run_blocking(cache.store, query["query"], response["result"], sources)
+    return {"response": response["result"], "sources": sources, "cached": False}
+
+@app.post("/query_rag/stream")
+async def query_rag_stream(query: dict, current_user: dict = Depends(get_current_user)):
+    # Server-Sent Events: sources first, then tokens as Ollama generates them
+    where = _parse_filters(query.get("filters"))
+    shards = _shards_for(current_user, query)
+
+    async def body():
+        async for event in _stream_events(query["query"], where, shards):
+            yield to_sse(event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/query_rag")
+async def query_rag_websocket(websocket: WebSocket, token: Optional[str] = None):
+    # Browsers cannot set headers on WebSocket requests, so the token comes as a query parameter
+    try:
+        current_user = await run_blocking(_user_from_token, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_json()
+            try:
+                where = _parse_filters(message.get("filters"))
+            except HTTPException as e:
+                await websocket.send_json({"event": "error", "data": e.detail})
+                continue
+            async for event in _stream_events(message["query"], where, _shards_for(current_user, message)):
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
+def _batch_inputs(request: dict, field: str, limit: int) -> list:
+    values = request.get(field)
+    if not isinstance(values, list) or not values or not all(isinstance(value, str) for value in values):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{field} must be a non-empty list of strings")
+    if len(values) > limit:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {limit} {field} per request")
+    return values
+
+@app.post("/retrieve/batch")
+async def retrieve_batch(request: dict, current_user: dict = Depends(get_current_user)):
+    # Ranked chunks for many queries without generation: one batched embedding
+    # call and one search per collection serve the whole request
+    queries = _batch_inputs(request, "queries", BATCH_MAX_QUERIES)
+    k = request.get("k", 10)
+    if not isinstance(k, int) or not 1 <= k <= BATCH_MAX_K:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"k must be between 1 and {BATCH_MAX_K}")
+    where = _parse_filters(request.get("filters"))
+    shards = _shards_for(current_user, request)
+    batch_retriever = BatchRetriever(
+        embeddings,
+        collections=shards or (CHROMA_COLLECTION,),
+        hybrid=request.get("hybrid", HYBRID_RETRIEVAL_ENABLED and BM25_INDEX_ENABLED) and BM25_INDEX_ENABLED,
+    )
+    results = await _within_limits(batch_limiter.call(batch_retriever.retrieve, queries, k=k, filter=where))
+    return {"results": [{"query": query, "hits": hits} for query, hits in zip(queries, results)]}
+
+@app.post("/embeddings/batch")
+async def embed_batch(request: dict, current_user: dict = Depends(get_current_user)):
+    # Raw vectors from the shared model; documents go through the embedding cache
+    texts = _batch_inputs(request, "texts", BATCH_MAX_TEXTS)
+    input_type = request.get("input_type", "document")
+    if input_type not in ("document", "query"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="input_type must be 'document' or 'query'")
+    embed = embeddings.embed_documents if input_type == "document" else lambda texts: embed_queries(embeddings, texts)
+    vectors = await _within_limits(batch_limiter.call(embed, texts))
+    return {
+        "model": getattr(embeddings, "model_name", None),
+        "dimension": len(vectors[0]) if vectors else 0,
+        "embeddings": vectors,
+    }
+
+@app.get("/query/cache/stats")
+async def query_cache_stats(current_user: dict = Depends(get_current_user)):
+    if query_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **query_cache.stats()}
 
 @app.post("/run_mcp")
 async def run_mcp(query: dict, current_user: dict = Depends(get_current_user)):
-    response = crew_manager.run_crew(
+    # CrewAI runs synchronously, so it goes to the bounded thread pool
+    response = await _within_limits(mcp_limiter.call(
+        crew_manager.run_crew,
         query=query["query"],
         agent_type=query["agent_type"],
         task_type=query["task_type"],
         **query.get("task_kwargs", {})
-    )
+    ))
     return {"response": response}
 
 @app.post("/ingest_document")
-async def ingest_document(file_path: str, file_type: str, current_user: dict = Depends(get_current_user)):
+async def ingest_document(file_path: str, file_type: Optional[str] = None, priority: str = "interactive", current_user: dict = Depends(get_current_user)):
     # In a real application, you would handle file uploads securely
     # For now, we assume file_path is accessible by the ingestion manager
-    ingestion_queue.add_task(file_path, file_type)
-    return {"message": f"Ingestion task for {file_path} ({file_type}) added to queue."}
+    if file_type is None:
+        # Detected from the extension, MIME type or leading bytes of the file
+        file_type = detect_file_type(file_path)
+        if file_type is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not detect the file type of {file_path}")
+    try:
+        task = ingestion_queue.add_task(file_path, file_type, priority=priority, **_ingest_routing(current_user))
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "30"},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"message": f"Ingestion task for {file_path} ({file_type}) added to queue.", "job_id": task.job_id}
+
+@app.post("/ingest/bulk")
+async def ingest_bulk(request: dict, current_user: dict = Depends(get_current_user)):
+    # Accepts a server-side directory, glob pattern or zip archive and streams
+    # one NDJSON progress line per file followed by a throughput summary
+    source = request.get("source")
+    if not source or not isinstance(source, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="source is required")
+    ingestor = BulkIngestor(
+        ingestion_manager,
+        workers=_bounded_int(request, "workers", BULK_INGEST_WORKERS, BULK_INGEST_WORKERS),
+        **_ingest_routing(current_user),
+    )
+
+    async def events():
+        # Holds a bulk slot for the whole run; the blocking generator runs in a worker thread
+        try:
+            async with bulk_limiter.slot():
+                async for event in iterate_in_threadpool(ingestor.run(source)):
+                    yield json.dumps(event) + "\n"
+        # ValueError: an archive with unsafe paths or over the extraction limits
+        except (ConcurrencyLimitError, ExecutionTimeoutError, ValueError) as e:
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/ingest/crawl")
+async def ingest_crawl(request: dict, current_user: dict = Depends(get_current_user)):
+    # Crawls seed URLs and/or a sitemap concurrently and streams one NDJSON
+    # line per page (ingested, not modified, ignored or failed) plus a summary
+    urls, sitemap = request.get("urls") or [], request.get("sitemap")
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="urls must be a list of strings")
+    if sitemap is not None and not isinstance(sitemap, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="sitemap must be a string")
+    if not urls and not sitemap:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="urls or sitemap is required")
+    # Imported here so the server does not load httpx and lxml until the first crawl
+    from backend.ingestion.web_crawler import (
+        CRAWL_CONCURRENCY, CRAWL_MAX_PAGES, UnsafeURLError, WebCrawler, check_url, host_rate_limiter,
+    )
+    try:
+        # Hosts are resolved and checked again on every request and redirect hop
+        for url in urls + ([sitemap] if sitemap else []):
+            check_url(url)
+    except UnsafeURLError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    crawler = WebCrawler(
+        ingestion_manager,
+        concurrency=_bounded_int(request, "concurrency", CRAWL_CONCURRENCY, CRAWL_CONCURRENCY),
+        max_pages=_bounded_int(request, "max_pages", CRAWL_MAX_PAGES, CRAWL_MAX_PAGES),
+        rate_limiter=host_rate_limiter,
+        **_ingest_routing(current_user),
+    )
+
+    async def events():
+        # Holds a crawl slot for the whole stream, like the RAG token stream
+        try:
+            async with crawl_limiter.slot():
+                async for event in crawler.crawl(urls, sitemap):
+                    yield json.dumps(event) + "\n"
+        except (ConcurrencyLimitError, ExecutionTimeoutError) as e:
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/ingest/jobs")
+async def list_ingestion_jobs(
+    job_status: Optional[str] = Query(None, alias="status"),
+    limit: int = 100,
+    offset: int = 0,
+    current_user: dict = Depends(get_current_user),
+):
+    if job_status is not None and job_status not in JOB_STATUSES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown job status: {job_status}")
+    return {"jobs": job_store.list(status=job_status, limit=min(limit, 1000), offset=offset, **_job_scope(current_user))}
+
+@app.get("/ingest/jobs/{job_id}")
+async def get_ingestion_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = job_store.get(job_id)
+    scope = _job_scope(current_user)
+    if job is None or ("collection" in scope and job.get("collection") != scope["collection"]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
 
 
@@ -0,0 +1,164 @@
+"""
+Per-document ingestion manifests.
+Records what was ingested for every source (file fingerprint plus chunk ids and
+chunk hashes) so re-ingestion only touches the chunks that actually changed.
+"""
+
+import os
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", "./ingestion_manifest.db")
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Hash a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ManifestStore:
+    """
+    SQLite store of document manifests keyed by source path or URL.
+    """
+
+    def __init__(self, db_path: str = INGESTION_MANIFEST_PATH):
+        self.db_path = db_path
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize the manifest tables."""
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    source TEXT PRIMARY KEY,
+                    file_type TEXT NOT NULL,
+                    mtime REAL,
+                    size INTEGER,
+                    file_hash TEXT,
+                    chunk_count INTEGER NOT NULL,
+                    ingested_at REAL NOT NULL,
+                    agent_domain TEXT
+                )
+            """)
+            # Manifests written before chunks were tagged have no agent_domain column
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(documents)")}
+            if "agent_domain" not in columns:
+                conn.execute("ALTER TABLE documents ADD COLUMN agent_domain TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    source TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    PRIMARY KEY (source, chunk_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS collection_versions (
+                    collection TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_validators (
+                    source TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            """)
+
+    @contextmanager
+    def _get_db_connection(self):
+        """Get a database connection with proper cleanup."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """Return the manifest for a source, with ``chunks`` mapping chunk id to chunk hash."""
+        with self._get_db_connection() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE source = ?", (source,)).fetchone()
+            if not row:
+                return None
+            manifest = dict(row)
+            manifest["chunks"] = {
+                chunk["chunk_id"]: chunk["chunk_hash"]
+                for chunk in conn.execute("SELECT chunk_id, chunk_hash FROM chunks WHERE source = ?", (source,))
+            }
+            return manifest
+
+    def save(
+        self,
+        source: str,
+        file_type: str,
+        chunks: Dict[str, str],
+        mtime: Optional[float] = None,
+        size: Optional[int] = None,
+        file_hash: Optional[str] = None,
+        agent_domain: Optional[str] = None,
+    ):
+        """Replace the manifest for a source."""
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO documents
+                    (source, file_type, mtime, size, file_hash, chunk_count, ingested_at, agent_domain)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (source, file_type, mtime, size, file_hash, len(chunks), time.time(), agent_domain))
+            conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            conn.executemany(
+                "INSERT INTO chunks (source, chunk_id, chunk_hash) VALUES (?, ?, ?)",
+                [(source, chunk_id, chunk_hash) for chunk_id, chunk_hash in chunks.items()],
+            )
+
+    def touch(self, source: str, mtime: float, size: int):
+        """Record a new mtime/size for a document whose content did not change."""
+        with self._get_db_connection() as conn:
+            conn.execute("UPDATE documents SET mtime = ?, size = ? WHERE source = ?", (mtime, size, source))
+
+    def get_validators(self, source: str) -> Optional[Dict[str, Optional[str]]]:
+        """ETag and Last-Modified of the last ingested response for a URL, for conditional requests."""
+        with self._get_db_connection() as conn:
+            row = conn.execute("SELECT etag, last_modified FROM http_validators WHERE source = ?", (source,)).fetchone()
+            return dict(row) if row else None
+
+    def save_validators(self, source: str, etag: Optional[str], last_modified: Optional[str]):
+        with self._get_db_connection() as conn:
+            if etag is None and last_modified is None:
+                conn.execute("DELETE FROM http_validators WHERE source = ?", (source,))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO http_validators (source, etag, last_modified) VALUES (?, ?, ?)",
+                    (source, etag, last_modified),
+                )
+
+    def bump_collection_version(self, collection: str):
+        """Record that a collection's contents changed, for every process sharing this store."""
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                INSERT INTO collection_versions (collection, version) VALUES (?, 1)
+                ON CONFLICT(collection) DO UPDATE SET version = version + 1
+            """, (collection,))
+
+    def collection_version(self, collection: str) -> int:
+        with self._get_db_connection() as conn:
+            row = conn.execute("SELECT version FROM collection_versions WHERE collection = ?", (collection,)).fetchone()
+            return row["version"] if row else 0
+
+    def delete(self, source: str):
+        with self._get_db_connection() as conn:
+            conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+            conn.execute("DELETE FROM http_validators WHERE source = ?", (source,))
@@ -0,0 +1,183 @@
+"""
+Metadata filters for scoped retrieval.
+Query filters (source, file type, agent domain, date range) are translated
+into a Chroma-style ``where`` clause that every search backend understands:
+Chroma evaluates it natively, while the local vector store and the BM25 index
+resolve it against in-memory per-field postings before scoring, so a scoped
+query only scores the matching fraction of the collection.
+"""
+
+import re
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from typing import Any, Dict, Hashable, List, Optional, Set, Union
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, field_validator
+
+# Domains served by the MCP agents
+AGENT_DOMAINS = ("prince2", "itil", "agile", "ai_strategy")
+CATEGORICAL_FIELDS = ("source", "file_type", "agent_domain")
+NUMERIC_FIELDS = ("modified_at",)
+
+_DOMAIN_PATTERNS = [
+    ("prince2", re.compile(r"prince\s*2", re.I)),
+    ("itil", re.compile(r"\bitil", re.I)),
+    ("agile", re.compile(r"agile|scrum|kanban", re.I)),
+    ("ai_strategy", re.compile(r"\bai[\s_-]*strategy|artificial[\s_-]*intelligence", re.I)),
+]
+
+
+def infer_agent_domain(source: str, text: str = "") -> str:
+    """Guess the agent domain from a document's path (or its opening text), else "general"."""
+    for candidate in (source.replace("_", " "), text):
+        for domain, pattern in _DOMAIN_PATTERNS:
+            if pattern.search(candidate):
+                return domain
+    return "general"
+
+
+def _as_timestamp(value: Union[date, datetime], end_of_day: bool = False) -> float:
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.max if end_of_day else time.min)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class QueryFilters(BaseModel):
+    """
+    Optional retrieval scope; list fields match any of their values. Unknown
+    fields are rejected, so a misspelled filter fails instead of going unscoped.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    source: Optional[List[str]] = None
+    file_type: Optional[List[str]] = None
+    agent_domain: Optional[List[str]] = None
+    date_from: Optional[Union[date, datetime]] = None
+    date_to: Optional[Union[date, datetime]] = None
+
+    @field_validator("source", "file_type", "agent_domain", mode="before")
+    @classmethod
+    def _listify(cls, value):
+        return [value] if isinstance(value, str) else value
+
+    @field_validator("file_type", "agent_domain")
+    @classmethod
+    def _lowercase(cls, value):
+        return [item.lower() for item in value] if value is not None else value
+
+    def to_where(self) -> Optional[Dict[str, Any]]:
+        """Chroma ``where`` clause for these filters, or None when unscoped."""
+        conditions = []
+        for field in CATEGORICAL_FIELDS:
+            values = getattr(self, field)
+            if values:
+                conditions.append({field: {"$in": values}})
+        if self.date_from is not None:
+            conditions.append({"modified_at": {"$gte": _as_timestamp(self.date_from)}})
+        if self.date_to is not None:
+            conditions.append({"modified_at": {"$lte": _as_timestamp(self.date_to, end_of_day=True)}})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+_COMPARATORS = {
+    "$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal,
+}
+
+
+class MetadataIndex:
+    """
+    Per-field postings (value -> keys) for the categorical filter fields and
+    key -> value maps for the numeric ones, keyed by whatever the owning
+    store uses to address chunks (vector slots, chunk ids).
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Any, Set[Hashable]]] = {field: defaultdict(set) for field in CATEGORICAL_FIELDS}
+        self._numbers: Dict[str, Dict[Hashable, float]] = {field: {} for field in NUMERIC_FIELDS}
+        self._arrays: Dict[str, tuple] = {}
+        # key -> its categorical (field, value) pairs, so removal touches only its postings
+        self._keys: Dict[Hashable, List[tuple]] = {}
+
+    def add(self, key: Hashable, metadata: Dict[str, Any]):
+        self.remove(key)
+        values = [(field, metadata[field]) for field in CATEGORICAL_FIELDS if metadata.get(field) is not None]
+        self._keys[key] = values
+        for field, value in values:
+            self._postings[field][value].add(key)
+        for field in NUMERIC_FIELDS:
+            if metadata.get(field) is not None:
+                self._numbers[field][key] = float(metadata[field])
+                self._arrays.pop(field, None)
+
+    def remove(self, key: Hashable):
+        values = self._keys.pop(key, None)
+        if values is None:
+            return
+        for field, value in values:
+            postings = self._postings[field]
+            postings[value].discard(key)
+            if not postings[value]:
+                del postings[value]
+        for field, numbers in self._numbers.items():
+            if numbers.pop(key, None) is not None:
+                self._arrays.pop(field, None)
+
+    def clear(self):
+        self.__init__()
+
+    def select(self, where: Dict[str, Any]) -> Set[Hashable]:
+        """Keys whose metadata satisfies a ``where`` clause."""
+        if "$and" in where:
+            selected = None
+            for clause in sorted(where["$and"], key=lambda clause: "$and" in clause or "$or" in clause):
+                matched = self.select(clause)
+                selected = matched if selected is None else selected & matched
+                if not selected:
+                    break
+            return selected or set()
+        if "$or" in where:
+            return set().union(*(self.select(clause) for clause in where["$or"]))
+        if len(where) != 1:
+            return self.select({"$and": [{field: condition} for field, condition in where.items()]})
+
+        (field, condition), = where.items()
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        selected = None
+        for operator, operand in condition.items():
+            matched = self._select_field(field, operator, operand)
+            selected = matched if selected is None else selected & matched
+        return selected or set()
+
+    def _select_field(self, field: str, operator: str, operand: Any) -> Set[Hashable]:
+        if field in self._postings:
+            postings = self._postings[field]
+            if operator == "$eq":
+                return set(postings.get(operand, ()))
+            if operator == "$in":
+                return set().union(*(postings.get(value, set()) for value in operand))
+            if operator == "$ne":
+                return set(self._keys) - postings.get(operand, set())
+            if operator == "$nin":
+                return set(self._keys) - set().union(*(postings.get(value, set()) for value in operand))
+        elif field in self._numbers and operator in _COMPARATORS:
+            keys, values = self._numeric_arrays(field)
+            return set(keys[_COMPARATORS[operator](values, operand)].tolist())
+        raise ValueError(f"Unsupported metadata filter: {field} {operator}")
+
+    def _numeric_arrays(self, field: str) -> tuple:
+        arrays = self._arrays.get(field)
+        if arrays is None:
+            numbers = self._numbers[field]
+            arrays = (np.array(list(numbers.keys()), dtype=object), np.fromiter(numbers.values(), dtype=np.float64, count=len(numbers)))
+            self._arrays[field] = arrays
+        return arrays
+
+    def __len__(self) -> int:
+        return len(self._keys)
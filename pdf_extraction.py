@@ -0,0 +1,17 @@
+"""
+Page-range extraction run in the shared extraction pool. Kept apart from
+pdf_ingestion so the spawn-started workers that import it only load pypdf,
+not the text splitter or the vector store.
+"""
+
+from typing import List, Tuple
+
+import pypdf
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    Extracts pages [start, stop) of a PDF as (page_number, text). Runs in a worker process.
+    """
+    reader = pypdf.PdfReader(file_path)
+    return [(index + 1, reader.pages[index].extract_text() or "") for index in range(start, stop)]
@@ -1,40 +1,113 @@
 
+import os
 import pypdf
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+
+from backend.ingestion.extraction_pool import get_extract_pool
+from backend.ingestion.pdf_extraction import extract_page_range
+
+# Number of pages extracted, chunked and written together when streaming a PDF
+PDF_PAGE_WINDOW = int(os.getenv("PDF_PAGE_WINDOW", "16"))
+
+# Parallel text extraction: page ranges one PDF may have in the shared extraction
+# pool at once (x2), the page count below which a PDF is extracted serially, and
+# the number of pages handed to a worker at a time
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+def iter_pdf_pages(
+    file_path: str,
+    workers: int = PDF_EXTRACT_WORKERS,
+    min_parallel_pages: int = PDF_PARALLEL_MIN_PAGES,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) for each page of a PDF in page order.
+    Page numbers start at 1. Large PDFs are split into page ranges extracted by
+    the shared extraction pool; small ones (or workers <= 1) are extracted serially.
+    """
+    reader = pypdf.PdfReader(file_path)
+    page_count = len(reader.pages)
+    if workers <= 1 or page_count < max(min_parallel_pages, 2):
+        for page_number, page in enumerate(reader.pages, start=1):
+            yield page_number, page.extract_text() or ""
+        return
+    del reader
+
+    ranges = iter([(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)])
+    executor = get_extract_pool()
+    # Keep a bounded number of ranges in flight so memory stays bounded
+    # when the consumer (chunking/embedding) is slower than extraction.
+    in_flight = deque()
+    try:
+        for start, stop in ranges:
+            in_flight.append(executor.submit(extract_page_range, file_path, start, stop))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            pages = in_flight.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                in_flight.append(executor.submit(extract_page_range, file_path, *next_range))
+            yield from pages
+    finally:
+        # A consumer that stops early leaves the shared pool free for other documents
+        for future in in_flight:
+            future.cancel()
 
-def ingest_pdf(file_path: str, collection_name: str = "my_documents"):
+def iter_pdf_windows(file_path: str, page_window: int = PDF_PAGE_WINDOW, workers: int = PDF_EXTRACT_WORKERS) -> Iterator[List[Document]]:
+    """
+    Yields the chunks of a PDF in windows of ``page_window`` pages, so only one
+    window of text is held in memory at a time. Each chunk carries its page number.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    window: List[Document] = []
+    pages_in_window = 0
+    for page_number, text in iter_pdf_pages(file_path, workers=workers):
+        window.extend(text_splitter.create_documents([text], metadatas=[{"page": page_number}]))
+        pages_in_window += 1
+        if pages_in_window >= page_window:
+            yield window
+            window = []
+            pages_in_window = 0
+    if window:
+        yield window
+
+def load_pdf(file_path: str, workers: int = PDF_EXTRACT_WORKERS) -> Iterator[Document]:
+    """
+    Loads a PDF file page by page and yields its chunks.
+    """
+    for window in iter_pdf_windows(file_path, workers=workers):
+        yield from window
+
+def ingest_pdf(
+    file_path: str,
+    collection_name: Optional[str] = None,
+    page_window: int = PDF_PAGE_WINDOW,
+    workers: int = PDF_EXTRACT_WORKERS,
+):
     """
     Ingests a PDF file, extracts text, chunks it, generates embeddings, and stores them in ChromaDB.
+    Pages are processed and written in windows to keep memory bounded on very large files.
     """
     try:
-        # Load PDF
-        loader = pypdf.PdfReader(file_path)
-        text = ""
-        for page in loader.pages:
-            text += page.extract_text()
-
-        # Chunk text
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            is_separator_regex=False,
-        )
-        chunks = text_splitter.create_documents([text])
-
-        # Generate embeddings
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-        # Store in ChromaDB
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            collection_name=collection_name,
-            persist_directory="./chroma_db"
-        )
-        print(f"Successfully ingested {file_path} into ChromaDB collection {collection_name}")
+        from backend.ingestion.ingestion_manager import ingest_file
+
+        def parse(path: str, file_type: str) -> Iterator[Document]:
+            for window in iter_pdf_windows(path, page_window, workers=workers):
+                yield from window
+
+        return ingest_file(file_path, "pdf", collection_name, parse=parse)
 
     except Exception as e:
         print(f"Error ingesting PDF {file_path}: {e}")
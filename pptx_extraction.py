@@ -0,0 +1,104 @@
+"""
+Slide text extraction from a deck's XML parts. Kept apart from pptx_ingestion
+so the spawn-started workers of the shared extraction pool only load lxml,
+not the text splitter or the vector store.
+"""
+
+import posixpath
+import zipfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lxml import etree
+
+_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS = {"a": _A, "p": _P, "r": _R}
+_NOTES_SLIDE_REL = _R + "/notesSlide"
+_TITLE_PLACEHOLDERS = ("title", "ctrTitle")
+
+# (slide number, slide part, notes part)
+SlidePart = Tuple[int, str, Optional[str]]
+# (slide number, title, slide text, speaker notes)
+SlideText = Tuple[int, Optional[str], str, str]
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """Relationship id -> (type, target part name) for an internal part."""
+    folder, name = posixpath.split(part)
+    try:
+        root = etree.fromstring(archive.read(posixpath.join(folder, "_rels", name + ".rels")))
+    except KeyError:
+        return {}
+    return {
+        rel.get("Id"): (rel.get("Type"), posixpath.normpath(posixpath.join(folder, rel.get("Target"))))
+        for rel in root
+        if rel.get("TargetMode") != "External"
+    }
+
+def slide_parts(archive: zipfile.ZipFile) -> List[SlidePart]:
+    """Slides in presentation order with their part names and speaker-notes part, if any."""
+    presentation = etree.fromstring(archive.read("ppt/presentation.xml"))
+    presentation_rels = _relationships(archive, "ppt/presentation.xml")
+    parts = []
+    for slide_number, slide_id in enumerate(presentation.iterfind("p:sldIdLst/p:sldId", _NS), start=1):
+        slide_part = presentation_rels[slide_id.get(f"{{{_R}}}id")][1]
+        notes_part = next((target for rel_type, target in _relationships(archive, slide_part).values()
+                           if rel_type == _NOTES_SLIDE_REL), None)
+        parts.append((slide_number, slide_part, notes_part))
+    return parts
+
+def _paragraphs(text_body) -> str:
+    return "\n".join(
+        text for text in ("".join(paragraph.itertext()).strip() for paragraph in text_body.iterfind("a:p", _NS)) if text
+    )
+
+def _table_text(table) -> str:
+    """Whole table as one block: a row per line, cells separated by " | "."""
+    rows = []
+    for row in table.iterfind("a:tr", _NS):
+        cells = [" ".join("".join(cell.itertext()).split()) for cell in row.iterfind("a:tc", _NS)]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
+def _placeholder_type(shape) -> Optional[str]:
+    placeholder = shape.find("p:nvSpPr/p:nvPr/p:ph", _NS)
+    if placeholder is None:
+        return None
+    return placeholder.get("type", "body")
+
+def _slide_text(root) -> Tuple[Optional[str], str]:
+    """Title and text of a slide: shape text and tables in document order, including grouped shapes."""
+    title, blocks = None, []
+    for element in root.iter(f"{{{_P}}}sp", f"{{{_A}}}tbl"):
+        if element.tag == f"{{{_A}}}tbl":
+            text = _table_text(element)
+        else:
+            text_body = element.find("p:txBody", _NS)
+            text = _paragraphs(text_body) if text_body is not None else ""
+            if text and title is None and _placeholder_type(element) in _TITLE_PLACEHOLDERS:
+                title = " ".join(text.split())
+        if text:
+            blocks.append(text)
+    return title, "\n".join(blocks)
+
+def _notes_text(root) -> str:
+    """Speaker notes: the notes page's body placeholder (not its slide image or number)."""
+    return "\n".join(
+        _paragraphs(shape.find("p:txBody", _NS))
+        for shape in root.iter(f"{{{_P}}}sp")
+        if _placeholder_type(shape) == "body" and shape.find("p:txBody", _NS) is not None
+    ).strip()
+
+def extract_slides(file_path: str, parts: Sequence[SlidePart]) -> List[SlideText]:
+    """
+    Extracts the given slides of a deck. Runs in a worker process, which only
+    parses the XML of its own slides.
+    """
+    slides = []
+    with zipfile.ZipFile(file_path) as archive:
+        for slide_number, slide_part, notes_part in parts:
+            title, text = _slide_text(etree.fromstring(archive.read(slide_part)))
+            notes = _notes_text(etree.fromstring(archive.read(notes_part))) if notes_part else ""
+            slides.append((slide_number, title, text, notes))
+    return slides
@@ -1,61 +1,154 @@
+import os
+import zipfile
+from collections import deque
+from typing import Iterator, List, Optional
 
-from pptx import Presentation
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
 
-def ingest_pptx(file_path: str, collection_name: str = "my_documents"):
+from backend.ingestion.extraction_pool import get_extract_pool
+from backend.ingestion.pptx_extraction import SlideText, extract_slides, slide_parts
+
+# Number of slides extracted, chunked and written together when streaming a deck
+PPTX_SLIDE_WINDOW = int(os.getenv("PPTX_SLIDE_WINDOW", "64"))
+
+# Parallel extraction: slide ranges one deck may have in the shared extraction
+# pool at once (x2), the slide count below which a deck is extracted serially,
+# and the number of slides handed to a worker at a time
+PPTX_EXTRACT_WORKERS = int(os.getenv("PPTX_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PPTX_PARALLEL_MIN_SLIDES = int(os.getenv("PPTX_PARALLEL_MIN_SLIDES", "128"))
+PPTX_SLIDES_PER_TASK = int(os.getenv("PPTX_SLIDES_PER_TASK", "64"))
+
+def iter_pptx_slides(
+    file_path: str,
+    workers: int = PPTX_EXTRACT_WORKERS,
+    min_parallel_slides: int = PPTX_PARALLEL_MIN_SLIDES,
+    slides_per_task: int = PPTX_SLIDES_PER_TASK,
+) -> Iterator[SlideText]:
+    """
+    Yields (slide_number, title, text, notes) for each slide in presentation
+    order. Large decks are split into slide ranges extracted by the shared
+    extraction pool; small ones (or workers <= 1) are extracted serially.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        parts = slide_parts(archive)
+    if workers <= 1 or len(parts) < max(min_parallel_slides, 2):
+        yield from extract_slides(file_path, parts)
+        return
+
+    ranges = iter([parts[start:start + slides_per_task] for start in range(0, len(parts), slides_per_task)])
+    executor = get_extract_pool()
+    # Keep a bounded number of ranges in flight so memory stays bounded
+    # when the consumer (chunking/embedding) is slower than extraction.
+    in_flight = deque()
+    try:
+        for slide_range in ranges:
+            in_flight.append(executor.submit(extract_slides, file_path, slide_range))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            slides = in_flight.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                in_flight.append(executor.submit(extract_slides, file_path, next_range))
+            yield from slides
+    finally:
+        # A consumer that stops early leaves the shared pool free for other documents
+        for future in in_flight:
+            future.cancel()
+
+def iter_pptx_windows(file_path: str, slide_window: int = PPTX_SLIDE_WINDOW, workers: int = PPTX_EXTRACT_WORKERS) -> Iterator[List[Document]]:
+    """
+    Yields the chunks of a deck in windows of ``slide_window`` slides. Chunks
+    never span slides; each carries its slide number (and title, when the
+    slide has one), and the speaker notes are kept at the end of their slide's text.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    window: List[Document] = []
+    slides_in_window = 0
+    for slide_number, title, text, notes in iter_pptx_slides(file_path, workers=workers):
+        content = f"{text}\n\nSpeaker notes:\n{notes}" if notes else text
+        if content:
+            metadata = {"slide": slide_number, "has_notes": bool(notes)}
+            if title:
+                metadata["slide_title"] = title
+            window.extend(text_splitter.create_documents([content], metadatas=[metadata]))
+        slides_in_window += 1
+        if slides_in_window >= slide_window:
+            yield window
+            window = []
+            slides_in_window = 0
+    if window:
+        yield window
+
+def load_pptx(file_path: str, workers: int = PPTX_EXTRACT_WORKERS) -> Iterator[Document]:
+    """
+    Loads a PPTX file slide by slide and yields chunks tagged with their slide number.
+    """
+    for window in iter_pptx_windows(file_path, workers=workers):
+        yield from window
+
+def ingest_pptx(
+    file_path: str,
+    collection_name: Optional[str] = None,
+    slide_window: int = PPTX_SLIDE_WINDOW,
+    workers: int = PPTX_EXTRACT_WORKERS,
+):
     """
     Ingests a PPTX file, extracts text, chunks it, generates embeddings, and stores them in ChromaDB.
+    Slides are processed and written in windows to keep memory bounded on very large decks.
     """
     try:
-        prs = Presentation(file_path)
-        full_text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text_frame") and shape.text_frame:
-                    text_frame_text = shape.text_frame.text
-                    if text_frame_text:
-                        full_text.append(text_frame_text)
-                if hasattr(shape, "table") and shape.table:
-                    for row in shape.table.rows:
-                        for cell in row.cells:
-                            if cell.text:
-                                full_text.append(cell.text)
-
-        text = "\n".join(full_text)
-
-        # Chunk text
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            is_separator_regex=False,
-        )
-        chunks = text_splitter.create_documents([text])
-
-        # Generate embeddings
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-        # Store in ChromaDB
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            collection_name=collection_name,
-            persist_directory="./chroma_db"
-        )
-        print(f"Successfully ingested {file_path} into ChromaDB collection {collection_name}")
+        from backend.ingestion.ingestion_manager import ingest_file
+
+        def parse(path: str, file_type: str) -> Iterator[Document]:
+            for window in iter_pptx_windows(path, slide_window, workers=workers):
+                yield from window
+
+        return ingest_file(file_path, "pptx", collection_name, parse=parse)
 
     except Exception as e:
         print(f"Error ingesting PPTX {file_path}: {e}")
 
+def synthetic_deck(file_path: str, slides: int = 1000) -> str:
+    """Writes a deck of titled slides with bullets, a table and speaker notes, for tests and benchmarks."""
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for number in range(1, slides + 1):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {number}: delivery stage review"
+        slide.placeholders[1].text = f"Stage {number} objectives\nRisks and issues\nNext stage plan"
+        table = slide.shapes.add_table(3, 3, Inches(1), Inches(4.5), Inches(6), Inches(1.2)).table
+        for row in range(3):
+            for column in range(3):
+                table.cell(row, column).text = f"r{row}c{column}-{number}"
+        slide.notes_slide.notes_text_frame.text = f"Presenter notes for slide {number}"
+    prs.save(file_path)
+    return file_path
+
 if __name__ == "__main__":
-    import os
-    os.makedirs("../data", exist_ok=True)
-    # Example usage (requires a dummy.pptx in the data directory)
-    # You would typically have your PPTX files here
-    # For demonstration, let's assume you have a dummy.pptx in the data folder
-    # ingest_pptx("../data/dummy.pptx")
-    print("To test, create a PPTX file in the ../data directory and uncomment the ingest_pptx line.")
+    import argparse
+    import tempfile
+    import time
 
+    parser = argparse.ArgumentParser(description="Measure PPTX extraction throughput on a synthetic deck.")
+    parser.add_argument("--slides", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=PPTX_EXTRACT_WORKERS)
+    args = parser.parse_args()
 
+    with tempfile.TemporaryDirectory() as directory:
+        deck = synthetic_deck(os.path.join(directory, "synthetic.pptx"), args.slides)
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            chunks = sum(1 for _ in load_pptx(deck, workers=workers))
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers} slides={args.slides} chunks={chunks} "
+                  f"seconds={elapsed:.2f} slides_per_second={args.slides / elapsed:.0f}")
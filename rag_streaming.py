@@ -0,0 +1,68 @@
+"""
+Token streaming for RAG queries.
+Retrieves context first, emits the sources straight away and then relays LLM
+tokens as they are generated, so clients see output long before the full
+answer is ready. Events are transport-neutral dicts that main.py frames as
+Server-Sent Events or WebSocket messages.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Iterator, List
+
+from langchain.chains.retrieval_qa.prompt import PROMPT
+from langchain_core.documents import Document
+
+from backend.retrieval.retrieval_pipeline import retrieve_with_timings
+
+logger = logging.getLogger(__name__)
+
+
+def format_sources(documents: List[Document]) -> List[Dict[str, Any]]:
+    return [{"content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+
+
+def stream_rag_events(query: str, retriever, llm, query_cache=None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields ``sources``, then one ``token`` event per generated chunk, then
+    ``done`` with the full response and per-stage timings in milliseconds.
+    Failures are reported as an ``error`` event instead of raising, since
+    headers have already been sent.
+    """
+    try:
+        if query_cache is not None:
+            cached = query_cache.lookup(query)
+            if cached is not None:
+                yield {"event": "sources", "data": cached["sources"]}
+                yield {"event": "token", "data": cached["answer"]}
+                yield {"event": "done", "data": {"response": cached["answer"], "cached": True}}
+                return
+
+        documents, timings = retrieve_with_timings(retriever, query)
+        sources = format_sources(documents)
+        yield {"event": "sources", "data": sources}
+
+        # Same prompt the "stuff" RetrievalQA chain uses for /query_rag
+        prompt = PROMPT.format(context="\n\n".join(doc.page_content for doc in documents), question=query)
+        tokens = []
+        start = time.perf_counter()
+        for token in llm.stream(prompt):
+            if not tokens:
+                timings["first_token"] = round((time.perf_counter() - start) * 1000, 2)
+            tokens.append(token)
+            yield {"event": "token", "data": token}
+        timings["generate"] = round((time.perf_counter() - start) * 1000, 2)
+
+        response = "".join(tokens)
+        if query_cache is not None:
+            query_cache.store(query, response, sources)
+        yield {"event": "done", "data": {"response": response, "cached": False, "timings": timings}}
+    except Exception as e:
+        logger.error(f"Streaming RAG query failed: {e}")
+        yield {"event": "error", "data": str(e)}
+
+
+def to_sse(event: Dict[str, Any]) -> str:
+    """Frames an event as a Server-Sent Events message."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,74 @@
+"""
+Cross-encoder re-ranking.
+Scores (query, chunk) pairs with a small CPU cross-encoder in batches so that
+only the most relevant of the over-fetched candidates reach the LLM prompt.
+"""
+
+import os
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() in ("1", "true", "yes")
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+# Pairs are truncated to this many tokens; shorter inputs keep CPU scoring fast
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+
+
+def _load_cross_encoder(model_name: str, max_length: int):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, max_length=max_length, device="cpu")
+
+
+class CrossEncoderReranker:
+    """
+    Lazily loaded cross-encoder. If the model cannot be loaded, documents keep
+    their retrieval order so queries still succeed without re-ranking.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL,
+        batch_size: int = RERANK_BATCH_SIZE,
+        max_length: int = RERANK_MAX_LENGTH,
+        factory: Callable = _load_cross_encoder,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._factory = factory
+        self._model = None
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None and not self._load_failed:
+            with self._lock:
+                if self._model is None and not self._load_failed:
+                    try:
+                        self._model = self._factory(self.model_name, self.max_length)
+                    except Exception as e:
+                        self._load_failed = True
+                        logger.warning(f"Could not load reranker {self.model_name}, keeping retrieval order: {e}")
+        return self._model
+
+    def warm_up(self):
+        """Load the model ahead of the first query."""
+        self._get_model()
+
+    def rerank(self, query: str, documents: List[Document], top_n: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """Return (document, score) pairs, most relevant first."""
+        if not documents:
+            return []
+        model = self._get_model()
+        if model is None:
+            ranked = [(doc, 0.0) for doc in documents]
+        else:
+            scores = model.predict([(query, doc.page_content) for doc in documents], batch_size=self.batch_size)
+            ranked = sorted(zip(documents, (float(score) for score in scores)), key=lambda item: item[1], reverse=True)
+        return ranked[:top_n] if top_n is not None else ranked
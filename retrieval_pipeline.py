@@ -0,0 +1,161 @@
+"""
+Retrieval pipeline for RAG prompts.
+Over-fetches candidates cheaply, re-ranks them with a cross-encoder and keeps
+only the best chunks that fit a token budget, timing every stage so recall can
+be traded against prompt size and generation latency.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "4"))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Partial chunks shorter than this are dropped rather than squeezed in
+_MIN_PARTIAL_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def trim_to_budget(documents: List[Document], max_tokens: int) -> Tuple[List[Document], int]:
+    """
+    Keep documents in order until ``max_tokens`` is used up, truncating the
+    last one if enough budget remains. Returns the kept documents and their tokens.
+    """
+    kept, used = [], 0
+    for doc in documents:
+        tokens = estimate_tokens(doc.page_content)
+        remaining = max_tokens - used
+        if tokens <= remaining:
+            kept.append(doc)
+            used += tokens
+            continue
+        if remaining >= _MIN_PARTIAL_TOKENS:
+            kept.append(Document(id=doc.id, page_content=doc.page_content[:remaining * 4],
+                                 metadata={**doc.metadata, "truncated": True}))
+            used += remaining
+        break
+    return kept, used
+
+
+class StageTimings:
+    """Thread-safe running totals and recent samples of per-stage durations."""
+
+    def __init__(self, window: int = 1000):
+        self._samples: Dict[str, deque] = {}
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, timings: Dict[str, float]):
+        with self._lock:
+            for stage, seconds in timings.items():
+                self._samples.setdefault(stage, deque(maxlen=self._window)).append(seconds)
+                self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+                self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            stats = {}
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+                stats[stage] = {
+                    "count": self._counts[stage],
+                    "avg_ms": round(self._totals[stage] * 1000 / self._counts[stage], 2),
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+                    "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                }
+            return stats
+
+
+class RetrievalPipeline:
+    """
+    Candidate retrieval -> cross-encoder re-ranking -> token budget.
+    ``base_retriever`` should return about ``RERANK_CANDIDATES`` documents;
+    ``reranker`` may be None to skip re-ranking.
+    """
+
+    def __init__(
+        self,
+        base_retriever,
+        reranker=None,
+        top_n: int = RERANK_TOP_N,
+        max_context_tokens: int = RAG_CONTEXT_TOKEN_BUDGET,
+    ):
+        self.base_retriever = base_retriever
+        self.reranker = reranker
+        self.top_n = top_n
+        self.max_context_tokens = max_context_tokens
+        self.timings = StageTimings()
+
+    def run(self, query: str, filter: Optional[Dict[str, Any]] = None) -> Tuple[List[Document], Dict[str, Any]]:
+        """
+        Return the prompt documents and this query's per-stage timings.
+        ``filter`` is a metadata ``where`` clause handed to the candidate search.
+        """
+        timings: Dict[str, float] = {}
+
+        start = time.perf_counter()
+        search_kwargs = {"filter": filter} if filter is not None else {}
+        candidates = self.base_retriever.invoke(query, **search_kwargs)
+        timings["retrieve"] = time.perf_counter() - start
+
+        stage_start = time.perf_counter()
+        if self.reranker is not None:
+            ranked = [doc for doc, _ in self.reranker.rerank(query, candidates, top_n=self.top_n)]
+        else:
+            ranked = candidates[:self.top_n]
+        timings["rerank"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        documents, tokens = trim_to_budget(ranked, self.max_context_tokens)
+        timings["budget"] = time.perf_counter() - stage_start
+        timings["total"] = time.perf_counter() - start
+
+        self.timings.record(timings)
+        report = {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+        report.update({"candidates": len(candidates), "documents": len(documents), "context_tokens": tokens})
+        return documents, report
+
+    def as_retriever(self, filter: Optional[Dict[str, Any]] = None) -> "PipelineRetriever":
+        return PipelineRetriever(pipeline=self, filter=filter)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stages_ms": self.timings.stats(),
+            "top_n": self.top_n,
+            "max_context_tokens": self.max_context_tokens,
+            "reranker": getattr(self.reranker, "model_name", None),
+        }
+
+
+class PipelineRetriever(BaseRetriever):
+    """LangChain retriever view of a RetrievalPipeline, optionally scoped by a metadata filter."""
+
+    pipeline: Any
+    filter: Optional[Dict[str, Any]] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        documents, _ = self.pipeline.run(query, filter=self.filter)
+        return documents
+
+
+def retrieve_with_timings(retriever, query: str) -> Tuple[List[Document], Optional[Dict[str, Any]]]:
+    """Retrieve through a pipeline when available so per-stage timings are returned."""
+    if isinstance(retriever, PipelineRetriever):
+        return retriever.pipeline.run(query, filter=retriever.filter)
+    start = time.perf_counter()
+    documents = retriever.invoke(query)
+    return documents, {"retrieve": round((time.perf_counter() - start) * 1000, 2)}
@@ -0,0 +1,195 @@
+"""
+Semantic query-result cache.
+Keeps normalized query embeddings in a small in-memory index so that a new
+question close enough to one answered before (by cosine similarity) gets the
+cached answer and sources without running retrieval and generation again.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from backend.ingestion.embedding_cache import normalize_text
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+
+
+class SemanticQueryCache:
+    """
+    LRU/TTL cache of query answers looked up by embedding similarity.
+    Embeddings live in a preallocated matrix, one row per slot, so a lookup is
+    a single matrix-vector product over at most ``max_entries`` rows. When a
+    ``version`` callable is given, the cache is cleared whenever the value it
+    returns changes, i.e. whenever the underlying collection was written to;
+    main.py reads it from the shared manifest database, so writes made by other
+    processes invalidate the cache as well.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+        version: Optional[Callable[[], Any]] = None,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._version_fn = version
+        self._version = version() if version is not None else None
+
+        self._vectors: Optional[np.ndarray] = None
+        self._occupied = np.zeros(self.max_entries, dtype=bool)
+        # slot -> entry, least recently used first
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._by_text: Dict[str, int] = {}
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self._stats = {"hits": 0, "exact_hits": 0, "misses": 0, "stores": 0,
+                       "evictions": 0, "expirations": 0, "invalidations": 0, "lookup_seconds": 0.0}
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self):
+        # Caller holds self._lock
+        if self._version_fn is None:
+            return
+        version = self._version_fn()
+        if version != self._version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._clear()
+            self._version = version
+
+    def _clear(self):
+        # Caller holds self._lock
+        self._entries.clear()
+        self._by_text.clear()
+        self._occupied[:] = False
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def _remove(self, slot: int):
+        # Caller holds self._lock
+        entry = self._entries.pop(slot)
+        self._by_text.pop(entry["key"], None)
+        self._occupied[slot] = False
+        self._free_slots.append(slot)
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return self.ttl_seconds > 0 and time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _hit(self, slot: int, similarity: float, exact: bool) -> Dict[str, Any]:
+        # Caller holds self._lock
+        self._entries.move_to_end(slot)
+        entry = self._entries[slot]
+        self._stats["hits"] += 1
+        if exact:
+            self._stats["exact_hits"] += 1
+        return {
+            "answer": entry["answer"],
+            "sources": entry["sources"],
+            "cached_query": entry["query"],
+            "similarity": round(similarity, 4),
+        }
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached answer for the most similar previous query, or None
+        if none is at least ``threshold`` similar.
+        """
+        start = time.perf_counter()
+        key = normalize_text(query).lower()
+        try:
+            with self._lock:
+                self._check_version()
+                slot = self._by_text.get(key)
+                if slot is not None:
+                    if not self._expired(self._entries[slot]):
+                        return self._hit(slot, 1.0, exact=True)
+                    self._remove(slot)
+                    self._stats["expirations"] += 1
+                if not self._entries:
+                    self._stats["misses"] += 1
+                    return None
+
+            vector = self._embed(query)
+
+            with self._lock:
+                if self._vectors is None or not self._entries:
+                    self._stats["misses"] += 1
+                    return None
+                scores = self._vectors @ vector
+                scores[~self._occupied] = -np.inf
+                slot = int(np.argmax(scores))
+                similarity = float(scores[slot])
+                if similarity < self.threshold:
+                    self._stats["misses"] += 1
+                    return None
+                if self._expired(self._entries[slot]):
+                    self._remove(slot)
+                    self._stats["expirations"] += 1
+                    self._stats["misses"] += 1
+                    return None
+                return self._hit(slot, similarity, exact=False)
+        finally:
+            with self._lock:
+                self._stats["lookup_seconds"] += time.perf_counter() - start
+
+    def store(self, query: str, answer: Any, sources: Optional[List[Dict[str, Any]]] = None):
+        """Cache the answer to a query, evicting the least recently used entry if full."""
+        key = normalize_text(query).lower()
+        vector = self._embed(query)
+        with self._lock:
+            self._check_version()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if key in self._by_text:
+                self._remove(self._by_text[key])
+            if not self._free_slots:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._occupied[slot] = True
+            self._entries[slot] = {
+                "key": key,
+                "query": query,
+                "answer": answer,
+                "sources": sources or [],
+                "created_at": time.time(),
+            }
+            self._by_text[key] = slot
+            self._stats["stores"] += 1
+
+    def invalidate(self):
+        """Drop every cached answer."""
+        with self._lock:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        lookup_seconds = stats.pop("lookup_seconds")
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["avg_lookup_ms"] = round(lookup_seconds * 1000 / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["threshold"] = self.threshold
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
@@ -1,34 +1,208 @@
 
-import queue
+import heapq
+import itertools
+import logging
+import os
 import threading
 import time
+from typing import Optional, Union
+
+from backend.ingestion.file_types import is_supported
+from backend.ingestion.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+INGEST_QUEUE_MAX_SIZE = int(os.getenv("INGEST_QUEUE_MAX_SIZE", "1000"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "3"))
+INGEST_RETRY_BACKOFF_SECONDS = float(os.getenv("INGEST_RETRY_BACKOFF_SECONDS", "2"))
+
+# Lower values are served first
+PRIORITIES = {"interactive": 0, "bulk": 10}
+
+class QueueFullError(Exception):
+    """Raised when a task is added to an ingestion queue that is at capacity."""
+
+class IngestionTask:
+    def __init__(
+        self,
+        file_path: str,
+        file_type: str,
+        priority: int,
+        job_id: Optional[str] = None,
+        attempts: int = 0,
+        collection_name: Optional[str] = None,
+    ):
+        self.file_path = file_path
+        self.file_type = file_type
+        self.priority = priority
+        self.job_id = job_id
+        self.attempts = attempts
+        self.collection_name = collection_name
 
 class IngestionTaskQueue:
-    def __init__(self, ingestion_manager):
+    """
+    Bounded priority queue of ingestion tasks served by worker threads.
+    Documents are parsed as streams on the worker threads; PDF page and PPTX
+    slide extraction, the CPU-heavy part, fans out to the shared extraction
+    process pool (see extraction_pool). Failed tasks are retried
+    with exponential backoff. When a JobStore is given, every task is recorded
+    there and unfinished jobs are resumed when the workers start.
+    """
+
+    def __init__(
+        self,
+        ingestion_manager,
+        max_queue_size: int = INGEST_QUEUE_MAX_SIZE,
+        max_retries: int = INGEST_MAX_RETRIES,
+        retry_backoff: float = INGEST_RETRY_BACKOFF_SECONDS,
+        job_store: Optional[JobStore] = None,
+    ):
         self.ingestion_manager = ingestion_manager
-        self.task_queue = queue.Queue()
+        self.job_store = job_store
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
         self.workers = []
         self.running = False
 
-    def add_task(self, file_path: str, file_type: str):
-        self.task_queue.put((file_path, file_type))
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._unfinished = 0
+        self._retry_timers = set()
+        self._stats = {"completed": 0, "failed": 0, "retried": 0, "rejected": 0}
+
+    def add_task(
+        self,
+        file_path: str,
+        file_type: str,
+        priority: Union[str, int] = "interactive",
+        collection_name: Optional[str] = None,
+    ) -> IngestionTask:
+        """
+        Queue a document for ingestion, into ``collection_name`` (e.g. a tenant's
+        shard) when given. Raises QueueFullError when the queue is at capacity
+        and ValueError for an unsupported file type or unknown priority.
+        """
+        if not is_supported(file_type):
+            raise ValueError(f"Unsupported file type: {file_type}")
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise ValueError(f"Unknown priority: {priority}")
+            priority = PRIORITIES[priority]
+        task = IngestionTask(file_path, file_type, priority, collection_name=collection_name)
+        with self._condition:
+            if len(self._heap) >= self.max_queue_size:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"Ingestion queue is full ({self.max_queue_size} tasks)")
+            if self.job_store is not None:
+                task.job_id = self.job_store.create(file_path, file_type, priority, collection=collection_name)["id"]
+            self._push(task)
+            self._unfinished += 1
+        return task
+
+    def _push(self, task: IngestionTask):
+        # Caller holds self._condition
+        heapq.heappush(self._heap, (task.priority, next(self._sequence), task))
+        self._condition.notify_all()
+
+    def _requeue(self, task: IngestionTask, timer: threading.Timer):
+        with self._condition:
+            self._retry_timers.discard(timer)
+            # Retries bypass the size limit: they were already accepted once
+            self._push(task)
+
+    def _next_task(self) -> Optional[IngestionTask]:
+        with self._condition:
+            while self.running and not self._heap:
+                self._condition.wait()
+            if not self.running:
+                return None
+            return heapq.heappop(self._heap)[2]
 
     def _worker(self):
-        while self.running:
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            task.attempts += 1
+            retrying = False
             try:
-                file_path, file_type = self.task_queue.get(timeout=1)
-                print(f"Processing ingestion task: {file_path} ({file_type})")
-                self.ingestion_manager.ingest_document(file_path, file_type)
-                self.task_queue.task_done()
-            except queue.Empty:
-                time.sleep(0.1) # Small delay to prevent busy-waiting
+                print(f"Processing ingestion task: {task.file_path} ({task.file_type}), attempt {task.attempts}")
+                if self.job_store is not None and task.job_id:
+                    self.job_store.mark_running(task.job_id, task.attempts)
+                routing = {"collection_name": task.collection_name} if task.collection_name else {}
+                result = self.ingestion_manager.ingest_document(task.file_path, task.file_type, **routing)
+                if self.job_store is not None and task.job_id:
+                    self.job_store.mark_done(task.job_id, result if isinstance(result, dict) else {})
+                self._count("completed")
             except Exception as e:
-                print(f"Error processing ingestion task: {e}")
-                self.task_queue.task_done() # Mark as done even on error to prevent blocking
+                retrying = self._handle_failure(task, e)
+            finally:
+                if not retrying:
+                    with self._condition:
+                        self._unfinished -= 1
+                        self._condition.notify_all()
+
+    def _handle_failure(self, task: IngestionTask, error: Exception) -> bool:
+        """Schedule a retry with exponential backoff; returns False once retries are exhausted."""
+        retrying = task.attempts <= self.max_retries and self.running
+        if self.job_store is not None and task.job_id:
+            try:
+                self.job_store.mark_failed(task.job_id, str(error), retrying=retrying)
+            except Exception as e:
+                logger.error(f"Could not record failure of job {task.job_id}: {e}")
+
+        if not retrying:
+            self._count("failed")
+            logger.error(f"Ingestion of {task.file_path} failed after {task.attempts} attempts: {error}")
+            return False
+
+        delay = self.retry_backoff * (2 ** (task.attempts - 1))
+        self._count("retried")
+        logger.warning(f"Ingestion of {task.file_path} failed ({error}), retrying in {delay:.1f}s")
+        timer = threading.Timer(delay, self._requeue)
+        timer.args = (task, timer)
+        timer.daemon = True
+        with self._condition:
+            self._retry_timers.add(timer)
+        timer.start()
+        return True
+
+    def _resume_unfinished_jobs(self) -> int:
+        """Re-queue jobs that were queued or running when the process last stopped."""
+        jobs = self.job_store.unfinished()
+        with self._condition:
+            for job in jobs:
+                # Resumed jobs bypass the size limit: they were already accepted once
+                self._push(IngestionTask(
+                    job["file_path"], job["file_type"], job["priority"], job["id"], job["attempts"], job.get("collection")
+                ))
+                self._unfinished += 1
+        if jobs:
+            print(f"Resumed {len(jobs)} unfinished ingestion jobs.")
+        return len(jobs)
+
+    def _count(self, key: str):
+        with self._condition:
+            self._stats[key] += 1
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued task (including pending retries) has finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._unfinished > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
 
     def start_workers(self, num_workers=2):
         if not self.running:
             self.running = True
+            if self.job_store is not None:
+                self._resume_unfinished_jobs()
             for _ in range(num_workers):
                 worker = threading.Thread(target=self._worker)
                 worker.daemon = True  # Allow main program to exit even if workers are running
@@ -38,12 +212,21 @@ class IngestionTaskQueue:
 
     def stop_workers(self):
         if self.running:
-            self.running = False
+            with self._condition:
+                self.running = False
+                for timer in self._retry_timers:
+                    timer.cancel()
+                self._retry_timers.clear()
+                self._condition.notify_all()
             for worker in self.workers:
                 worker.join(timeout=5) # Give workers some time to finish current tasks
             self.workers = []
             print("Stopped ingestion workers.")
 
+    def stats(self):
+        with self._condition:
+            return {"queued": len(self._heap), "max_queue_size": self.max_queue_size, **self._stats}
+
 if __name__ == "__main__":
     # This block is for testing the task queue independently
     class MockIngestionManager:
@@ -56,14 +239,12 @@ if __name__ == "__main__":
 
     task_queue.start_workers(num_workers=1)
 
-    task_queue.add_task("doc1.pdf", "pdf")
+    task_queue.add_task("doc1.pdf", "pdf", priority="bulk")
     task_queue.add_task("notes.txt", "txt")
     task_queue.add_task("report.docx", "docx")
 
-    # Give some time for tasks to be processed
-    time.sleep(3)
+    # Wait for the queue to drain
+    task_queue.join(timeout=5)
 
     task_queue.stop_workers()
     print("Task queue test complete.")
-
-
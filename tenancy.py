@@ -0,0 +1,195 @@
+"""
+Tenant-sharded collections.
+Every team (or user without a team) gets its own vector collection and BM25
+index, so ingestion writes to and retrieval searches only that tenant's shard.
+A query can fan out over several shards in parallel, e.g. the tenant's own
+shard plus the shared knowledge base, with the per-shard rankings merged by
+reciprocal rank fusion before re-ranking.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.ingestion.vector_store_writer import CHROMA_COLLECTION, get_vector_store
+from backend.retrieval.bm25_index import BM25_INDEX_ENABLED, get_bm25_index
+from backend.retrieval.hybrid_retriever import (
+    HYBRID_RETRIEVAL_ENABLED, HybridRetriever, document_id, reciprocal_rank_fusion,
+)
+from backend.retrieval.retrieval_pipeline import RERANK_CANDIDATES, RetrievalPipeline, StageTimings
+
+MULTI_TENANT_ENABLED = os.getenv("MULTI_TENANT_ENABLED", "false").lower() in ("1", "true", "yes")
+# Collection every tenant can read, e.g. the organisation-wide knowledge base
+TENANT_SHARED_COLLECTION = os.getenv("TENANT_SHARED_COLLECTION", CHROMA_COLLECTION)
+TENANT_INCLUDE_SHARED = os.getenv("TENANT_INCLUDE_SHARED", "true").lower() in ("1", "true", "yes")
+SHARD_FANOUT_WORKERS = int(os.getenv("SHARD_FANOUT_WORKERS", "8"))
+
+# Chroma collection names: 3-63 characters, alphanumeric at both ends
+_MAX_COLLECTION_NAME = 63
+
+
+def tenant_for(user: Any) -> str:
+    """Tenant of an authenticated user (an auth.User or the API's user dict): its team, else the user."""
+    if isinstance(user, dict):
+        team, user_id = user.get("team"), user.get("id")
+    else:
+        team, user_id = getattr(user, "team", None), getattr(user, "id", None)
+    if team:
+        return f"team-{team}"
+    if user_id is None:
+        raise ValueError("Cannot derive a tenant from a user without an id or team")
+    return f"user-{user_id}"
+
+
+def collection_for(tenant: str) -> str:
+    """
+    Vector collection (and BM25 index) name of a tenant's shard: a readable
+    slug of the tenant id plus a digest of the raw id, so tenants whose ids
+    only differ in case or punctuation (e.g. "sales.eu" and "Sales-EU") never
+    share a shard.
+    """
+    digest = hashlib.sha1(tenant.encode("utf-8")).hexdigest()[:8]
+    slug = re.sub(r"[^a-z0-9_-]+", "-", tenant.lower()).strip("-_") or "default"
+    prefix = f"{CHROMA_COLLECTION}_{slug}"[:_MAX_COLLECTION_NAME - len(digest) - 1].rstrip("-_")
+    return f"{prefix}_{digest}"
+
+
+def collections_for(user: Any, include_shared: bool = TENANT_INCLUDE_SHARED) -> List[str]:
+    """Shards a user's queries search: their tenant's shard, plus the shared collection if requested."""
+    collections = [collection_for(tenant_for(user))]
+    if include_shared and TENANT_SHARED_COLLECTION not in collections:
+        collections.append(TENANT_SHARED_COLLECTION)
+    return collections
+
+
+def shard_size(vectordb) -> Optional[int]:
+    """Number of chunks in a shard's vector store, if the backend exposes it."""
+    if hasattr(vectordb, "stats"):
+        return vectordb.stats()["live"]
+    collection = getattr(vectordb, "_collection", None)
+    return collection.count() if collection is not None else None
+
+
+class ShardRouter:
+    """
+    Lazily builds a candidate retriever per shard (hybrid when the BM25 index
+    is enabled) and a retrieval pipeline per set of shards, sharing one
+    re-ranker. Multi-shard searches run on a thread pool and every shard's
+    search latency is recorded for ``stats``.
+    """
+
+    def __init__(self, reranker=None, k: int = RERANK_CANDIDATES, workers: int = SHARD_FANOUT_WORKERS):
+        self.reranker = reranker
+        self.k = k
+        self.timings = StageTimings()
+        self._retrievers: Dict[str, Any] = {}
+        self._pipelines: Dict[Tuple[str, ...], RetrievalPipeline] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="shard-search")
+        self._lock = threading.Lock()
+
+    def candidate_retriever(self, collection: str):
+        with self._lock:
+            retriever = self._retrievers.get(collection)
+            if retriever is None:
+                vectordb = get_vector_store(collection)
+                if HYBRID_RETRIEVAL_ENABLED and BM25_INDEX_ENABLED:
+                    retriever = HybridRetriever(vectorstore=vectordb, bm25_index=get_bm25_index(collection), k=self.k)
+                else:
+                    retriever = vectordb.as_retriever(search_kwargs={"k": self.k})
+                self._retrievers[collection] = retriever
+            return retriever
+
+    def pipeline(self, collections: Sequence[str]) -> RetrievalPipeline:
+        """Retrieval pipeline over one or more shards; pipelines are cached per shard set."""
+        key = tuple(dict.fromkeys(collections))
+        if not key:
+            raise ValueError("At least one shard is required")
+        with self._lock:
+            pipeline = self._pipelines.get(key)
+            if pipeline is None:
+                pipeline = RetrievalPipeline(
+                    FanOutRetriever(router=self, collections=list(key), k=self.k), reranker=self.reranker
+                )
+                self._pipelines[key] = pipeline
+            return pipeline
+
+    def search(self, collection: str, query: str, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Candidate search of a single shard, timed."""
+        retriever = self.candidate_retriever(collection)
+        start = time.perf_counter()
+        documents = retriever.invoke(query, **({"filter": filter} if filter is not None else {}))
+        self.timings.record({collection: time.perf_counter() - start})
+        return documents
+
+    def fan_out(self, collections: Sequence[str], query: str, filter: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
+        """Search several shards in parallel, returning each shard's candidates in order."""
+        if len(collections) == 1:
+            return [self.search(collections[0], query, filter)]
+        futures = [self._executor.submit(self.search, collection, query, filter) for collection in collections]
+        return [future.result() for future in futures]
+
+    def stats(self, collections: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Per-shard chunk counts, BM25 index sizes and search latency of every
+        shard searched so far, or only of those among ``collections`` (e.g. the
+        caller's own shards).
+        """
+        with self._lock:
+            searched = list(self._retrievers)
+            pipelines = len(self._pipelines)
+        if collections is not None:
+            searched = [collection for collection in searched if collection in collections]
+        latency = self.timings.stats()
+        shards = {}
+        for collection in searched:
+            shard = {"chunks": shard_size(get_vector_store(collection)), "latency_ms": latency.get(collection)}
+            if BM25_INDEX_ENABLED:
+                shard["bm25"] = get_bm25_index(collection).stats()
+            shards[collection] = shard
+        if collections is not None:
+            return {"shards": shards}
+        return {"shards": shards, "pipelines": pipelines}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FanOutRetriever(BaseRetriever):
+    """
+    Candidate retriever over several shards: each is searched in parallel and
+    the rankings are merged with reciprocal rank fusion. A metadata ``filter``
+    passed to ``invoke`` is pushed down into every shard's search.
+    """
+
+    router: Any
+    collections: List[str]
+    k: int = RERANK_CANDIDATES
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        results = self.router.fan_out(self.collections, query, filter)
+        if len(results) == 1:
+            return results[0][:self.k]
+        documents: Dict[str, Document] = {}
+        rankings = []
+        for shard_documents in results:
+            ranking = []
+            for doc in shard_documents:
+                doc_id = document_id(doc)
+                documents.setdefault(doc_id, doc)
+                ranking.append(doc_id)
+            rankings.append(ranking)
+        return [documents[doc_id] for doc_id, _ in reciprocal_rank_fusion(rankings)[:self.k]]
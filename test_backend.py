@@ -1,6 +1,6 @@
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 import os
 import sys
@@ -47,8 +47,9 @@ def client_no_auth():
         app.dependency_overrides[get_current_user] = original_dependency
 
 def test_query_rag(client):
-    with patch("backend.main.qa_chain") as mock_qa_chain:
-        mock_qa_chain.invoke.return_value = {"result": "RAG response here"}
+    with patch("backend.main.qa_chain") as mock_qa_chain, \
+         patch("backend.main.query_cache", None):
+        mock_qa_chain.ainvoke = AsyncMock(return_value={"result": "RAG response here"})
 
         response = client.post(
             "/query_rag",
@@ -60,8 +61,147 @@ def test_query_rag(client):
             }
         )
         assert response.status_code == 200
-        assert response.json() == {"response": "RAG response here"}
-        mock_qa_chain.invoke.assert_called_once_with({"query": "What is PRINCE2?"})
+        assert response.json() == {"response": "RAG response here", "sources": [], "cached": False}
+        mock_qa_chain.ainvoke.assert_called_once_with({"query": "What is PRINCE2?"})
+
+def test_query_rag_filters_scope_the_retriever(client):
+    scoped_chain = MagicMock()
+    scoped_chain.ainvoke = AsyncMock(return_value={"result": "ITIL answer"})
+    with patch("backend.main.RetrievalQA") as mock_retrieval_qa, \
+         patch("backend.main.query_cache") as mock_cache:
+        mock_retrieval_qa.from_chain_type.return_value = scoped_chain
+        headers = {"Authorization": "Bearer fake-jwt-token"}
+
+        response = client.post("/query_rag", headers=headers,
+                               json={"query": "What is SLM?", "filters": {"agent_domain": "ITIL", "file_type": ["pdf"]}})
+        assert response.json()["response"] == "ITIL answer"
+        retriever = mock_retrieval_qa.from_chain_type.call_args.kwargs["retriever"]
+        assert retriever.filter == {"$and": [{"file_type": {"$in": ["pdf"]}}, {"agent_domain": {"$in": ["itil"]}}]}
+        mock_cache.lookup.assert_not_called()
+
+        invalid = client.post("/query_rag", headers=headers, json={"query": "q", "filters": {"date_from": "last week"}})
+        assert invalid.status_code == 400
+        misspelled = client.post("/query_rag", headers=headers, json={"query": "q", "filters": {"filetype": "pdf"}})
+        assert misspelled.status_code == 400
+
+def test_tenant_queries_and_ingestion_are_routed_to_shards(client):
+    from backend.tenancy import collection_for
+    own_shard = collection_for("user-test_user")
+    tenant_chain = MagicMock()
+    tenant_chain.ainvoke = AsyncMock(return_value={"result": "Team answer"})
+    router = MagicMock()
+    with patch("backend.main.RetrievalQA") as mock_retrieval_qa, \
+         patch("backend.main.shard_router", router), \
+         patch("backend.main.query_cache", None), \
+         patch("backend.main.ingestion_queue") as mock_ingestion_queue:
+        mock_retrieval_qa.from_chain_type.return_value = tenant_chain
+        headers = {"Authorization": "Bearer fake-jwt-token"}
+
+        response = client.post("/query_rag", headers=headers, json={"query": "Our runbook?"})
+        assert response.json()["response"] == "Team answer"
+        router.pipeline.assert_called_once_with((own_shard, "langchain"))
+
+        client.post("/query_rag", headers=headers, json={"query": "Our runbook?", "include_shared": False})
+        router.pipeline.assert_called_with((own_shard,))
+
+        mock_ingestion_queue.add_task.return_value.job_id = "job-1"
+        client.post("/ingest_document", headers=headers, params={"file_path": "runbook.pdf", "file_type": "pdf"})
+        mock_ingestion_queue.add_task.assert_called_once_with(
+            "runbook.pdf", "pdf", priority="interactive", collection_name=own_shard
+        )
+
+def test_jobs_and_shard_stats_are_scoped_to_the_tenant(client):
+    from backend.tenancy import collection_for
+    own_shard = collection_for("user-test_user")
+    headers = {"Authorization": "Bearer fake-jwt-token"}
+    router = MagicMock()
+    router.stats.return_value = {"shards": {}}
+    with patch("backend.main.shard_router", router), \
+         patch("backend.main.job_store") as mock_job_store:
+        mock_job_store.list.return_value = []
+        client.get("/ingest/jobs", headers=headers)
+        mock_job_store.list.assert_called_once_with(status=None, limit=100, offset=0, collection=own_shard)
+
+        mock_job_store.get.return_value = {"id": "abc123", "collection": collection_for("team-other")}
+        assert client.get("/ingest/jobs/abc123", headers=headers).status_code == 404
+        mock_job_store.get.return_value = {"id": "abc123", "collection": own_shard}
+        assert client.get("/ingest/jobs/abc123", headers=headers).status_code == 200
+
+        client.get("/retrieval/shards/stats", headers=headers)
+        router.stats.assert_called_once_with([own_shard, "langchain"])
+
+def test_batch_retrieval_and_embedding_endpoints(client):
+    headers = {"Authorization": "Bearer fake-jwt-token"}
+    with patch("backend.main.BatchRetriever") as mock_batch_retriever, \
+         patch("backend.main.embeddings") as mock_embeddings:
+        mock_batch_retriever.return_value.retrieve.return_value = [[{"id": "a", "score": 0.9}], []]
+        mock_embeddings.embed_documents.return_value = [[0.1, 0.2], [0.3, 0.4]]
+        mock_embeddings.model_name = "test-model"
+
+        response = client.post("/retrieve/batch", headers=headers,
+                               json={"queries": ["q1", "q2"], "k": 3, "filters": {"file_type": "pdf"}})
+        assert response.json()["results"] == [{"query": "q1", "hits": [{"id": "a", "score": 0.9}]},
+                                              {"query": "q2", "hits": []}]
+        mock_batch_retriever.return_value.retrieve.assert_called_once_with(
+            ["q1", "q2"], k=3, filter={"file_type": {"$in": ["pdf"]}}
+        )
+        assert client.post("/retrieve/batch", headers=headers, json={"queries": "q1"}).status_code == 400
+
+        response = client.post("/embeddings/batch", headers=headers, json={"texts": ["a", "b"]})
+        assert response.json() == {"model": "test-model", "dimension": 2, "embeddings": [[0.1, 0.2], [0.3, 0.4]]}
+
+def test_query_rag_semantic_cache_hit(client):
+    from backend.retrieval.semantic_cache import SemanticQueryCache
+    embeddings = MagicMock()
+    embeddings.embed_query.side_effect = lambda text: [1.0, 0.1] if "PRINCE2" in text else [0.0, 1.0]
+    with patch("backend.main.qa_chain") as mock_qa_chain, \
+         patch("backend.main.query_cache", SemanticQueryCache(embeddings, threshold=0.9)):
+        mock_qa_chain.ainvoke = AsyncMock(return_value={"result": "Seven principles", "source_documents": []})
+        headers = {"Authorization": "Bearer fake-jwt-token"}
+
+        first = client.post("/query_rag", headers=headers, json={"query": "PRINCE2 principles"})
+        second = client.post("/query_rag", headers=headers, json={"query": "what are the 7 PRINCE2 principles"})
+        assert first.json()["cached"] is False
+        assert second.json() == {"response": "Seven principles", "sources": [], "cached": True}
+        mock_qa_chain.ainvoke.assert_called_once()
+
+        stats = client.get("/query/cache/stats", headers=headers).json()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+def test_query_rag_stream_sends_sources_then_tokens(client):
+    from langchain_core.documents import Document
+    with patch("backend.main.retriever") as mock_retriever, \
+         patch("backend.main.llm") as mock_llm, \
+         patch("backend.main.query_cache", None):
+        mock_retriever.invoke.return_value = [
+            Document(page_content="PRINCE2 has seven principles.", metadata={"source": "prince2.pdf"})
+        ]
+        mock_llm.stream.return_value = iter(["Seven", " principles"])
+
+        response = client.post(
+            "/query_rag/stream",
+            headers={"Authorization": "Bearer fake-jwt-token"},
+            json={"query": "What are the PRINCE2 principles?"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+        assert events == ["event: sources", "event: token", "event: token", "event: done"]
+        assert '"Seven principles"' in response.text
+
+def test_query_rag_websocket_streams_events(client):
+    with patch("backend.main._user_from_token", return_value={"id": "test_user"}), \
+         patch("backend.main.retriever") as mock_retriever, \
+         patch("backend.main.llm") as mock_llm, \
+         patch("backend.main.query_cache", None):
+        mock_retriever.invoke.return_value = []
+        mock_llm.stream.return_value = iter(["Hello"])
+
+        with client.websocket_connect("/ws/query_rag?token=fake-jwt-token") as websocket:
+            websocket.send_json({"query": "hi"})
+            assert websocket.receive_json() == {"event": "sources", "data": []}
+            assert websocket.receive_json() == {"event": "token", "data": "Hello"}
+            assert websocket.receive_json()["event"] == "done"
 
 def test_run_mcp(client):
     with patch("backend.main.crew_manager") as mock_crew_manager:
@@ -88,6 +228,142 @@ def test_run_mcp(client):
             **{}
         )
 
+def test_run_mcp_timeout_returns_504(client):
+    import time
+    from backend.async_execution import EndpointLimiter
+    with patch("backend.main.crew_manager") as mock_crew_manager, \
+         patch("backend.main.mcp_limiter", EndpointLimiter("MCP", 1, timeout=0.05)):
+        mock_crew_manager.run_crew.side_effect = lambda **kwargs: time.sleep(0.5)
+
+        response = client.post(
+            "/run_mcp",
+            headers={"Authorization": "Bearer fake-jwt-token"},
+            json={"query": "q", "agent_type": "prince2", "task_type": "prince2_analysis"}
+        )
+        assert response.status_code == 504
+
+def test_endpoint_limiter_bounds_concurrency_and_waiting():
+    import asyncio
+    import time
+    from backend.async_execution import ConcurrencyLimitError, EndpointLimiter
+
+    async def scenario():
+        limiter = EndpointLimiter("test", max_concurrency=1, timeout=5, max_waiting=1)
+        running = asyncio.ensure_future(limiter.call(time.sleep, 0.2))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(limiter.call(time.sleep, 0))
+        await asyncio.sleep(0.01)
+        assert (limiter.stats()["active"], limiter.stats()["waiting"]) == (1, 1)
+        with pytest.raises(ConcurrencyLimitError):
+            await limiter.call(time.sleep, 0)
+        await asyncio.gather(running, waiting)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["completed"], stats["rejected"], stats["active"]) == (2, 1, 0)
+
+def test_ingest_document_queue_full(client):
+    from backend.ingestion.task_queue import QueueFullError
+    with patch("backend.main.ingestion_queue") as mock_ingestion_queue:
+        mock_ingestion_queue.add_task.side_effect = QueueFullError("Ingestion queue is full (1000 tasks)")
+
+        response = client.post(
+            "/ingest_document",
+            headers={
+                "Authorization": "Bearer fake-jwt-token"
+            },
+            params={
+                "file_path": "data/manual.pdf",
+                "file_type": "pdf",
+                "priority": "bulk"
+            }
+        )
+        assert response.status_code == 429
+        mock_ingestion_queue.add_task.assert_called_once_with("data/manual.pdf", "pdf", priority="bulk")
+
+def test_ingest_document_detects_file_type(client):
+    headers = {"Authorization": "Bearer fake-jwt-token"}
+    with patch("backend.main.ingestion_queue") as mock_ingestion_queue:
+        mock_ingestion_queue.add_task.return_value.job_id = "job-1"
+        response = client.post("/ingest_document", headers=headers, params={"file_path": "data/Runbook.PDF"})
+        assert response.status_code == 200
+        mock_ingestion_queue.add_task.assert_called_once_with("data/Runbook.PDF", "pdf", priority="interactive")
+
+        response = client.post("/ingest_document", headers=headers, params={"file_path": "data/missing.dat"})
+        assert response.status_code == 400
+
+def test_ingest_bulk_bounds_the_workers(client):
+    from backend.ingestion.bulk_ingestion import BULK_INGEST_WORKERS
+    headers = {"Authorization": "Bearer fake-jwt-token"}
+    for workers in ("8", -1, 2.5):
+        response = client.post("/ingest/bulk", headers=headers, json={"source": "data/", "workers": workers})
+        assert response.status_code == 400
+
+    with patch("backend.main.BulkIngestor") as mock_ingestor:
+        mock_ingestor.return_value.run.return_value = iter([{"event": "summary", "files": 0}])
+        response = client.post("/ingest/bulk", headers=headers, json={"source": "data/", "workers": 10_000})
+        assert response.status_code == 200
+        assert mock_ingestor.call_args.kwargs["workers"] == BULK_INGEST_WORKERS
+
+    # Bulk runs hold a slot of their own endpoint limiter
+    import asyncio
+    from backend.async_execution import EndpointLimiter
+    busy_limiter = EndpointLimiter("Bulk", 1, timeout=0.05)
+    busy_limiter._semaphore = asyncio.Semaphore(0)
+    with patch("backend.main.BulkIngestor"), patch("backend.main.bulk_limiter", busy_limiter):
+        response = client.post("/ingest/bulk", headers=headers, json={"source": "data/"})
+        assert response.status_code == 200
+        assert '"event": "error"' in response.text
+    assert "bulk" in client.get("/execution/stats", headers=headers).json()
+
+def test_ingest_crawl_validates_and_bounds_the_request(client):
+    import json
+    from backend.ingestion.web_crawler import CRAWL_CONCURRENCY, host_rate_limiter
+    headers = {"Authorization": "Bearer fake-jwt-token"}
+    for body in (
+        {"urls": "https://example.com/a"},
+        {"urls": ["file:///etc/passwd"]},
+        {"sitemap": "gopher://example.com/sitemap.xml"},
+        {"urls": ["https://example.com/a"], "max_pages": "all"},
+        {"urls": ["https://example.com/a"], "concurrency": 0},
+    ):
+        assert client.post("/ingest/crawl", headers=headers, json=body).status_code == 400
+
+    async def crawl(urls, sitemap):
+        yield {"event": "summary", "pages": len(urls)}
+
+    with patch("backend.ingestion.web_crawler.WebCrawler") as mock_crawler:
+        mock_crawler.return_value.crawl = crawl
+        response = client.post(
+            "/ingest/crawl", headers=headers, json={"urls": ["https://example.com/a"], "concurrency": 10_000},
+        )
+        assert response.status_code == 200
+        assert json.loads(response.text.splitlines()[-1]) == {"event": "summary", "pages": 1}
+        kwargs = mock_crawler.call_args.kwargs
+        assert kwargs["concurrency"] == CRAWL_CONCURRENCY
+        assert kwargs["rate_limiter"] is host_rate_limiter
+
+def test_get_ingestion_job(client):
+    with patch("backend.main.job_store") as mock_job_store:
+        mock_job_store.get.return_value = {"id": "abc123", "status": "done", "chunk_count": 12}
+
+        response = client.get("/ingest/jobs/abc123", headers={"Authorization": "Bearer fake-jwt-token"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "done"
+
+        mock_job_store.get.return_value = None
+        response = client.get("/ingest/jobs/missing", headers={"Authorization": "Bearer fake-jwt-token"})
+        assert response.status_code == 404
+
+def test_list_ingestion_jobs_by_status(client):
+    with patch("backend.main.job_store") as mock_job_store:
+        mock_job_store.list.return_value = [{"id": "abc123", "status": "failed"}]
+
+        response = client.get("/ingest/jobs", params={"status": "failed"}, headers={"Authorization": "Bearer fake-jwt-token"})
+        assert response.status_code == 200
+        assert response.json() == {"jobs": [{"id": "abc123", "status": "failed"}]}
+        mock_job_store.list.assert_called_once_with(status="failed", limit=100, offset=0)
+
 def test_health_check(client):
     response = client.get("/health")
     assert response.status_code == 200
@@ -105,6 +381,31 @@ def test_get_current_user_valid_token(client):
     )
     assert response.status_code == 200
 
+def test_get_current_user_decodes_the_jwt(client_no_auth):
+    from datetime import datetime
+    from backend.auth import User, auth_manager
+    user = User(id=42, username="pat", email="pat@example.com", team="PMO", created_at=datetime.utcnow())
+    token = auth_manager.create_access_token(user)
+    import threading
+    lookup_threads = []
+
+    def get_user_by_id(user_id):
+        lookup_threads.append(threading.current_thread().name)
+        return user
+
+    with patch("backend.main.auth_manager.get_user_by_id", side_effect=get_user_by_id), \
+         patch("backend.main.job_store") as mock_job_store:
+        mock_job_store.get.return_value = {"id": "abc123"}
+        response = client_no_auth.get("/ingest/jobs/abc123", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        # The SQLite lookup runs on the shared executor, not the event loop's thread
+        assert lookup_threads[0].startswith("blocking")
+
+        from backend.main import _user_from_token
+        assert _user_from_token(token) == {"id": 42, "username": "pat", "email": "pat@example.com", "team": "PMO"}
+    response = client_no_auth.get("/ingest/jobs/abc123", headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
+
 def test_get_current_user_no_token(client_no_auth):
     response = client_no_auth.post(
         "/query_rag",
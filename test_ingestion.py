@@ -24,6 +24,13 @@ class TestIngestionModules(unittest.TestCase):
         c.drawString(100, 750, "This is a dummy PDF for testing.")
         c.save()
 
+        # Multi-page PDF
+        c = canvas.Canvas(os.path.join(cls.data_dir, "multipage.pdf"))
+        for page in range(1, 9):
+            c.drawString(100, 750, f"Content of page {page}.")
+            c.showPage()
+        c.save()
+
         # Dummy PPTX
         from pptx import Presentation
         prs = Presentation()
@@ -57,54 +64,971 @@ class TestIngestionModules(unittest.TestCase):
         if os.path.exists("./chroma_db"):
             shutil.rmtree("./chroma_db")
 
-    @patch("backend.ingestion.pdf_ingestion.Chroma.from_documents")
-    @patch("backend.ingestion.pdf_ingestion.HuggingFaceEmbeddings")
-    def test_ingest_pdf(self, mock_embeddings, mock_chroma):
-        ingest_pdf(os.path.join(self.data_dir, "dummy.pdf"))
-        mock_embeddings.assert_called_once()
-        mock_chroma.assert_called_once()
-
-    @patch("backend.ingestion.pptx_ingestion.Chroma.from_documents")
-    @patch("backend.ingestion.pptx_ingestion.HuggingFaceEmbeddings")
-    def test_ingest_pptx(self, mock_embeddings, mock_chroma):
-        ingest_pptx(os.path.join(self.data_dir, "dummy.pptx"))
-        mock_embeddings.assert_called_once()
-        mock_chroma.assert_called_once()
-
-    @patch("backend.ingestion.text_ingestion.Chroma.from_documents")
-    @patch("backend.ingestion.text_ingestion.HuggingFaceEmbeddings")
-    def test_ingest_text(self, mock_embeddings, mock_chroma):
-        ingest_text(os.path.join(self.data_dir, "dummy.txt"))
-        mock_embeddings.assert_called_once()
-        mock_chroma.assert_called_once()
-
-    @patch("backend.ingestion.text_ingestion.Chroma.from_documents")
-    @patch("backend.ingestion.text_ingestion.HuggingFaceEmbeddings")
-    def test_ingest_docx(self, mock_embeddings, mock_chroma):
-        ingest_docx(os.path.join(self.data_dir, "dummy.docx"))
-        mock_embeddings.assert_called_once()
-        mock_chroma.assert_called_once()
-
-    @patch("backend.ingestion.csv_ingestion.Chroma.from_documents")
-    @patch("backend.ingestion.csv_ingestion.HuggingFaceEmbeddings")
-    def test_ingest_csv(self, mock_embeddings, mock_chroma):
-        ingest_csv(os.path.join(self.data_dir, "dummy.csv"))
-        mock_embeddings.assert_called_once()
-        mock_chroma.assert_called_once()
+    def _ingest(self, ingest, target):
+        """Runs a standalone ingest_* helper against a scratch manifest and a mock store; returns the written chunks and ids."""
+        import tempfile
+        from backend.ingestion.ingestion_manager import IngestionManager
+        from backend.ingestion.manifest import ManifestStore
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("backend.ingestion.ingestion_manager.get_vector_store"), \
+                 patch("backend.ingestion.ingestion_manager.get_embeddings"):
+                manager = IngestionManager(
+                    manifest_store=ManifestStore(os.path.join(tmp_dir, "manifest.db")),
+                    writer=VectorStoreWriter(MagicMock(), flush_interval=0),
+                )
+            with patch("backend.ingestion.ingestion_manager.default_manager", return_value=manager):
+                result = ingest(target)
+        self.assertFalse(result["skipped"])
+        add_documents = manager.writer.vectordb.add_documents
+        add_documents.assert_called_once()
+        return add_documents.call_args[0][0], add_documents.call_args.kwargs["ids"]
+
+    def test_ingest_pdf(self):
+        from backend.ingestion.embedding_cache import chunk_id, content_hash
+        path = os.path.join(self.data_dir, "dummy.pdf")
+        written, ids = self._ingest(ingest_pdf, path)
+        # Same source-scoped ids and filter metadata as documents ingested by the server
+        source = os.path.abspath(path)
+        self.assertEqual(ids, [chunk_id(content_hash(doc.page_content), source) for doc in written])
+        self.assertEqual({(doc.metadata["source"], doc.metadata["file_type"]) for doc in written}, {(source, "pdf")})
+        self.assertIn("agent_domain", written[0].metadata)
+
+    def test_parallel_pdf_extraction_matches_serial_order(self):
+        from backend.ingestion.pdf_ingestion import iter_pdf_pages
+        path = os.path.join(self.data_dir, "multipage.pdf")
+        serial = list(iter_pdf_pages(path, workers=1))
+        parallel = list(iter_pdf_pages(path, workers=2, min_parallel_pages=1, pages_per_task=3))
+
+        self.assertEqual(len(serial), 8)
+        self.assertEqual(parallel, serial)
+
+    def test_extraction_workers_import_only_their_parser(self):
+        import subprocess
+        import sys
+        script = (
+            "import sys\n"
+            "import backend.ingestion.pdf_extraction\n"
+            "import backend.ingestion.pptx_extraction\n"
+            "print(any(name.split('.')[0] in ('langchain', 'langchain_core', 'chromadb') for name in sys.modules))\n"
+        )
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ["False"])
+
+    def test_pdf_chunks_carry_page_numbers(self):
+        from backend.ingestion.pdf_ingestion import iter_pdf_windows
+        pages = [(1, "first page"), (2, "second page"), (3, "third page")]
+        with patch("backend.ingestion.pdf_ingestion.iter_pdf_pages", return_value=iter(pages)):
+            windows = list(iter_pdf_windows("large.pdf", page_window=2))
+
+        self.assertEqual([[c.metadata["page"] for c in window] for window in windows], [[1, 2], [3]])
+
+    def test_ingest_pptx(self):
+        written, _ = self._ingest(ingest_pptx, os.path.join(self.data_dir, "dummy.pptx"))
+        self.assertEqual(written[0].metadata["file_type"], "pptx")
+
+    def test_pptx_slides_are_extracted_in_parallel_with_notes_and_tables(self):
+        from backend.ingestion.pptx_ingestion import iter_pptx_slides, iter_pptx_windows, synthetic_deck
+        path = synthetic_deck(os.path.join(self.data_dir, "synthetic.pptx"), slides=120)
+        serial = list(iter_pptx_slides(path, workers=1))
+        parallel = list(iter_pptx_slides(path, workers=2, min_parallel_slides=1, slides_per_task=25))
+
+        self.assertEqual(len(serial), 120)
+        self.assertEqual(parallel, serial)
+        slide_number, title, text, notes = serial[41]
+        self.assertEqual((slide_number, title), (42, "Slide 42: delivery stage review"))
+        self.assertIn("r1c0-42 | r1c1-42 | r1c2-42", text.splitlines())
+        self.assertEqual(notes, "Presenter notes for slide 42")
+
+        windows = list(iter_pptx_windows(path, slide_window=50, workers=1))
+        chunks = [chunk for window in windows for chunk in window]
+        self.assertEqual(len(windows), 3)
+        self.assertEqual([chunk.metadata["slide"] for chunk in chunks], list(range(1, 121)))
+        self.assertTrue(all(chunk.metadata["has_notes"] for chunk in chunks))
+        self.assertTrue(chunks[0].page_content.endswith("Speaker notes:\nPresenter notes for slide 1"))
+
+    def test_ingest_text(self):
+        written, _ = self._ingest(ingest_text, os.path.join(self.data_dir, "dummy.txt"))
+        self.assertEqual(written[0].metadata["file_type"], "txt")
+
+    def test_markdown_chunks_follow_headings(self):
+        from backend.ingestion.text_ingestion import iter_text_windows
+        path = os.path.join(self.data_dir, "guide.md")
+        with open(path, "w") as f:
+            f.write("# Guide\n\nIntroduction.\n\n## Setup ##\n\n```\n# not a heading\n```\n")
+            f.write("Install it.\n\n## Usage\n\n" + "Run the tool. " * 150 + "\n# Appendix\nNotes.\n")
+        chunks = [chunk for window in iter_text_windows(path) for chunk in window]
+
+        sections = [chunk.metadata["section"] for chunk in chunks]
+        self.assertEqual(sections[:2], ["Guide", "Guide > Setup"])
+        self.assertGreater(sections.count("Guide > Usage"), 1)
+        self.assertEqual(sections[-1], "Appendix")
+        self.assertEqual(chunks[1].page_content, "Setup\n```\n# not a heading\n```\nInstall it.")
+        self.assertTrue(chunks[2].page_content.startswith("Usage\nRun the tool."))
+
+    def test_ingest_docx(self):
+        written, _ = self._ingest(ingest_docx, os.path.join(self.data_dir, "dummy.docx"))
+        self.assertEqual(written[0].metadata["file_type"], "docx")
+
+    def test_docx_is_streamed_with_headings_and_table_rows(self):
+        from docx import Document
+        from backend.ingestion.text_ingestion import iter_docx_blocks, load_docx
+        path = os.path.join(self.data_dir, "report.docx")
+        document = Document()
+        document.add_heading("Report", 0)
+        document.add_paragraph("Summary.")
+        document.add_heading("Findings", 1)
+        table = document.add_table(rows=2, cols=2)
+        for row, values in enumerate([("Risk", "Owner"), ("Budget", "PMO")]):
+            for column, value in enumerate(values):
+                table.cell(row, column).text = value
+        document.save(path)
+
+        self.assertEqual(list(iter_docx_blocks(path)), [
+            (1, "Report"), (None, "Summary."), (1, "Findings"), (None, "Risk | Owner"), (None, "Budget | PMO"),
+        ])
+        chunks = list(load_docx(path))
+        self.assertEqual([chunk.metadata["section"] for chunk in chunks], ["Report", "Findings"])
+        self.assertEqual(chunks[1].page_content, "Findings\nRisk | Owner\nBudget | PMO")
+
+    def test_ingest_csv(self):
+        written, _ = self._ingest(ingest_csv, os.path.join(self.data_dir, "dummy.csv"))
+        self.assertEqual(written[0].metadata["file_type"], "csv")
+
+    def test_csv_is_streamed_in_row_aligned_records(self):
+        from backend.ingestion.csv_ingestion import iter_csv_windows
+        path = os.path.join(self.data_dir, "export.csv")
+        with open(path, "w") as f:
+            f.write("id,name,notes\n")
+            for row in range(40):
+                f.write(f"{row},item {row},{'' if row % 2 else 'checked'}\n")
+
+        windows = list(iter_csv_windows(path, read_chunk_rows=7, chunk_size=120))
+        chunks = [chunk for window in windows for chunk in window]
+
+        self.assertGreater(len(windows), 2)
+        self.assertEqual(chunks[0].page_content.splitlines()[:2], ["id: 0; name: item 0; notes: checked", "id: 1; name: item 1"])
+        self.assertTrue(all(len(chunk.page_content) <= 120 for chunk in chunks))
+        ranges = [(chunk.metadata["row_start"], chunk.metadata["row_end"]) for chunk in chunks]
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], 39)
+        self.assertTrue(all(end + 1 == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:])))
+        self.assertEqual(sum(len(chunk.page_content.splitlines()) for chunk in chunks), 40)
 
     @patch("backend.ingestion.web_ingestion.requests.get")
     @patch("backend.ingestion.web_ingestion.BeautifulSoup")
-    @patch("backend.ingestion.web_ingestion.Chroma.from_documents")
-    @patch("backend.ingestion.web_ingestion.HuggingFaceEmbeddings")
-    def test_ingest_web_page(self, mock_embeddings, mock_chroma, mock_bs, mock_requests_get):
+    def test_ingest_web_page(self, mock_bs, mock_requests_get):
         mock_requests_get.return_value.raise_for_status.return_value = None
         mock_requests_get.return_value.text = "<html><body><p>Test web content.</p></body></html>"
         mock_bs.return_value.find_all.return_value = [MagicMock(get_text=lambda: "Test web content.")]
 
-        ingest_web_page("http://example.com")
+        written, _ = self._ingest(ingest_web_page, "http://example.com")
         mock_requests_get.assert_called_once_with("http://example.com")
-        mock_embeddings.assert_called_once()
-        mock_chroma.assert_called_once()
+        self.assertEqual(written[0].metadata["source"], "http://example.com")
+
+class TestEmbeddingRegistry(unittest.TestCase):
+
+    def test_model_is_loaded_once_and_lazily(self):
+        from backend.ingestion.embedding_service import EmbeddingRegistry
+        factory = MagicMock()
+        factory.return_value.embed_documents.return_value = [[0.1, 0.2]]
+        registry = EmbeddingRegistry(factory=factory)
+
+        first = registry.get("test-model")
+        second = registry.get("test-model")
+        self.assertIs(first, second)
+        factory.assert_not_called()
+
+        first.embed_documents(["a"])
+        second.embed_documents(["b"])
+        factory.assert_called_once_with(model_name="test-model")
+
+    def test_warm_up_records_metrics(self):
+        from backend.ingestion.embedding_service import EmbeddingRegistry
+        registry = EmbeddingRegistry(factory=MagicMock())
+
+        metrics = registry.warm_up("test-model")
+        self.assertTrue(registry.is_loaded("test-model"))
+        self.assertIn("load_time_seconds", metrics)
+        self.assertIn("warm_up_seconds", metrics)
+        self.assertIn("test-model", registry.stats())
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "embedding_cache.db")
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def test_only_misses_reach_the_model(self):
+        from backend.ingestion.embedding_cache import EmbeddingCache
+        cache = EmbeddingCache(db_path=self.db_path)
+        compute = MagicMock(side_effect=lambda texts: [[float(len(t)), 0.5] for t in texts])
+
+        first = cache.embed_with_cache("model", ["alpha", "beta"], compute)
+        second = cache.embed_with_cache("model", ["alpha  ", "gamma", "beta"], compute)
+
+        self.assertEqual(first, [[5.0, 0.5], [4.0, 0.5]])
+        self.assertEqual(second, [[5.0, 0.5], [5.0, 0.5], [4.0, 0.5]])
+        self.assertEqual(compute.call_args_list[1][0][0], ["gamma"])
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        import time
+        from backend.ingestion.embedding_cache import EmbeddingCache, content_hash
+        cache = EmbeddingCache(db_path=self.db_path, max_entries=2)
+        cache.put_many("model", {content_hash("old"): [1.0]})
+        time.sleep(0.01)
+        cache.put_many("model", {content_hash("new"): [2.0]})
+        time.sleep(0.01)
+        cache.get_many("model", [content_hash("old")])
+        time.sleep(0.01)
+        cache.put_many("model", {content_hash("newest"): [3.0]})
+
+        remaining = cache.get_many("model", [content_hash(t) for t in ("old", "new", "newest")])
+        self.assertEqual(len(remaining), 2)
+        self.assertNotIn(content_hash("new"), remaining)
+
+    def test_dedupe_documents_assigns_content_ids(self):
+        from langchain_core.documents import Document
+        from backend.ingestion.embedding_cache import dedupe_documents, content_hash
+        documents, ids = dedupe_documents([Document(page_content="a b"), Document(page_content="a  b"), Document(page_content="c")])
+        self.assertEqual(len(documents), 2)
+        self.assertEqual(ids, [content_hash("a b"), content_hash("c")])
+
+class TestIncrementalIngestion(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "manual.txt")
+        with open(self.file_path, "w") as f:
+            f.write("v1")
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def _manager(self, loader):
+        from backend.ingestion.ingestion_manager import IngestionManager
+        from backend.ingestion.manifest import ManifestStore
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        with patch("backend.ingestion.ingestion_manager.get_vector_store"), \
+             patch("backend.ingestion.ingestion_manager.get_embeddings"):
+            manager = IngestionManager(
+                manifest_store=ManifestStore(os.path.join(self.tmp_dir, "manifest.db")),
+                writer=VectorStoreWriter(MagicMock(), flush_interval=0),
+            )
+        patcher = patch("backend.ingestion.ingestion_manager.get_loader", return_value=loader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return manager
+
+    def test_only_changed_chunks_are_written(self):
+        from langchain_core.documents import Document
+        loader = MagicMock(return_value=[Document(page_content="intro"), Document(page_content="chapter one")])
+        manager = self._manager(loader)
+
+        first = manager.ingest_document(self.file_path, "txt")
+        self.assertEqual(first["added"], 2)
+
+        with open(self.file_path, "w") as f:
+            f.write("v2 with edits")
+        loader.return_value = [Document(page_content="intro"), Document(page_content="chapter one, revised")]
+        second = manager.ingest_document(self.file_path, "txt")
+
+        self.assertEqual((second["added"], second["deleted"], second["chunks"]), (1, 1, 2))
+        added_documents = manager.writer.vectordb.add_documents.call_args[0][0]
+        self.assertEqual([d.page_content for d in added_documents], ["chapter one, revised"])
+        manager.writer.vectordb.delete.assert_called_once()
+
+    def test_chunks_are_tagged_for_filtering(self):
+        from langchain_core.documents import Document
+        loader = MagicMock(return_value=[Document(page_content="service value system", metadata={"page": 3})])
+        manager = self._manager(loader)
+
+        manager.ingest_document(self.file_path, "txt", agent_domain="itil")
+
+        metadata = manager.writer.vectordb.add_documents.call_args[0][0][0].metadata
+        self.assertEqual(metadata["page"], 3)
+        self.assertEqual((metadata["source"], metadata["file_type"], metadata["agent_domain"]),
+                         (os.path.abspath(self.file_path), "txt", "itil"))
+        self.assertEqual(metadata["modified_at"], os.stat(self.file_path).st_mtime)
+
+    def test_agent_domain_is_normalized_and_existing_chunks_are_retagged(self):
+        from langchain_core.documents import Document
+        loader = MagicMock(side_effect=lambda path: [Document(page_content="intro"), Document(page_content="scope")])
+        manager = self._manager(loader)
+        add_documents = manager.writer.vectordb.add_documents
+
+        manager.ingest_document(self.file_path, "txt", agent_domain="ITIL ")
+        self.assertEqual({d.metadata["agent_domain"] for d in add_documents.call_args[0][0]}, {"itil"})
+        self.assertTrue(manager.ingest_document(self.file_path, "txt", agent_domain="itil")["skipped"])
+
+        # An unchanged file ingested under another domain has all its chunks re-tagged
+        result = manager.ingest_document(self.file_path, "txt", agent_domain="PRINCE2")
+        self.assertEqual((result["skipped"], result["added"], result["deleted"]), (False, 2, 0))
+        self.assertEqual({d.metadata["agent_domain"] for d in add_documents.call_args[0][0]}, {"prince2"})
+
+        # As are documents whose manifest predates the recorded domain
+        key = os.path.abspath(self.file_path)
+        manifest = manager.manifests.get(key)
+        manager.manifests.save(key, "txt", manifest["chunks"], manifest["mtime"], manifest["size"], manifest["file_hash"])
+        self.assertEqual(manager.ingest_document(self.file_path, "txt", agent_domain="prince2")["added"], 2)
+        self.assertEqual(manager.manifests.get(key)["agent_domain"], "prince2")
+
+    def test_tenant_shard_gets_its_own_writer_and_manifest(self):
+        from langchain_core.documents import Document
+        loader = MagicMock(return_value=[Document(page_content="team runbook")])
+        manager = self._manager(loader)
+        shard_writer = MagicMock()
+
+        with patch("backend.ingestion.ingestion_manager.get_writer", return_value=shard_writer) as get_writer:
+            shard_writer.call_when_flushed.side_effect = lambda callback: callback(None)
+            result = manager.ingest_document(self.file_path, "txt", collection_name="langchain_team-pmo")
+            manager.ingest_document(self.file_path, "txt")
+
+        get_writer.assert_called_once_with("langchain_team-pmo")
+        shard_writer.add.assert_called_once()
+        self.assertEqual(result["added"], 1)
+        manager.writer.vectordb.add_documents.assert_called_once()
+        source = os.path.abspath(self.file_path)
+        self.assertIsNotNone(manager.manifests.get(f"langchain_team-pmo:{source}"))
+        self.assertIsNotNone(manager.manifests.get(source))
+
+    def test_manifest_waits_for_failed_write(self):
+        from langchain_core.documents import Document
+        loader = MagicMock(return_value=[Document(page_content="intro")])
+        manager = self._manager(loader)
+        manager.writer.vectordb.add_documents.side_effect = RuntimeError("chroma unavailable")
+
+        with self.assertRaises(RuntimeError):
+            manager.ingest_document(self.file_path, "txt")
+        self.assertIsNone(manager.manifests.get(os.path.abspath(self.file_path)))
+
+        manager.writer.vectordb.add_documents.side_effect = None
+        self.assertEqual(manager.ingest_document(self.file_path, "txt")["added"], 1)
+
+    def test_unchanged_file_is_skipped(self):
+        from langchain_core.documents import Document
+        loader = MagicMock(return_value=[Document(page_content="intro")])
+        manager = self._manager(loader)
+
+        manager.ingest_document(self.file_path, "txt")
+        result = manager.ingest_document(self.file_path, "txt")
+
+        self.assertTrue(result["skipped"])
+        loader.assert_called_once()
+
+class TestIngestionTaskQueue(unittest.TestCase):
+
+    def test_interactive_tasks_run_before_bulk(self):
+        from backend.ingestion.task_queue import IngestionTaskQueue
+        manager = MagicMock()
+        task_queue = IngestionTaskQueue(manager)
+        task_queue.add_task("backfill.pdf", "pdf", priority="bulk")
+        task_queue.add_task("upload.pdf", "pdf", priority="interactive")
+
+        task_queue.start_workers(num_workers=1)
+        self.assertTrue(task_queue.join(timeout=5))
+        task_queue.stop_workers()
+
+        processed = [c[0][0] for c in manager.ingest_document.call_args_list]
+        self.assertEqual(processed, ["upload.pdf", "backfill.pdf"])
+
+    def test_full_queue_rejects_tasks(self):
+        from backend.ingestion.task_queue import IngestionTaskQueue, QueueFullError
+        task_queue = IngestionTaskQueue(MagicMock(), max_queue_size=1)
+        task_queue.add_task("a.pdf", "pdf")
+        with self.assertRaises(QueueFullError):
+            task_queue.add_task("b.pdf", "pdf")
+
+    def test_failed_tasks_are_retried_with_backoff(self):
+        from backend.ingestion.task_queue import IngestionTaskQueue
+        manager = MagicMock()
+        manager.ingest_document.side_effect = [RuntimeError("transient"), {"chunks": 1}]
+        task_queue = IngestionTaskQueue(manager, max_retries=2, retry_backoff=0.01)
+
+        task_queue.start_workers(num_workers=1)
+        task_queue.add_task("flaky.pdf", "pdf")
+        self.assertTrue(task_queue.join(timeout=5))
+        task_queue.stop_workers()
+
+        self.assertEqual(manager.ingest_document.call_count, 2)
+        self.assertEqual(task_queue.stats()["retried"], 1)
+        self.assertEqual(task_queue.stats()["completed"], 1)
+
+class TestBulkIngestion(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.mkdtemp()
+        self.docs_dir = os.path.join(self.tmp_dir, "docs")
+        os.makedirs(os.path.join(self.docs_dir, "nested"))
+        for name in ("a.pdf", "nested/b.csv", "nested/c.md", "notes.bin"):
+            with open(os.path.join(self.docs_dir, name), "w") as f:
+                f.write(name)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def test_discovers_directories_globs_and_archives(self):
+        import zipfile
+        from backend.ingestion.bulk_ingestion import discover_files
+        names = lambda paths: sorted(os.path.basename(p) for p in paths)
+
+        self.assertEqual(names(discover_files(self.docs_dir)), ["a.pdf", "b.csv", "c.md", "notes.bin"])
+        self.assertEqual(names(discover_files(os.path.join(self.docs_dir, "**", "*.csv"))), ["b.csv"])
+
+        archive_path = os.path.join(self.tmp_dir, "docs.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.write(os.path.join(self.docs_dir, "a.pdf"), "a.pdf")
+            archive.write(os.path.join(self.docs_dir, "nested", "b.csv"), "nested/b.csv")
+        extract_root = os.path.join(self.tmp_dir, "extracted")
+        self.assertEqual(names(discover_files(archive_path, extract_root)), ["a.pdf", "b.csv"])
+
+    def test_archives_over_the_extraction_limits_are_rejected(self):
+        import zipfile
+        from backend.ingestion.bulk_ingestion import extract_archive
+        extract_root = os.path.join(self.tmp_dir, "extracted")
+        bomb_path = os.path.join(self.tmp_dir, "bomb.zip")
+        with zipfile.ZipFile(bomb_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("zeros.txt", b"\0" * 1_000_000)
+        many_path = os.path.join(self.tmp_dir, "many.zip")
+        with zipfile.ZipFile(many_path, "w") as archive:
+            for i in range(5):
+                archive.writestr(f"{i}.txt", "note")
+
+        with self.assertRaisesRegex(ValueError, "compression ratio"):
+            extract_archive(bomb_path, extract_root)
+        with self.assertRaisesRegex(ValueError, "more than"):
+            extract_archive(bomb_path, extract_root, max_bytes=1000, max_ratio=10_000)
+        with self.assertRaisesRegex(ValueError, "entries"):
+            extract_archive(many_path, extract_root, max_entries=4)
+        self.assertFalse(os.path.exists(extract_root))
+
+    def test_run_streams_per_file_events_and_summary(self):
+        from backend.ingestion.bulk_ingestion import BulkIngestor
+        def ingest_document(file_path, file_type, parse=None, flush=True):
+            if file_type == "csv":
+                raise RuntimeError("bad csv")
+            return {"chunks": 3, "added": 3}
+
+        manager = MagicMock()
+        manager.ingest_document.side_effect = ingest_document
+
+        events = list(BulkIngestor(manager, workers=2).run(self.docs_dir))
+        file_events = {os.path.basename(e["path"]): e for e in events if e["event"] == "file"}
+        summary = events[-1]
+
+        self.assertEqual(file_events["a.pdf"]["status"], "done")
+        self.assertEqual(file_events["c.md"]["file_type"], "txt")
+        self.assertEqual(file_events["b.csv"]["status"], "failed")
+        self.assertEqual(file_events["notes.bin"]["status"], "ignored")
+        self.assertEqual(summary["event"], "summary")
+        self.assertEqual((summary["done"], summary["failed"], summary["added"]), (2, 1, 6))
+        self.assertIn("documents_per_second", summary)
+        manager.writer.flush.assert_called_once()
+
+class TestFileTypeRegistry(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_types_are_detected_by_extension_mime_type_and_content(self):
+        from docx import Document
+        from backend.ingestion.file_types import detect_file_type
+        upload = os.path.join(self.tmp_dir, "upload.bin")
+        Document().save(upload)
+
+        self.assertEqual(detect_file_type("Guide.MD"), "txt")
+        self.assertEqual(detect_file_type("https://example.com/page"), "web")
+        self.assertEqual(detect_file_type(self._write("export", b"a,b\n1,2\n"), content_type="text/csv"), "csv")
+        self.assertEqual(detect_file_type(self._write("scan", b"%PDF-1.7\n")), "pdf")
+        self.assertEqual(detect_file_type(upload), "docx")
+        self.assertEqual(detect_file_type(self._write("README", b"Plain notes.\n")), "txt")
+        self.assertIsNone(detect_file_type(self._write("data.dat", b"Plain notes.\n")))
+        self.assertIsNone(detect_file_type(self._write("blob", b"\x89PNG\r\n\x1a\n\x00")))
+
+    def test_parsers_are_imported_on_first_use(self):
+        import subprocess
+        import sys
+        script = (
+            "import sys\n"
+            "from backend.ingestion.ingestion_manager import IngestionManager\n"
+            "print('pandas' in sys.modules, 'pypdf' in sys.modules)\n"
+            "from backend.ingestion.file_types import get_loader\n"
+            "get_loader('csv')\n"
+            "print('pandas' in sys.modules, 'pypdf' in sys.modules)\n"
+        )
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ["False", "False", "True", "False"])
+
+    def test_entry_point_plugins_are_registered(self):
+        from backend.ingestion import file_types
+        from backend.ingestion.file_types import FileTypeHandler, detect_file_type, get_handler, get_loader
+        from backend.ingestion.text_ingestion import load_text
+        plugin = MagicMock(value="kb_rst:handler")
+        plugin.name = "rst"
+        plugin.load.return_value = FileTypeHandler("rst", "backend.ingestion.text_ingestion:load_text", [".rst"])
+
+        with patch.object(file_types, "_entry_points_loaded", False), \
+             patch.dict(file_types._handlers), \
+             patch("backend.ingestion.file_types.entry_points", return_value=[plugin]) as discover:
+            self.assertEqual(detect_file_type("guide.rst"), "rst")
+            self.assertFalse(get_handler("rst").loaded)
+            self.assertIs(get_loader("rst"), load_text)
+            detect_file_type("other.rst")
+        discover.assert_called_once_with(group=file_types.FILE_TYPE_ENTRY_POINT_GROUP)
+        with self.assertRaises(ValueError):
+            get_handler("rst")
+
+    def test_lookups_during_plugin_discovery_see_the_plugin_types(self):
+        import threading
+        from backend.ingestion import file_types
+        from backend.ingestion.file_types import FileTypeHandler, is_supported
+        loading, release = threading.Event(), threading.Event()
+
+        def load():
+            loading.set()
+            release.wait(5)
+            return FileTypeHandler("rst", "backend.ingestion.text_ingestion:load_text", [".rst"])
+
+        plugin = MagicMock(value="kb_rst:handler", load=load)
+        plugin.name = "rst"
+        results = []
+        with patch.object(file_types, "_entry_points_loaded", False), \
+             patch.dict(file_types._handlers), \
+             patch("backend.ingestion.file_types.entry_points", return_value=[plugin]):
+            discovery = threading.Thread(target=lambda: results.append(is_supported("rst")))
+            discovery.start()
+            self.assertTrue(loading.wait(5))
+            lookup = threading.Thread(target=lambda: results.append(is_supported("rst")))
+            lookup.start()
+            release.set()
+            discovery.join(5)
+            lookup.join(5)
+        self.assertEqual(results, [True, True])
+
+class TestWebCrawler(unittest.TestCase):
+    """Crawls a local stand-in site that honours conditional requests."""
+
+    PAGES = {
+        "/itil.html": b"<html><head><title>ITIL</title></head><body><h1>Service value</h1><p>ITIL 4 guidance.</p></body></html>",
+        "/prince2.html": b"<html><body><p>PRINCE2 principles.</p><script>ignored()</script></body></html>",
+        "/logo.png": b"\x89PNG",
+    }
+
+    def setUp(self):
+        import tempfile
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.tmp_dir = tempfile.mkdtemp()
+        self.requests = []
+        pages, requests = self.PAGES, self.requests
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests.append((self.path, self.headers.get("If-None-Match")))
+                if self.path == "/moved":
+                    self.send_response(302)
+                    self.send_header("Location", f"http://localhost:{self.server.server_address[1]}/itil.html")
+                    self.end_headers()
+                    return
+                if self.path == "/sitemap.xml":
+                    base = f"http://{self.headers['Host']}"
+                    body = ('<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                            + "".join(f"<url><loc>{base}{path}</loc></url>" for path in pages) + "</urlset>").encode()
+                    content_type, etag = "application/xml", None
+                elif self.path in pages:
+                    body = pages[self.path]
+                    content_type = "image/png" if self.path.endswith(".png") else "text/html; charset=utf-8"
+                    etag = f'"{hash(body)}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        import shutil
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _manager(self):
+        from backend.ingestion.ingestion_manager import IngestionManager
+        from backend.ingestion.manifest import ManifestStore
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        with patch("backend.ingestion.ingestion_manager.get_vector_store"), \
+             patch("backend.ingestion.ingestion_manager.get_embeddings"):
+            return IngestionManager(
+                manifest_store=ManifestStore(os.path.join(self.tmp_dir, "manifest.db")),
+                writer=VectorStoreWriter(MagicMock(), flush_interval=0),
+            )
+
+    def test_sitemap_crawl_ingests_changed_pages_only(self):
+        from backend.ingestion.web_crawler import WebCrawler
+        manager = self._manager()
+        crawler = WebCrawler(manager, concurrency=4, per_host_rps=0, allow_private=True)
+
+        first = crawler.run(sitemap=f"{self.base}/sitemap.xml")
+        statuses = {event["url"].rsplit("/", 1)[1]: event["status"] for event in first if event["event"] == "page"}
+        self.assertEqual(statuses, {"itil.html": "done", "prince2.html": "done", "logo.png": "ignored"})
+        self.assertIsNone(first[-1]["write_error"])
+        written = manager.writer.vectordb.add_documents.call_args[0][0]
+        contents = " ".join(doc.page_content for doc in written)
+        self.assertIn("ITIL 4 guidance.", contents)
+        self.assertNotIn("ignored()", contents)
+        self.assertEqual({doc.metadata["title"] for doc in written}, {"ITIL", None})
+
+        second = crawler.run([f"{self.base}/itil.html", f"{self.base}/prince2.html#principles"])
+        self.assertEqual([event["status"] for event in second[:-1]], ["not_modified", "not_modified"])
+        self.assertEqual(manager.writer.vectordb.add_documents.call_count, 1)
+        self.assertTrue(all(etag for path, etag in self.requests[-2:]))
+
+    def test_private_addresses_and_redirect_hops_are_checked(self):
+        from backend.ingestion.web_crawler import UnsafeURLError, WebCrawler, check_url
+        manager = self._manager()
+
+        events = WebCrawler(manager, per_host_rps=0).run([f"{self.base}/itil.html"])
+        self.assertEqual(events[0]["status"], "failed")
+        self.assertIn("non-public address 127.0.0.1", events[0]["error"])
+
+        # The redirect target's host is checked before it is requested
+        crawler = WebCrawler(manager, per_host_rps=0, allowed_hosts=frozenset({"127.0.0.1"}), allow_private=True)
+        events = crawler.run([f"{self.base}/moved"])
+        self.assertEqual(events[0]["status"], "failed")
+        self.assertIn("not in CRAWL_ALLOWED_HOSTS: localhost", events[0]["error"])
+        self.assertEqual([path for path, _ in self.requests], ["/moved"])
+
+        with self.assertRaises(UnsafeURLError):
+            check_url("file:///etc/passwd")
+        self.assertEqual(check_url("https://docs.Example.com/a", frozenset({"example.com"})), "docs.example.com")
+
+    def test_requests_to_one_host_are_rate_limited(self):
+        import asyncio
+        import time
+        from backend.ingestion.web_crawler import HostRateLimiter
+
+        async def start_times():
+            limiter = HostRateLimiter(per_second=20)
+            started = []
+
+            async def request(host):
+                await limiter.wait(host)
+                started.append((host, time.monotonic()))
+
+            await asyncio.gather(*(request("a.example") for _ in range(4)), request("b.example"))
+            return started
+
+        started = asyncio.run(start_times())
+        same_host = [at for host, at in started if host == "a.example"]
+        self.assertGreaterEqual(same_host[-1] - same_host[0], 0.14)
+        other_host = next(at for host, at in started if host == "b.example")
+        self.assertLess(other_host - same_host[0], 0.04)
+
+class TestJobStore(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def test_jobs_record_progress_and_are_resumed(self):
+        from backend.ingestion.job_store import JobStore
+        from backend.ingestion.task_queue import IngestionTaskQueue
+        db_path = os.path.join(self.tmp_dir, "jobs.db")
+
+        # A queue that is never started leaves its job behind, as after a crash
+        IngestionTaskQueue(MagicMock(), job_store=JobStore(db_path)).add_task("manual.pdf", "pdf")
+
+        job_store = JobStore(db_path)
+        manager = MagicMock()
+        manager.ingest_document.return_value = {"chunks": 7, "added": 7, "deleted": 0, "timings": {"parse": 0.5}}
+        task_queue = IngestionTaskQueue(manager, job_store=job_store)
+        task_queue.start_workers(num_workers=1)
+        self.assertTrue(task_queue.join(timeout=5))
+        task_queue.stop_workers()
+
+        jobs = job_store.list()
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]["status"], "done")
+        self.assertEqual(jobs[0]["chunk_count"], 7)
+        self.assertEqual(jobs[0]["stage_timings"], {"parse": 0.5})
+
+    def test_resumed_jobs_keep_their_collection(self):
+        from backend.ingestion.job_store import JobStore
+        from backend.ingestion.task_queue import IngestionTaskQueue
+        db_path = os.path.join(self.tmp_dir, "jobs.db")
+        IngestionTaskQueue(MagicMock(), job_store=JobStore(db_path)).add_task(
+            "runbook.pdf", "pdf", collection_name="langchain_team-ops"
+        )
+
+        manager = MagicMock()
+        manager.ingest_document.return_value = {}
+        task_queue = IngestionTaskQueue(manager, job_store=JobStore(db_path))
+        task_queue.start_workers(num_workers=1)
+        self.assertTrue(task_queue.join(timeout=5))
+        task_queue.stop_workers()
+
+        self.assertEqual(manager.ingest_document.call_args[1]["collection_name"], "langchain_team-ops")
+
+    def test_exhausted_retries_mark_job_failed(self):
+        from backend.ingestion.job_store import JobStore
+        from backend.ingestion.task_queue import IngestionTaskQueue
+        job_store = JobStore(os.path.join(self.tmp_dir, "jobs.db"))
+        manager = MagicMock()
+        manager.ingest_document.side_effect = RuntimeError("corrupt file")
+        task_queue = IngestionTaskQueue(manager, max_retries=0, job_store=job_store)
+
+        task_queue.start_workers(num_workers=1)
+        task = task_queue.add_task("broken.pdf", "pdf")
+        self.assertTrue(task_queue.join(timeout=5))
+        task_queue.stop_workers()
+
+        job = job_store.get(task.job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "corrupt file")
+
+class TestEmbeddingScheduler(unittest.TestCase):
+
+    def test_concurrent_requests_are_pooled_into_one_batch(self):
+        from backend.ingestion.embedding_scheduler import EmbeddingScheduler
+        batches = []
+
+        def embed_fn(texts):
+            batches.append(list(texts))
+            return [[float(len(text))] for text in texts]
+
+        # The batch is dispatched as soon as it is full, so the long wait is never reached
+        scheduler = EmbeddingScheduler(embed_fn, max_batch_size=3, max_wait_ms=60_000)
+        first = scheduler.submit(["x", "yy"])
+        second = scheduler.submit(["zzz"])
+
+        self.assertEqual(first.result(timeout=5), [[1.0], [2.0]])
+        self.assertEqual(second.result(timeout=5), [[3.0]])
+        scheduler.stop()
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(scheduler.stats()["chunks_embedded"], 3)
+
+    def test_stop_never_leaves_a_request_waiting(self):
+        import threading
+        from backend.ingestion.embedding_scheduler import EmbeddingScheduler, SchedulerStoppedError, _EmbeddingRequest
+        entered, release = threading.Event(), threading.Event()
+
+        def embed_fn(texts):
+            entered.set()
+            release.wait(5)
+            return [[0.0] for _ in texts]
+
+        scheduler = EmbeddingScheduler(embed_fn, max_batch_size=1, max_wait_ms=0)
+        running = scheduler.submit(["a"])
+        self.assertTrue(entered.wait(5))
+        queued = scheduler.submit(["b"])
+        requests = scheduler._requests
+        scheduler.stop(timeout=0)
+        # A request that lands behind the stop marker is failed rather than left pending
+        late = scheduler.submit(["c"])
+        stranded = _EmbeddingRequest(["d"])
+        requests.put(stranded)
+        release.set()
+
+        self.assertEqual(running.result(timeout=5), [[0.0]])
+        self.assertEqual(queued.result(timeout=5), [[0.0]])
+        self.assertEqual(late.result(timeout=5), [[0.0]])
+        with self.assertRaises(SchedulerStoppedError):
+            stranded.future.result(timeout=5)
+        scheduler.stop()
+
+    def test_batches_are_capped_at_max_batch_size(self):
+        from backend.ingestion.embedding_scheduler import EmbeddingScheduler
+        sizes = []
+
+        def embed_fn(texts):
+            sizes.append(len(texts))
+            return [[0.0] for _ in texts]
+
+        scheduler = EmbeddingScheduler(embed_fn, max_batch_size=4, max_wait_ms=1)
+        vectors = scheduler.embed([str(i) for i in range(10)])
+        scheduler.stop()
+
+        self.assertEqual(len(vectors), 10)
+        self.assertEqual(sizes, [4, 4, 2])
+
+    def test_errors_are_propagated_to_callers(self):
+        from backend.ingestion.embedding_scheduler import EmbeddingScheduler
+        scheduler = EmbeddingScheduler(MagicMock(side_effect=RuntimeError("model failed")), max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            scheduler.embed(["text"])
+        scheduler.stop()
+
+class TestVectorStoreWriter(unittest.TestCase):
+
+    def _documents(self, *texts):
+        from langchain_core.documents import Document
+        return [Document(page_content=text) for text in texts], list(texts)
+
+    def test_chunks_from_many_documents_are_coalesced(self):
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        vectordb = MagicMock()
+        writer = VectorStoreWriter(vectordb, batch_size=4, flush_interval=0)
+
+        writer.add(*self._documents("a", "b"))
+        writer.add(*self._documents("c"))
+        vectordb.add_documents.assert_not_called()
+        writer.add(*self._documents("d", "e"))
+
+        vectordb.add_documents.assert_called_once()
+        self.assertEqual(vectordb.add_documents.call_args[1]["ids"], ["a", "b", "c", "d"])
+        self.assertEqual(writer.stats()["pending"], 1)
+
+    def test_callbacks_run_after_flush(self):
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        writer = VectorStoreWriter(MagicMock(), batch_size=100, flush_interval=0)
+        outcomes = []
+
+        writer.add(*self._documents("a"))
+        writer.call_when_flushed(outcomes.append)
+        self.assertEqual(outcomes, [])
+        writer.flush()
+        self.assertEqual(outcomes, [None])
+
+    def test_deleted_ids_are_dropped_from_buffer(self):
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        vectordb = MagicMock()
+        writer = VectorStoreWriter(vectordb, batch_size=100, flush_interval=0)
+
+        writer.add(*self._documents("a", "b"))
+        writer.delete(["a"])
+        writer.flush()
+
+        vectordb.delete.assert_called_once_with(ids=["a"])
+        self.assertEqual(vectordb.add_documents.call_args[1]["ids"], ["b"])
+
+    def test_deletes_are_buffered_and_applied_in_order_with_upserts(self):
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        vectordb = MagicMock()
+        writer = VectorStoreWriter(vectordb, batch_size=100, flush_interval=0)
+
+        # A re-ingest: the new chunk is added and the stale one deleted in the same flush
+        writer.add(*self._documents("new"))
+        writer.delete(["stale"])
+        writer.add(*self._documents("stale"))
+        vectordb.delete.assert_not_called()
+        writer.flush()
+
+        self.assertEqual([call[0] for call in vectordb.method_calls],
+                         ["add_documents", "delete", "add_documents"])
+        self.assertEqual(vectordb.delete.call_args, ((), {"ids": ["stale"]}))
+        self.assertEqual(writer.stats()["deleted"], 1)
+
+    def test_write_errors_reach_only_the_callbacks_of_failed_chunks(self):
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        vectordb = MagicMock()
+        failure = RuntimeError("store unavailable")
+        vectordb.add_documents.side_effect = [failure, None]
+        writer = VectorStoreWriter(vectordb, batch_size=3, flush_interval=0)
+        outcomes = {}
+
+        writer.add(*self._documents("a1"))
+        writer.call_when_flushed(lambda error: outcomes.setdefault("a", error))
+        writer.add(*self._documents("b1"))
+        writer.call_when_flushed(lambda error: outcomes.setdefault("b", error))
+        # Another document's chunks fill the batch and its write fails; c2 stays buffered
+        with self.assertRaises(RuntimeError):
+            writer.add(*self._documents("c1", "c2"))
+        writer.call_when_flushed(lambda error: outcomes.setdefault("c", error))
+        writer.add(*self._documents("d1"))
+        writer.call_when_flushed(lambda error: outcomes.setdefault("d", error))
+        writer.flush()
+
+        self.assertEqual(outcomes, {"a": failure, "b": failure, "c": failure, "d": None})
+        self.assertEqual(vectordb.add_documents.call_args[1]["ids"], ["c2", "d1"])
+
+    def test_lexical_index_follows_writes_and_deletes(self):
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        lexical_index = MagicMock()
+        writer = VectorStoreWriter(MagicMock(), batch_size=100, flush_interval=0, lexical_index=lexical_index)
+
+        writer.add(*self._documents("a", "b"))
+        lexical_index.add.assert_not_called()
+        writer.flush()
+        writer.delete(["a"])
+        writer.flush()
+
+        self.assertEqual(lexical_index.add.call_args[0][1], ["a", "b"])
+        lexical_index.delete.assert_called_once_with(["a"])
+
+    def test_pending_chunks_are_flushed_after_interval(self):
+        import time
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        vectordb = MagicMock()
+        writer = VectorStoreWriter(vectordb, batch_size=100, flush_interval=0.05)
+
+        writer.add(*self._documents("a"))
+        deadline = time.monotonic() + 5
+        while not vectordb.add_documents.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.close()
+
+        vectordb.add_documents.assert_called_once()
+
+    def test_writes_bump_the_version_shared_with_other_processes(self):
+        import tempfile
+        from backend.ingestion.manifest import ManifestStore
+        from backend.ingestion.vector_store_writer import VectorStoreWriter
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "manifest.db")
+            # Another process (e.g. the bulk CLI) writing through its own store
+            writer = VectorStoreWriter(MagicMock(), batch_size=100, flush_interval=0,
+                                       collection_name="docs", version_store=ManifestStore(db_path))
+            reader = ManifestStore(db_path)
+            self.assertEqual(reader.collection_version("docs"), 0)
+
+            writer.add(*self._documents("a"))
+            writer.flush()
+            writer.flush()
+            self.assertEqual(reader.collection_version("docs"), 1)
+            writer.delete(["a"])
+            writer.flush()
+            self.assertEqual(reader.collection_version("docs"), 2)
+            self.assertEqual(reader.collection_version("other"), 0)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,452 @@
+import unittest
+import os
+from unittest.mock import MagicMock, patch
+
+from langchain_core.documents import Document
+
+from backend.retrieval.ann_benchmark import PrecomputedEmbeddings, run_benchmark, synthetic_vectors
+from backend.retrieval.bm25_index import BM25Index
+from backend.retrieval.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+from backend.retrieval.local_vector_store import LocalVectorStore
+from backend.retrieval.metadata_filters import MetadataIndex, QueryFilters, infer_agent_domain
+from backend.retrieval.reranker import CrossEncoderReranker
+from backend.retrieval.retrieval_pipeline import RetrievalPipeline
+from backend.retrieval.semantic_cache import SemanticQueryCache
+from backend.tenancy import ShardRouter, collection_for, tenant_for
+
+def _embeddings(vectors):
+    embeddings = MagicMock()
+    embeddings.embed_query.side_effect = lambda text: vectors[text]
+    return embeddings
+
+class TestSemanticQueryCache(unittest.TestCase):
+
+    def test_similar_query_hits_and_dissimilar_misses(self):
+        embeddings = _embeddings({
+            "PRINCE2 principles": [1.0, 0.0, 0.1],
+            "what are the 7 PRINCE2 principles": [0.95, 0.05, 0.12],
+            "ITIL service lifecycle": [0.0, 1.0, 0.0],
+        })
+        cache = SemanticQueryCache(embeddings, threshold=0.9)
+        cache.store("PRINCE2 principles", "Seven principles", [{"content": "...", "metadata": {}}])
+
+        hit = cache.lookup("what are the 7 PRINCE2 principles")
+        self.assertEqual(hit["answer"], "Seven principles")
+        self.assertEqual(hit["cached_query"], "PRINCE2 principles")
+        self.assertIsNone(cache.lookup("ITIL service lifecycle"))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_exact_repeat_skips_embedding(self):
+        embeddings = _embeddings({"PRINCE2 principles": [1.0, 0.0]})
+        cache = SemanticQueryCache(embeddings)
+        cache.store("PRINCE2 principles", "Seven principles")
+
+        self.assertIsNotNone(cache.lookup("  prince2   PRINCIPLES "))
+        self.assertEqual(embeddings.embed_query.call_count, 1)
+        self.assertEqual(cache.stats()["exact_hits"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        embeddings = _embeddings({"a": [1.0, 0.0, 0.0], "b": [0.0, 1.0, 0.0], "c": [0.0, 0.0, 1.0]})
+        cache = SemanticQueryCache(embeddings, max_entries=2)
+        cache.store("a", "A")
+        cache.store("b", "B")
+        cache.lookup("a")
+        cache.store("c", "C")
+
+        self.assertIsNotNone(cache.lookup("a"))
+        self.assertIsNone(cache.lookup("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expired_entries_miss(self):
+        embeddings = _embeddings({"a": [1.0, 0.0]})
+        cache = SemanticQueryCache(embeddings, ttl_seconds=0.01)
+        cache.store("a", "A")
+        import time
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.lookup("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_collection_change_invalidates(self):
+        version = {"value": 1}
+        embeddings = _embeddings({"a": [1.0, 0.0]})
+        cache = SemanticQueryCache(embeddings, version=lambda: version["value"])
+        cache.store("a", "A")
+        self.assertIsNotNone(cache.lookup("a"))
+
+        version["value"] = 2
+        self.assertIsNone(cache.lookup("a"))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+class TestRagStreaming(unittest.TestCase):
+
+    def test_cached_answer_is_streamed_without_generation(self):
+        from backend.retrieval.rag_streaming import stream_rag_events
+        cache = SemanticQueryCache(_embeddings({"q": [1.0, 0.0]}))
+        cache.store("q", "cached answer", [{"content": "c", "metadata": {}}])
+        llm = MagicMock()
+
+        events = list(stream_rag_events("q", MagicMock(), llm, cache))
+
+        self.assertEqual([e["event"] for e in events], ["sources", "token", "done"])
+        self.assertTrue(events[-1]["data"]["cached"])
+        llm.stream.assert_not_called()
+
+    def test_generation_failure_becomes_error_event(self):
+        from backend.retrieval.rag_streaming import stream_rag_events
+        llm = MagicMock()
+        llm.stream.side_effect = ConnectionError("ollama is down")
+        retriever = MagicMock()
+        retriever.invoke.return_value = []
+
+        events = list(stream_rag_events("q", retriever, llm))
+
+        self.assertEqual(events[-1], {"event": "error", "data": "ollama is down"})
+
+class TestBM25Index(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "bm25.db")
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def _index(self):
+        from backend.ingestion.vector_store_writer import CHROMA_COLLECTION
+        return BM25Index(CHROMA_COLLECTION, db_path=self.db_path)
+
+    def test_acronyms_and_section_numbers_match_exactly(self):
+        index = self._index()
+        index.add([
+            Document(page_content="Incident management restores normal service operation."),
+            Document(page_content="The ITIL SLM practice sets service level targets."),
+            Document(page_content="PMBOK section 4.2.1 covers the project charter."),
+        ], ["incident", "slm", "charter"])
+
+        self.assertEqual(index.search("SLM", k=1)[0][0], "slm")
+        self.assertEqual(index.search("what is in 4.2.1", k=1)[0][0], "charter")
+
+    def test_index_is_persisted_and_deletes_are_applied(self):
+        index = self._index()
+        index.add([Document(page_content="ITIL change enablement", metadata={"source": "itil.pdf"}),
+                   Document(page_content="Agile retrospectives")], ["itil", "agile"])
+        index.delete(["agile"])
+
+        reloaded = self._index()
+        self.assertEqual([doc_id for doc_id, _ in reloaded.search("itil agile")], ["itil"])
+        self.assertEqual(reloaded.get_documents(["itil"])["itil"].metadata, {"source": "itil.pdf"})
+        self.assertEqual(reloaded.stats()["documents"], 1)
+
+    def test_writes_from_another_process_are_picked_up(self):
+        index = self._index()
+        # Another process's index over the same database
+        other = self._index()
+        other.add([Document(page_content="ITIL change enablement")], ["itil"])
+        self.assertFalse(other.refresh())
+
+        self.assertEqual([doc_id for doc_id, _ in index.search("itil")], ["itil"])
+        other.delete(["itil"])
+        self.assertEqual(index.search("itil"), [])
+        index.add([Document(page_content="Agile retrospectives")], ["agile"])
+        self.assertFalse(index.refresh())
+
+class TestHybridRetriever(unittest.TestCase):
+
+    def test_reciprocal_rank_fusion_rewards_agreement(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]])
+        self.assertEqual([doc_id for doc_id, _ in fused], ["a", "c", "b"])
+
+    def test_lexical_only_hits_are_returned(self):
+        vectorstore = MagicMock()
+        vectorstore.similarity_search.return_value = [
+            Document(id="dense", page_content="service level management overview"),
+        ]
+        bm25_index = MagicMock()
+        bm25_index.search.return_value = [("slm", 3.2)]
+        bm25_index.get_documents.return_value = {"slm": Document(id="slm", page_content="SLM targets")}
+
+        retriever = HybridRetriever(vectorstore=vectorstore, bm25_index=bm25_index, k=2)
+        documents = retriever.invoke("SLM")
+
+        self.assertEqual({doc.id for doc in documents}, {"dense", "slm"})
+        bm25_index.get_documents.assert_called_once_with(["slm"])
+
+    def test_dense_hits_without_an_id_merge_with_their_lexical_hit(self):
+        from backend.ingestion.embedding_cache import chunk_id, content_hash
+        doc = Document(page_content="SLM targets", metadata={"source": "itil.pdf"})
+        stored_id = chunk_id(content_hash(doc.page_content), "itil.pdf")
+        vectorstore = MagicMock()
+        vectorstore.similarity_search.return_value = [doc]
+        bm25_index = MagicMock()
+        bm25_index.search.return_value = [(stored_id, 3.2)]
+        bm25_index.get_documents.return_value = {}
+
+        documents = HybridRetriever(vectorstore=vectorstore, bm25_index=bm25_index, k=2).invoke("SLM")
+
+        self.assertEqual(documents, [doc])
+
+class TestRetrievalPipeline(unittest.TestCase):
+
+    def test_candidates_are_reranked_and_trimmed_to_budget(self):
+        base_retriever = MagicMock()
+        base_retriever.invoke.return_value = [
+            Document(page_content="x" * 400, metadata={"source": "weak"}),
+            Document(page_content="y" * 400, metadata={"source": "best"}),
+            Document(page_content="z" * 400, metadata={"source": "good"}),
+        ]
+        model = MagicMock()
+        model.predict.return_value = [0.1, 0.9, 0.5]
+        reranker = CrossEncoderReranker(factory=lambda name, max_length: model)
+
+        pipeline = RetrievalPipeline(base_retriever, reranker, top_n=3, max_context_tokens=150)
+        documents, timings = pipeline.run("query")
+
+        self.assertEqual([doc.metadata["source"] for doc in documents], ["best", "good"])
+        self.assertTrue(documents[-1].metadata["truncated"])
+        self.assertEqual((timings["candidates"], timings["documents"], timings["context_tokens"]), (3, 2, 150))
+        self.assertIn("rerank", pipeline.stats()["stages_ms"])
+
+    def test_reranker_load_failure_keeps_retrieval_order(self):
+        def factory(name, max_length):
+            raise OSError("model not available offline")
+        reranker = CrossEncoderReranker(factory=factory)
+        documents = [Document(page_content="a"), Document(page_content="b")]
+
+        ranked = reranker.rerank("q", documents, top_n=1)
+
+        self.assertEqual([doc.page_content for doc, _ in ranked], ["a"])
+
+    def test_pipeline_retriever_works_in_chains(self):
+        base_retriever = MagicMock()
+        base_retriever.invoke.return_value = [Document(page_content="chunk")]
+        retriever = RetrievalPipeline(base_retriever).as_retriever()
+
+        self.assertEqual([doc.page_content for doc in retriever.invoke("q")], ["chunk"])
+
+class TestMetadataFilters(unittest.TestCase):
+
+    def test_query_filters_build_a_where_clause(self):
+        self.assertIsNone(QueryFilters().to_where())
+        self.assertEqual(QueryFilters(file_type="PDF").to_where(), {"file_type": {"$in": ["pdf"]}})
+        where = QueryFilters(source=["a.pdf", "b.pdf"], date_from="2024-01-01", date_to="2024-01-31").to_where()
+        self.assertEqual(where["$and"][0], {"source": {"$in": ["a.pdf", "b.pdf"]}})
+        self.assertEqual(where["$and"][1], {"modified_at": {"$gte": 1704067200.0}})
+        self.assertAlmostEqual(where["$and"][2]["modified_at"]["$lte"], 1706745600.0, places=3)
+        from pydantic import ValidationError
+        with self.assertRaises(ValidationError):
+            QueryFilters(file_types=["pdf"])
+
+    def test_metadata_index_resolves_clauses_from_postings(self):
+        index = MetadataIndex()
+        index.add("a", {"source": "itil.pdf", "file_type": "pdf", "modified_at": 10})
+        index.add("b", {"source": "scrum.pptx", "file_type": "pptx", "modified_at": 20})
+        index.add("c", {"source": "itil-4.csv", "file_type": "csv", "modified_at": 30})
+        index.remove("c")
+
+        self.assertEqual(index.select({"file_type": {"$in": ["pdf", "csv"]}}), {"a"})
+        self.assertEqual(index.select({"$and": [{"modified_at": {"$gte": 15}}, {"file_type": {"$ne": "pdf"}}]}), {"b"})
+        self.assertEqual(index.select({"$or": [{"source": "itil.pdf"}, {"modified_at": {"$gt": 15}}]}), {"a", "b"})
+        with self.assertRaises(ValueError):
+            index.select({"page": {"$gte": 2}})
+
+    def test_agent_domain_is_inferred_from_the_path(self):
+        self.assertEqual(infer_agent_domain("/docs/ITIL_4_Foundation.pdf"), "itil")
+        self.assertEqual(infer_agent_domain("/docs/PRINCE2-manual.pdf"), "prince2")
+        self.assertEqual(infer_agent_domain("/docs/scrum-guide.pdf"), "agile")
+        self.assertEqual(infer_agent_domain("/docs/notes.txt"), "general")
+
+    def test_bm25_search_is_scoped_by_filter(self):
+        import shutil, tempfile
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            index = BM25Index("docs", db_path=os.path.join(tmp_dir, "bm25.db"))
+            index.add([Document(page_content="change enablement", metadata={"agent_domain": "itil"}),
+                       Document(page_content="change control", metadata={"agent_domain": "prince2"})], ["itil", "prince2"])
+            self.assertEqual(len(index.search("change")), 2)
+            self.assertEqual([doc_id for doc_id, _ in index.search("change", filter={"agent_domain": {"$in": ["prince2"]}})],
+                             ["prince2"])
+            reloaded = BM25Index("docs", db_path=os.path.join(tmp_dir, "bm25.db"))
+            self.assertEqual([doc_id for doc_id, _ in reloaded.search("change", filter={"agent_domain": "itil"})], ["itil"])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+class TestLocalVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.tmp_dir = tempfile.mkdtemp()
+        self.vectors = synthetic_vectors(1200, 32)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+
+    def _store(self, index_type, **index_params):
+        return LocalVectorStore("docs", PrecomputedEmbeddings(self.vectors), persist_directory=self.tmp_dir,
+                                index_type=index_type, **index_params)
+
+    def test_upsert_delete_and_reload(self):
+        store = self._store("hnsw")
+        store.add_documents([Document(page_content="0", metadata={"source": "a.pdf"}),
+                             Document(page_content="1")], ids=["a", "b"])
+        store.add_documents([Document(page_content="2", metadata={"source": "a.pdf"})], ids=["a"])
+        store.delete(["b"])
+
+        reloaded = self._store("hnsw")
+        hits = reloaded.similarity_search("2", k=2)
+        self.assertEqual([(doc.id, doc.page_content) for doc in hits], [("a", "2")])
+        self.assertEqual(reloaded.get(include=["documents"])["ids"], ["a"])
+        self.assertEqual(reloaded.stats()["live"], 1)
+
+    def test_index_is_saved_on_close_rather_than_every_write(self):
+        from backend.retrieval.local_vector_store import save_index
+        store = self._store("ivf", nlist=4)
+        with patch("backend.retrieval.local_vector_store.save_index", wraps=save_index) as save:
+            for i in range(5):
+                store.add_texts([str(i)], ids=[str(i)])
+            # Only the empty index built when the collection was first written
+            self.assertEqual(save.call_count, 1)
+            store.close()
+            self.assertEqual(save.call_count, 2)
+
+        with patch.object(LocalVectorStore, "_rebuild") as rebuild:
+            reloaded = self._store("ivf", nlist=4)
+            rebuild.assert_not_called()
+        self.assertEqual([doc.id for doc in reloaded.similarity_search("3", k=1)], ["3"])
+
+    def test_delete_after_the_last_save_survives_an_unclean_stop(self):
+        store = self._store("ivf", nlist=4)
+        ids = [str(i) for i in range(20)]
+        store.add_texts(ids, ids=ids)
+        store.persist()
+        store.delete(["3"])
+
+        # Reopened without close(): the saved index predates the delete
+        reloaded = self._store("ivf", nlist=4)
+        hits = reloaded.similarity_search("3", k=4)
+        self.assertEqual(len(hits), 4)
+        self.assertNotIn("3", [doc.id for doc in hits])
+        self.assertEqual((reloaded.stats()["live"], reloaded.stats()["deleted"]), (19, 0))
+
+    def test_ann_indexes_reach_high_recall(self):
+        for index_type, params in (("hnsw", {"ef_search": 32}), ("ivf", {"nlist": 16, "nprobe": 8})):
+            report = run_benchmark(self.vectors[:1000], self.vectors[1000:1050], k=5,
+                                   backends=[index_type], index_params={index_type: params})[0]
+            self.assertGreaterEqual(report["recall@5"], 0.9, index_type)
+
+    def test_filtered_search_only_returns_matching_chunks(self):
+        store = self._store("hnsw")
+        ids = [str(i) for i in range(200)]
+        store.add_texts(ids, metadatas=[{"agent_domain": "itil" if i % 10 == 0 else "prince2", "modified_at": i}
+                                        for i in range(200)], ids=ids)
+        where = QueryFilters(agent_domain="ITIL").to_where()
+
+        hits = store.similarity_search("5", k=5, filter=where)
+        self.assertEqual(len(hits), 5)
+        self.assertTrue(all(doc.metadata["agent_domain"] == "itil" for doc in hits))
+        scoped = store.similarity_search("5", k=5, filter={"$and": [where, {"modified_at": {"$lte": 30}}]})
+        self.assertEqual(sorted(doc.id for doc in scoped), ["0", "10", "20", "30"])
+
+    def test_quantized_indexes_shrink_memory_and_rescore_exactly(self):
+        from backend.retrieval.ann_index import FlatIndex, Int8Index, PQIndex, VectorFile
+        vectors = VectorFile(os.path.join(self.tmp_dir, "vectors.f32"), 32)
+        vectors.append(self.vectors[:1000])
+        exact = FlatIndex(vectors)
+        for index in (Int8Index(vectors), PQIndex(vectors, m=8)):
+            index.add(range(1000))
+            index.train()
+            index.remove([0])
+            hits = 0
+            for query in self.vectors[1000:1050]:
+                expected = {slot for slot, _ in exact.search(query, 6) if slot != 0}
+                found = index.search(query, 5)
+                self.assertNotIn(0, [slot for slot, _ in found])
+                hits += len(expected & {slot for slot, _ in found})
+            self.assertGreaterEqual(hits / 250, 0.9, index.kind)
+            self.assertLess(index.memory_bytes(), exact.memory_bytes() / 3, index.kind)
+
+    def test_batched_search_matches_single_queries(self):
+        for index_type in ("flat", "hnsw"):
+            store = self._store(index_type)
+            ids = [str(i) for i in range(300)]
+            store.add_texts(ids, metadatas=[{"file_type": "pdf" if i % 3 else "csv"} for i in range(300)], ids=ids)
+            queries = self.vectors[1000:1020].tolist()
+            for where in (None, {"file_type": "csv"}):
+                batched = store.similarity_search_with_score_by_vectors(queries, k=5, filter=where)
+                single = [store.similarity_search_with_score_by_vector(query, k=5, filter=where) for query in queries]
+                self.assertEqual([[doc.id for doc, _ in hits] for hits in batched],
+                                 [[doc.id for doc, _ in hits] for hits in single], index_type)
+
+class TestTenancy(unittest.TestCase):
+
+    def test_tenants_map_to_valid_collection_names(self):
+        self.assertEqual(tenant_for({"id": 7, "team": "PMO"}), "team-PMO")
+        self.assertEqual(tenant_for({"id": 7, "email": "a@example.com"}), "user-7")
+        self.assertRegex(collection_for("team-PMO / EMEA"), r"^langchain_team-pmo-emea_[0-9a-f]{8}$")
+        # Ids that slug alike still get their own shard
+        self.assertNotEqual(collection_for("team-Sales"), collection_for("team-sales"))
+        self.assertNotEqual(collection_for("team-sales.eu"), collection_for("team-sales-eu"))
+        long_name = collection_for("team-" + "x" * 100)
+        self.assertLessEqual(len(long_name), 63)
+        self.assertNotEqual(long_name, collection_for("team-" + "x" * 101))
+
+    def test_fan_out_merges_shards_and_records_latency(self):
+        from unittest.mock import patch
+        own, shared = MagicMock(), MagicMock()
+        own.invoke.return_value = [Document(id="mine", page_content="team runbook"),
+                                   Document(id="both", page_content="change policy")]
+        shared.invoke.return_value = [Document(id="both", page_content="change policy"),
+                                      Document(id="org", page_content="org handbook")]
+        router = ShardRouter(k=3)
+        self.addCleanup(router.close)
+        router._retrievers = {"langchain_team-a": own, "langchain": shared}
+
+        documents, _ = router.pipeline(["langchain_team-a", "langchain"]).run("change", filter={"file_type": "pdf"})
+
+        self.assertEqual([doc.id for doc in documents[:1]], ["both"])
+        self.assertEqual({doc.id for doc in documents}, {"mine", "both", "org"})
+        own.invoke.assert_called_once_with("change", filter={"file_type": "pdf"})
+        vectordb = MagicMock()
+        vectordb.stats.return_value = {"live": 2}
+        with patch("backend.tenancy.get_vector_store", return_value=vectordb), \
+             patch("backend.tenancy.BM25_INDEX_ENABLED", False):
+            shards = router.stats()["shards"]
+            scoped = router.stats(["langchain_team-a", "langchain_team-b"])
+        self.assertEqual(shards["langchain_team-a"]["chunks"], 2)
+        self.assertEqual(shards["langchain"]["latency_ms"]["count"], 1)
+        self.assertEqual(list(scoped["shards"]), ["langchain_team-a"])
+
+class TestBatchRetriever(unittest.TestCase):
+
+    def test_queries_are_embedded_and_searched_as_one_batch(self):
+        from unittest.mock import patch
+        from backend.retrieval.batch_retrieval import BatchRetriever
+        embeddings = MagicMock()
+        embeddings.embed_queries.return_value = [[1.0, 0.0], [0.0, 1.0]]
+        vectordb = MagicMock()
+        vectordb.similarity_search_with_score_by_vectors.return_value = [
+            [(Document(id="a", page_content="alpha", metadata={"page": 1}), 0.1)],
+            [(Document(id="b", page_content="beta"), 0.3), (Document(id="a", page_content="alpha"), 0.4)],
+        ]
+        vectordb._select_relevance_score_fn.return_value = lambda distance: 1.0 - distance
+        bm25_index = MagicMock()
+        bm25_index.search.side_effect = [[("c", 2.5)], []]
+        bm25_index.get_documents.return_value = {"c": Document(id="c", page_content="gamma")}
+
+        with patch("backend.retrieval.batch_retrieval.get_vector_store", return_value=vectordb), \
+             patch("backend.retrieval.batch_retrieval.get_bm25_index", return_value=bm25_index):
+            dense = BatchRetriever(embeddings, hybrid=False).retrieve(["q1", "q2"], k=1)
+            hybrid = BatchRetriever(embeddings, hybrid=True).retrieve(["q1", "q2"], k=2)
+
+        embeddings.embed_queries.assert_called_with(["q1", "q2"])
+        self.assertEqual([[hit["id"] for hit in hits] for hits in dense], [["a"], ["b"]])
+        self.assertAlmostEqual(dense[0][0]["score"], 0.9)
+        self.assertEqual(dense[0][0]["metadata"], {"page": 1})
+        self.assertEqual({hit["id"] for hit in hybrid[0]}, {"a", "c"})
+        self.assertEqual(next(hit for hit in hybrid[0] if hit["id"] == "c")["bm25"], 2.5)
+
+if __name__ == "__main__":
+    unittest.main()
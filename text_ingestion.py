@@ -1 +1,206 @@
-Inherited file content will not be shown
\ No newline at end of file
+import mmap
+import os
+import re
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from lxml import etree
+
+# Chunks collected before a window is handed to the writer
+TEXT_WINDOW_CHUNKS = int(os.getenv("TEXT_WINDOW_CHUNKS", "256"))
+# Characters of one section buffered before it is split; long sections are
+# split in pieces of about this size, cut at a blank line where possible
+TEXT_SECTION_BUFFER_CHARS = int(os.getenv("TEXT_SECTION_BUFFER_CHARS", "65536"))
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown", ".mdx")
+
+_MARKDOWN_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t#]*$")
+_MARKDOWN_FENCE = re.compile(r"^ {0,3}(```|~~~)")
+
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_WORD_NS = {"w": _W}
+_WORD_HEADING_STYLE = re.compile(r"^(?:Title|Heading([1-9]))$")
+
+# (heading level, text); level is None for body text
+Block = Tuple[Optional[int], str]
+
+def _mapped_lines(file_path: str) -> Iterator[str]:
+    """Lines of a UTF-8 file read through a read-only memory map, one decoded line at a time."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            first = True
+            for raw in iter(mapped.readline, b""):
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                if first:
+                    line, first = line.lstrip("﻿"), False
+                yield line
+
+def iter_text_blocks(file_path: str, markdown: Optional[bool] = None) -> Iterator[Block]:
+    """
+    Yields the lines of a text file. In Markdown files (by extension unless
+    ``markdown`` is given), ATX headings outside fenced code blocks are
+    yielded as their title with their level.
+    """
+    if markdown is None:
+        markdown = file_path.lower().endswith(MARKDOWN_EXTENSIONS)
+    in_fence = False
+    for line in _mapped_lines(file_path):
+        if markdown:
+            if _MARKDOWN_FENCE.match(line):
+                in_fence = not in_fence
+            elif not in_fence:
+                heading = _MARKDOWN_HEADING.match(line)
+                if heading and heading.group(2):
+                    yield len(heading.group(1)), heading.group(2).strip()
+                    continue
+        yield None, line
+
+def _word_text(element) -> str:
+    return "".join(element.itertext(f"{{{_W}}}t", with_tail=False))
+
+def _release(element):
+    """Frees a finished element and the siblings before it, so the parsed tree stays small."""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+def iter_docx_blocks(file_path: str) -> Iterator[Block]:
+    """
+    Streams the body of a DOCX file with iterparse, yielding paragraphs as they
+    are parsed. Title and Heading 1-9 paragraphs are yielded with their level,
+    and each table row becomes one "cell | cell" line.
+    """
+    paragraph, row = f"{{{_W}}}p", f"{{{_W}}}tr"
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as stream:
+        for _, element in etree.iterparse(stream, events=("end",), tag=(paragraph, row)):
+            if element.tag == row:
+                cells = [" ".join(_word_text(cell).split()) for cell in element.iterfind("w:tc", _WORD_NS)]
+                if any(cells):
+                    yield None, " | ".join(cells)
+                _release(element)
+                continue
+            # Paragraphs in table cells are read with their row, and those in
+            # text boxes with the paragraph that anchors them
+            if next(element.iterancestors(f"{{{_W}}}tc", paragraph), None) is not None:
+                continue
+            text = _word_text(element).strip()
+            style_id = element.xpath("string(w:pPr/w:pStyle/@w:val)", namespaces=_WORD_NS)
+            style = _WORD_HEADING_STYLE.match(style_id)
+            if text:
+                yield (int(style.group(1) or 1) if style else None), text
+            _release(element)
+
+def iter_section_windows(
+    blocks: Iterable[Block],
+    window_chunks: int = TEXT_WINDOW_CHUNKS,
+    section_buffer: int = TEXT_SECTION_BUFFER_CHARS,
+) -> Iterator[List[Document]]:
+    """
+    Splits a stream of blocks into chunks that never cross a heading. Each
+    chunk starts with its section's heading and carries the heading path
+    (e.g. "Guide > Setup") as metadata.
+    Only the current section, up to ``section_buffer`` characters, is held
+    in memory; chunks are yielded in windows of about ``window_chunks``.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    headings: List[Tuple[int, str]] = []
+    lines: List[str] = []
+    size = 0
+    window: List[Document] = []
+
+    def split_section() -> List[Document]:
+        if not headings:
+            return text_splitter.create_documents(["\n".join(lines)])
+        # Every chunk of a section starts with its heading, so it keeps that context
+        metadata = {"section": " > ".join(title for _, title in headings)}
+        return [
+            Document(page_content=f"{headings[-1][1]}\n{piece}", metadata=dict(metadata))
+            for piece in text_splitter.split_text("\n".join(lines))
+        ]
+
+    for level, text in blocks:
+        if level is not None:
+            if lines:
+                window.extend(split_section())
+            lines, size = [], 0
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, text))
+        else:
+            if not lines and not text.strip():
+                continue
+            if size >= section_buffer and (not text.strip() or size >= 2 * section_buffer):
+                window.extend(split_section())
+                lines, size = [], 0
+            lines.append(text)
+            size += len(text) + 1
+        if len(window) >= window_chunks:
+            yield window
+            window = []
+    if lines:
+        window.extend(split_section())
+    if window:
+        yield window
+
+def iter_text_windows(file_path: str, markdown: Optional[bool] = None) -> Iterator[List[Document]]:
+    """Chunks of a TXT or Markdown file, in windows."""
+    return iter_section_windows(iter_text_blocks(file_path, markdown))
+
+def iter_docx_windows(file_path: str) -> Iterator[List[Document]]:
+    """Chunks of a DOCX file, in windows."""
+    return iter_section_windows(iter_docx_blocks(file_path))
+
+def load_text(file_path: str) -> Iterator[Document]:
+    """
+    Streams a TXT or Markdown file through a memory map and yields its chunks.
+    Markdown chunks never span headings and carry their section's heading path.
+    """
+    for window in iter_text_windows(file_path):
+        yield from window
+
+def load_docx(file_path: str) -> Iterator[Document]:
+    """
+    Streams the paragraphs and table rows of a DOCX file and yields its chunks.
+    Chunks never span headings and carry their section's heading path.
+    """
+    for window in iter_docx_windows(file_path):
+        yield from window
+
+def _ingest(file_path: str, file_type: str, collection_name: Optional[str], kind: str):
+    try:
+        from backend.ingestion.ingestion_manager import ingest_file
+        return ingest_file(file_path, file_type, collection_name)
+
+    except Exception as e:
+        print(f"Error ingesting {kind} {file_path}: {e}")
+
+def ingest_text(file_path: str, collection_name: Optional[str] = None):
+    """
+    Ingests a TXT or Markdown file, chunks it, generates embeddings, and stores them in ChromaDB.
+    The file is read through a memory map, so it is never held in memory as one string.
+    """
+    return _ingest(file_path, "txt", collection_name, "text file")
+
+def ingest_docx(file_path: str, collection_name: Optional[str] = None):
+    """
+    Ingests a DOCX file, chunks it, generates embeddings, and stores them in ChromaDB.
+    Paragraphs are parsed lazily, so only the current section is held in memory.
+    """
+    return _ingest(file_path, "docx", collection_name, "DOCX")
+
+if __name__ == "__main__":
+    os.makedirs("../data", exist_ok=True)
+
+    with open("../data/dummy.md", "w") as f:
+        f.write("# Guide\n\nIntroduction.\n\n## Setup\n\nInstall the dependencies.\n")
+    ingest_text("../data/dummy.md")
@@ -0,0 +1,376 @@
+"""
+Shared vector store handles and a coalescing writer.
+One persistent vector store handle is kept per collection, and chunks from
+many documents are buffered into large upsert batches that are flushed when
+they reach a size threshold or have waited long enough. The backend (Chroma
+or the local memory-mapped ANN store) is chosen with VECTOR_STORE_BACKEND;
+both implement LangChain's VectorStore interface.
+"""
+
+import os
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from backend.ingestion.embedding_service import get_embeddings
+from backend.ingestion.manifest import ManifestStore
+from backend.retrieval.bm25_index import BM25_INDEX_ENABLED, get_bm25_index
+from backend.retrieval.local_vector_store import LocalVectorStore
+
+logger = logging.getLogger(__name__)
+
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "langchain")
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+VECTOR_WRITE_BATCH_SIZE = int(os.getenv("VECTOR_WRITE_BATCH_SIZE", "512"))
+VECTOR_WRITE_FLUSH_SECONDS = float(os.getenv("VECTOR_WRITE_FLUSH_SECONDS", "2"))
+
+FlushCallback = Callable[[Optional[Exception]], None]
+
+
+class VectorStoreWriter:
+    """
+    Buffers chunk upserts and deletes and writes them in batches of ``batch_size``.
+    Full batches are written as soon as they accumulate; the remainder is
+    flushed once the oldest pending chunk has waited ``flush_interval``
+    seconds, or when ``flush()`` is called. Deletes are applied in order with
+    the upserts around them, so a re-ingested document's stale chunks are
+    removed in the same flush that writes its new ones.
+    """
+
+    def __init__(
+        self,
+        vectordb,
+        batch_size: int = VECTOR_WRITE_BATCH_SIZE,
+        flush_interval: float = VECTOR_WRITE_FLUSH_SECONDS,
+        lexical_index=None,
+        collection_name: Optional[str] = None,
+        version_store: Optional[ManifestStore] = None,
+    ):
+        self.vectordb = vectordb
+        # Optional BM25 index kept in step with every write and delete
+        self.lexical_index = lexical_index
+        # Optional shared store whose collection version is bumped after every
+        # flush that changed the collection, so other processes see the write
+        self.collection_name = collection_name
+        self.version_store = version_store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Buffered (sequence, document, id) entries, oldest first; a None document is a delete
+        self._pending: List[Tuple[int, Optional[Document], str]] = []
+        self._sequence = 0
+        # [sequence of the last chunk buffered before registration, callback, error,
+        #  sequence the previous callback was registered at]: a callback covers
+        # the chunks buffered between the two registrations
+        self._callbacks: List[list] = []
+        self._registered_through = 0
+        # A failed write of chunks no callback covers yet: (first, last sequence, error)
+        self._unclaimed_failure: Optional[Tuple[int, int, Exception]] = None
+        self._oldest: Optional[float] = None
+        self._condition = threading.Condition()
+        # Serializes flushes so a caller returning from flush() knows every
+        # chunk buffered before the call has been written (or has failed).
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        # Bumped after every successful write or delete so readers (e.g. query
+        # caches) can tell when the collection contents have changed.
+        self.version = 0
+
+        self._stats = {"chunks_written": 0, "batches": 0, "flushes": 0, "failed_flushes": 0, "deleted": 0, "write_seconds": 0.0}
+
+    def add(self, documents: List[Document], ids: List[str]):
+        """Buffer chunks for upsert, writing full batches once enough have accumulated."""
+        if not ids:
+            return
+        with self._condition:
+            for document, document_id in zip(documents, ids):
+                self._sequence += 1
+                self._pending.append((self._sequence, document, document_id))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._ensure_flusher()
+            self._condition.notify_all()
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._flush(full_batches_only=True)
+
+    def delete(self, ids: List[str]):
+        """Buffer chunk deletes, dropping any still-buffered upserts for the same ids."""
+        if not ids:
+            return
+        doomed = set(ids)
+        with self._condition:
+            self._pending = [entry for entry in self._pending if entry[2] not in doomed]
+            for document_id in ids:
+                self._sequence += 1
+                self._pending.append((self._sequence, None, document_id))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._ensure_flusher()
+            self._condition.notify_all()
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._flush(full_batches_only=True)
+
+    def call_when_flushed(self, callback: FlushCallback):
+        """
+        Run ``callback(error)`` once everything buffered so far has been written.
+        ``error`` is None on success. Runs immediately if nothing is buffered.
+        """
+        with self._condition:
+            covers_from, self._registered_through = self._registered_through, self._sequence
+            error = None
+            failure = self._unclaimed_failure
+            if failure is not None:
+                if failure[0] <= self._sequence and failure[1] > covers_from:
+                    error = failure[2]
+                if failure[1] <= self._sequence:
+                    self._unclaimed_failure = None
+            if self._pending:
+                self._callbacks.append([self._sequence, callback, error, covers_from])
+                return
+        callback(error)
+
+    def flush(self):
+        """
+        Write all buffered chunks and run the callbacks waiting on them.
+        Re-raises the write error after the callbacks have been told about it.
+        """
+        self._flush(full_batches_only=False)
+
+    def _flush(self, full_batches_only: bool):
+        with self._flush_lock:
+            with self._condition:
+                count = len(self._pending)
+                if full_batches_only:
+                    count -= count % self.batch_size
+                taken, self._pending = self._pending[:count], self._pending[count:]
+                if not self._pending:
+                    self._oldest = None
+            if not taken and not self._callbacks:
+                return
+
+            error = None
+            changed = False
+            unwritten_from = None
+            start = time.perf_counter()
+            try:
+                for batch in _batches(taken, self.batch_size):
+                    unwritten_from = batch[0][0]
+                    ids = [entry[2] for entry in batch]
+                    if batch[0][1] is None:
+                        self.vectordb.delete(ids=ids)
+                        if self.lexical_index is not None:
+                            self.lexical_index.delete(ids)
+                        changed = True
+                        with self._condition:
+                            self._stats["deleted"] += len(ids)
+                            self.version += 1
+                        continue
+                    documents = [entry[1] for entry in batch]
+                    self.vectordb.add_documents(documents, ids=ids)
+                    if self.lexical_index is not None:
+                        self.lexical_index.add(documents, ids)
+                    changed = True
+                    with self._condition:
+                        self._stats["batches"] += 1
+                        self._stats["chunks_written"] += len(ids)
+                        self.version += 1
+            except Exception as e:
+                error = e
+                logger.error(f"Vector store flush of {len(taken)} chunks failed: {e}")
+            if changed and self.version_store is not None:
+                try:
+                    self.version_store.bump_collection_version(self.collection_name)
+                except Exception as e:
+                    logger.error(f"Recording a new version of collection {self.collection_name} failed: {e}")
+
+            with self._condition:
+                self._stats["flushes"] += 1
+                self._stats["write_seconds"] += time.perf_counter() - start
+                if error is not None:
+                    self._stats["failed_flushes"] += 1
+                    # Only callbacks covering the failed batch, or the batches after
+                    # it that were never attempted, must see the error
+                    unwritten_to = taken[-1][0]
+                    for waiting in self._callbacks:
+                        if waiting[0] >= unwritten_from and waiting[3] < unwritten_to:
+                            waiting[2] = waiting[2] or error
+                    # Chunks buffered after the last registration belong to callbacks not registered yet
+                    if unwritten_to > self._registered_through:
+                        first = max(unwritten_from, self._registered_through + 1)
+                        if self._unclaimed_failure is not None:
+                            first = min(first, self._unclaimed_failure[0])
+                            error_for_later = self._unclaimed_failure[2]
+                        else:
+                            error_for_later = error
+                        self._unclaimed_failure = (first, unwritten_to, error_for_later)
+                # A callback is due once none of the chunks buffered before it remain
+                first_pending = self._pending[0][0] if self._pending else self._sequence + 1
+                due = [waiting for waiting in self._callbacks if waiting[0] < first_pending]
+                self._callbacks = [waiting for waiting in self._callbacks if waiting[0] >= first_pending]
+
+            for _, callback, callback_error, _ in due:
+                try:
+                    callback(callback_error)
+                except Exception as e:
+                    logger.error(f"Vector store flush callback failed: {e}")
+            if error is not None:
+                raise error
+
+    def _ensure_flusher(self):
+        # Caller holds self._condition
+        if self._flusher is None and self.flush_interval > 0 and not self._closed:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="vector-store-writer")
+            self._flusher.daemon = True
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            with self._condition:
+                while not self._closed and self._oldest is None:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                due = self._oldest + self.flush_interval - time.monotonic()
+                if due > 0:
+                    self._condition.wait(due)
+                    continue
+            try:
+                self.flush()
+            except Exception:
+                # Already logged and reported to the waiting callbacks
+                pass
+
+    def close(self):
+        """Flush remaining chunks and stop the background flusher."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            flusher.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats["write_seconds"] = round(stats["write_seconds"], 3)
+        stats["avg_batch_size"] = round(stats["chunks_written"] / stats["batches"], 1) if stats["batches"] else 0.0
+        stats["batch_size"] = self.batch_size
+        stats["flush_interval"] = self.flush_interval
+        return stats
+
+
+def _batches(entries: List[Tuple[int, Optional[Document], str]], size: int):
+    """Splits buffered entries into runs of upserts or deletes of at most ``size``, keeping their order."""
+    batch: List[Tuple[int, Optional[Document], str]] = []
+    for entry in entries:
+        if batch and (len(batch) >= size or (batch[0][1] is None) != (entry[1] is None)):
+            yield batch
+            batch = []
+        batch.append(entry)
+    if batch:
+        yield batch
+
+
+def _create_chroma(collection_name: str) -> VectorStore:
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=get_embeddings(),
+        persist_directory=CHROMA_DB_PATH,
+    )
+
+
+def _create_local(collection_name: str) -> VectorStore:
+    return LocalVectorStore(collection_name, get_embeddings())
+
+
+VECTOR_STORE_BACKENDS: Dict[str, Callable[[str], VectorStore]] = {
+    "chroma": _create_chroma,
+    "local": _create_local,
+}
+
+_vector_stores: Dict[str, VectorStore] = {}
+_writers: Dict[str, VectorStoreWriter] = {}
+_registry_lock = threading.Lock()
+_version_store: Optional[ManifestStore] = None
+
+
+def _get_version_store() -> ManifestStore:
+    # Caller holds _registry_lock
+    global _version_store
+    if _version_store is None:
+        _version_store = ManifestStore()
+    return _version_store
+
+
+def get_vector_store(collection_name: str = CHROMA_COLLECTION) -> VectorStore:
+    """Return the process-wide vector store handle for a collection."""
+    with _registry_lock:
+        vectordb = _vector_stores.get(collection_name)
+        if vectordb is None:
+            if VECTOR_STORE_BACKEND not in VECTOR_STORE_BACKENDS:
+                raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+            vectordb = VECTOR_STORE_BACKENDS[VECTOR_STORE_BACKEND](collection_name)
+            _vector_stores[collection_name] = vectordb
+        return vectordb
+
+
+def get_writer(collection_name: str = CHROMA_COLLECTION) -> VectorStoreWriter:
+    """Return the process-wide coalescing writer for a collection."""
+    vectordb = get_vector_store(collection_name)
+    with _registry_lock:
+        writer = _writers.get(collection_name)
+        if writer is None:
+            writer = VectorStoreWriter(
+                vectordb,
+                lexical_index=get_bm25_index(collection_name) if BM25_INDEX_ENABLED else None,
+                collection_name=collection_name,
+                version_store=_get_version_store(),
+            )
+            _writers[collection_name] = writer
+        return writer
+
+
+def collection_version(collection_name: str = CHROMA_COLLECTION) -> int:
+    """
+    Counter that changes whenever any process writes to the collection. It is
+    kept in the manifest database, which the server, its queue workers and the
+    bulk and crawler CLIs share, so their writes all invalidate query caches.
+    """
+    with _registry_lock:
+        version_store = _get_version_store()
+    return version_store.collection_version(collection_name)
+
+
+def close_writers():
+    """Flush and stop every writer, then save local index structures, e.g. on application shutdown."""
+    with _registry_lock:
+        writers = list(_writers.values())
+        stores = list(_vector_stores.values())
+    for writer in writers:
+        try:
+            writer.close()
+        except Exception as e:
+            logger.error(f"Final vector store flush failed: {e}")
+    for vectordb in stores:
+        if isinstance(vectordb, LocalVectorStore):
+            try:
+                vectordb.close()
+            except Exception as e:
+                logger.error(f"Saving local index {vectordb.collection_name} failed: {e}")
+
+
+def writer_stats() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        writers = dict(_writers)
+    return {name: writer.stats() for name, writer in writers.items()}
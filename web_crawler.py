@@ -0,0 +1,350 @@
+"""
+Concurrent web crawler for ingestion.
+Fetches seed URLs, or every page listed in a sitemap, over one pooled async
+HTTP client with a per-host request rate limit. Pages ingested before are
+requested conditionally (If-None-Match / If-Modified-Since), so unchanged
+pages come back as 304 and are skipped without parsing or embedding. Changed
+pages are parsed with lxml and handed to the IngestionManager as "web" documents.
+Only http(s) URLs are fetched, and every request, including each redirect hop,
+is refused unless its host resolves to public addresses (and is listed in
+CRAWL_ALLOWED_HOSTS, when set), so callers cannot reach internal services.
+
+    python -m backend.ingestion.web_crawler https://example.com/a https://example.com/b
+    python -m backend.ingestion.web_crawler --sitemap https://example.com/sitemap.xml
+"""
+
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import time
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Sequence, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import httpx
+import lxml.etree
+import lxml.html
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from backend.ingestion.ingestion_manager import manifest_key
+
+logger = logging.getLogger(__name__)
+
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "16"))
+# Requests started per second against any single host (0 disables the limit)
+CRAWL_PER_HOST_RPS = float(os.getenv("CRAWL_PER_HOST_RPS", "4"))
+CRAWL_TIMEOUT_SECONDS = float(os.getenv("CRAWL_TIMEOUT_SECONDS", "30"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "1000"))
+CRAWL_USER_AGENT = os.getenv("CRAWL_USER_AGENT", "KnowledgeAssistantCrawler/1.0")
+CRAWL_MAX_REDIRECTS = int(os.getenv("CRAWL_MAX_REDIRECTS", "5"))
+# Comma-separated hosts (and their subdomains) that may be crawled; empty allows any public host
+CRAWL_ALLOWED_HOSTS = frozenset(
+    host.strip().lower().rstrip(".") for host in os.getenv("CRAWL_ALLOWED_HOSTS", "").split(",") if host.strip()
+)
+# Lets the crawler reach loopback, private and link-local addresses (e.g. an intranet wiki)
+CRAWL_ALLOW_PRIVATE_ADDRESSES = os.getenv("CRAWL_ALLOW_PRIVATE_ADDRESSES", "false").lower() == "true"
+
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+_TEXT_XPATH = "//p | //h1 | //h2 | //h3 | //h4 | //h5 | //h6 | //li"
+# Sitemaps are parsed without entity expansion or network access
+_SITEMAP_PARSER = lxml.etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=False)
+
+
+def extract_text(content: bytes) -> Tuple[str, Optional[str]]:
+    """Text of the paragraphs, headings and list items of an HTML page, and its title."""
+    try:
+        # Bytes rather than text so lxml honours the page's declared encoding
+        root = lxml.html.fromstring(content)
+    except (lxml.etree.ParserError, ValueError):
+        return "", None
+    title = root.findtext(".//title")
+    lines = (" ".join(element.text_content().split()) for element in root.xpath(_TEXT_XPATH))
+    return "\n".join(line for line in lines if line), title.strip() if title else None
+
+
+def chunk_page(url: str, content: bytes) -> List[Document]:
+    """Splits a fetched page into chunks carrying its URL and title."""
+    text, title = extract_text(content)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    return text_splitter.create_documents([text], metadatas=[{"url": url, "title": title}]) if text else []
+
+
+def parse_sitemap(content: bytes) -> Tuple[List[str], List[str]]:
+    """Page URLs and nested sitemap URLs listed in a sitemap or sitemap index."""
+    root = lxml.etree.fromstring(content, parser=_SITEMAP_PARSER)
+    locations = [loc.text.strip() for loc in root.iter("{*}loc") if loc.text and loc.text.strip()]
+    if lxml.etree.QName(root).localname == "sitemapindex":
+        return [], locations
+    return locations, []
+
+
+def normalize_url(url: str) -> str:
+    return urldefrag(url.strip())[0]
+
+
+class UnsafeURLError(ValueError):
+    """A URL the crawler refuses to fetch."""
+
+
+def check_url(url: str, allowed_hosts: FrozenSet[str] = CRAWL_ALLOWED_HOSTS) -> str:
+    """Returns the host of an http(s) URL, raising UnsafeURLError for other schemes or hosts not allowed."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise UnsafeURLError(f"Only http and https URLs can be crawled: {url}")
+    host = (parts.hostname or "").rstrip(".")
+    if not host:
+        raise UnsafeURLError(f"URL has no host: {url}")
+    if allowed_hosts and not any(host == allowed or host.endswith("." + allowed) for allowed in allowed_hosts):
+        raise UnsafeURLError(f"Host is not in CRAWL_ALLOWED_HOSTS: {host}")
+    return host
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_public_host(host: str, port: Optional[int]):
+    """Raises UnsafeURLError unless every address the host resolves to is public."""
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise UnsafeURLError(f"Could not resolve {host}: {e}")
+    for *_, sockaddr in infos:
+        if not _is_public(sockaddr[0]):
+            raise UnsafeURLError(f"Refusing to crawl {host}: it resolves to the non-public address {sockaddr[0]}")
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts per host. Each call reserves the next free slot
+    for its host, so concurrent fetches against one host queue up while other
+    hosts proceed. Runs on a single event loop, so no locking is needed; the
+    server shares one limiter across crawls so parallel requests keep to the rate.
+    """
+
+    def __init__(self, per_second: float = CRAWL_PER_HOST_RPS):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, host: str):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        if len(self._next_slot) > 1024:
+            self._next_slot = {known: at for known, at in self._next_slot.items() if at > now}
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# Shared by every crawl the server runs, so per-host rates hold across requests
+host_rate_limiter = HostRateLimiter()
+
+
+class WebCrawler:
+    """
+    Crawls pages into a collection through an IngestionManager. Every page
+    yields one event; a final summary follows once the writer has flushed.
+    """
+
+    def __init__(
+        self,
+        ingestion_manager,
+        concurrency: int = CRAWL_CONCURRENCY,
+        per_host_rps: float = CRAWL_PER_HOST_RPS,
+        timeout: float = CRAWL_TIMEOUT_SECONDS,
+        max_pages: int = CRAWL_MAX_PAGES,
+        collection_name: Optional[str] = None,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        allowed_hosts: FrozenSet[str] = CRAWL_ALLOWED_HOSTS,
+        allow_private: bool = CRAWL_ALLOW_PRIVATE_ADDRESSES,
+    ):
+        self.ingestion_manager = ingestion_manager
+        self.concurrency = max(1, concurrency)
+        self.per_host_rps = per_host_rps
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.collection_name = collection_name
+        self.rate_limiter = rate_limiter
+        self.allowed_hosts = allowed_hosts
+        self.allow_private = allow_private
+
+    def _client(self) -> httpx.AsyncClient:
+        # Redirects are followed in _get, so every hop is checked before it is requested
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=False,
+            headers={"User-Agent": CRAWL_USER_AGENT},
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+
+    async def _get(
+        self, client: httpx.AsyncClient, limiter: HostRateLimiter, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """GETs a URL, following redirects, after checking the scheme and host of every hop."""
+        for _ in range(CRAWL_MAX_REDIRECTS + 1):
+            host = check_url(url, self.allowed_hosts)
+            if not self.allow_private:
+                # Resolved again by httpx when it connects, so this does not stop
+                # DNS rebinding; untrusted networks also need an egress policy
+                await check_public_host(host, urlsplit(url).port)
+            await limiter.wait(urlsplit(url).netloc)
+            response = await client.get(url, headers=headers)
+            if not response.has_redirect_location:
+                return response
+            url = urljoin(str(response.url), response.headers["location"])
+        raise httpx.TooManyRedirects(f"More than {CRAWL_MAX_REDIRECTS} redirects", request=response.request)
+
+    async def discover(self, client: httpx.AsyncClient, limiter: HostRateLimiter, sitemap: str) -> List[str]:
+        """Page URLs of a sitemap, following sitemap indexes, up to ``max_pages``."""
+        pages: List[str] = []
+        pending, seen = [sitemap], set()
+        while pending and len(pages) < self.max_pages:
+            url = pending.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            response = await self._get(client, limiter, url)
+            response.raise_for_status()
+            found, nested = parse_sitemap(response.content)
+            pages.extend(found)
+            pending.extend(nested)
+        return pages[:self.max_pages]
+
+    async def _fetch(self, client: httpx.AsyncClient, limiter: HostRateLimiter, url: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        event: Dict[str, Any] = {"event": "page", "url": url}
+        try:
+            source_key = manifest_key(url, self.collection_name)
+            validators = await asyncio.to_thread(self.ingestion_manager.manifests.get_validators, source_key) or {}
+            headers = {}
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+            response = await self._get(client, limiter, url, headers)
+            if response.status_code == 304:
+                event["status"] = "not_modified"
+                return event
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in _HTML_TYPES:
+                event.update({"status": "ignored", "content_type": content_type})
+                return event
+
+            content = response.content
+            routing = {"collection_name": self.collection_name} if self.collection_name else {}
+            # Parsing, embedding and writing are blocking, so they leave the event loop;
+            # chunks stay in the shared writer so they are coalesced across pages
+            result = await asyncio.to_thread(
+                self.ingestion_manager.ingest_document,
+                url,
+                "web",
+                parse=lambda source, file_type: chunk_page(source, content),
+                flush=False,
+                **routing,
+            ) or {}
+            event.update({
+                "status": "done",
+                "chunks": result.get("chunks", 0),
+                "added": result.get("added", 0),
+                "deleted": result.get("deleted", 0),
+                # Saved only after the final flush, so a failed write is refetched in full next time
+                "_validators": (source_key, response.headers.get("etag"), response.headers.get("last-modified")),
+            })
+        except Exception as e:
+            logger.error(f"Crawling {url} failed: {e}")
+            event.update({"status": "failed", "error": str(e)})
+        finally:
+            event["seconds"] = round(time.perf_counter() - start, 3)
+        return event
+
+    async def crawl(self, urls: Sequence[str] = (), sitemap: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Fetches and ingests the pages, yielding one event per page as it finishes, then a summary."""
+        started = time.perf_counter()
+        totals = {"done": 0, "not_modified": 0, "ignored": 0, "failed": 0, "chunks": 0, "added": 0}
+        validators = []
+        limiter = self.rate_limiter or HostRateLimiter(self.per_host_rps)
+
+        async with self._client() as client:
+            pages = list(urls)
+            if sitemap:
+                try:
+                    pages.extend(await self.discover(client, limiter, sitemap))
+                except Exception as e:
+                    logger.error(f"Reading sitemap {sitemap} failed: {e}")
+                    yield {"event": "sitemap", "url": sitemap, "status": "failed", "error": str(e)}
+            pages = list(dict.fromkeys(normalize_url(url) for url in pages))[:self.max_pages]
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def fetch(url: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._fetch(client, limiter, url)
+
+            for finished in asyncio.as_completed([fetch(url) for url in pages]):
+                event = await finished
+                totals[event["status"]] += 1
+                totals["chunks"] += event.get("chunks", 0)
+                totals["added"] += event.get("added", 0)
+                if "_validators" in event:
+                    validators.append(event.pop("_validators"))
+                yield event
+
+        write_error = None
+        try:
+            writer = self.ingestion_manager.writer_for(self.collection_name)
+            await asyncio.to_thread(writer.flush)
+            for source_key, etag, last_modified in validators:
+                await asyncio.to_thread(self.ingestion_manager.manifests.save_validators, source_key, etag, last_modified)
+        except Exception as e:
+            logger.error(f"Final crawl flush failed: {e}")
+            write_error = str(e)
+
+        seconds = time.perf_counter() - started
+        yield {
+            "event": "summary",
+            "pages": len(pages),
+            **totals,
+            "seconds": round(seconds, 3),
+            "pages_per_second": round(len(pages) / seconds, 2) if seconds else 0.0,
+            "write_error": write_error,
+        }
+
+    def run(self, urls: Sequence[str] = (), sitemap: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Synchronous crawl returning every event, for scripts and the CLI."""
+        async def collect():
+            return [event async for event in self.crawl(urls, sitemap)]
+        return asyncio.run(collect())
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from backend.ingestion.ingestion_manager import IngestionManager
+
+    parser = argparse.ArgumentParser(description="Crawl web pages or a sitemap into the knowledge base.")
+    parser.add_argument("urls", nargs="*", help="Seed page URLs")
+    parser.add_argument("--sitemap", help="Sitemap (or sitemap index) URL listing the pages to crawl")
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY, help="Pages fetched at once")
+    parser.add_argument("--per-host-rps", type=float, default=CRAWL_PER_HOST_RPS, help="Requests per second per host")
+    parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES)
+    args = parser.parse_args()
+
+    crawler = WebCrawler(IngestionManager(), concurrency=args.concurrency, per_host_rps=args.per_host_rps,
+                         max_pages=args.max_pages)
+    for event in crawler.run(args.urls, args.sitemap):
+        print(json.dumps(event))
@@ -1,43 +1,40 @@
 
 import requests
 from bs4 import BeautifulSoup
+from typing import List, Optional
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
 
-def ingest_web_page(url: str, collection_name: str = "my_documents"):
+def load_web_page(url: str) -> List[Document]:
+    """
+    Loads a web page, extracts its text and splits it into chunks.
+    """
+    response = requests.get(url)
+    response.raise_for_status()  # Raise an exception for HTTP errors
+    soup = BeautifulSoup(response.text, "html.parser")
+
+    # Extract text from common elements (paragraphs, headings, lists)
+    text_elements = soup.find_all(["p", "h1", "h2", "h3", "h4", "h5", "h6", "li"])
+    full_text = "\n".join([elem.get_text() for elem in text_elements])
+
+    # Chunk text
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    chunks = text_splitter.create_documents([full_text])
+    return chunks
+
+def ingest_web_page(url: str, collection_name: Optional[str] = None):
     """
     Ingests a web page, extracts text, chunks it, generates embeddings, and stores them in ChromaDB.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Extract text from common elements (paragraphs, headings, lists)
-        text_elements = soup.find_all(["p", "h1", "h2", "h3", "h4", "h5", "h6", "li"])
-        full_text = "\n".join([elem.get_text() for elem in text_elements])
-
-        # Chunk text
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            is_separator_regex=False,
-        )
-        chunks = text_splitter.create_documents([full_text])
-
-        # Generate embeddings
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-        # Store in ChromaDB
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            collection_name=collection_name,
-            persist_directory="./chroma_db"
-        )
-        print(f"Successfully ingested {url} into ChromaDB collection {collection_name}")
+        from backend.ingestion.ingestion_manager import ingest_file
+        return ingest_file(url, "web", collection_name)
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching web page {url}: {e}")